@@ -0,0 +1,144 @@
+"""
+Sierra Outfitters Precompiled Agent Artifacts
+
+Startup work that only depends on the code and the data files, done ahead
+of time and loaded from disk in fast-start mode (CONFIG['FAST_START']):
+- the request prefix: normalized system prompt, trimmed tool schema, its
+  serialized bytes and static token count (see request_builder)
+- the data indexes, as a memory-mapped snapshot (see storage_backends)
+
+A stale artifact is never used: the request prefix records a fingerprint
+of the sources it was built from, and the snapshot must be newer than the
+data files. Otherwise the agent builds everything at startup as usual.
+
+Usage:
+    python -m agent_artifacts
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Any, Optional
+
+from history_manager import tokenizer_name
+from request_builder import RequestBuilder
+from storage_backends import SnapshotBackend, StorageBackend
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_VERSION = 1
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Files that define the system prompt, the tool schema and how the prefix is prepared
+PREFIX_SOURCES = ("sierra_outfitters_agent.py", "request_builder.py")
+
+
+def prefix_fingerprint(model: str) -> str:
+    """ Hash of everything the request prefix is built from """
+    digest = hashlib.sha256(f"{ARTIFACT_VERSION}|{model}|{tokenizer_name()}".encode())
+    for name in PREFIX_SOURCES:
+        with open(os.path.join(SOURCE_DIR, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def save_request_builder(builder: RequestBuilder, path: str):
+    """ Write a prepared request prefix (atomically replaces path) """
+    artifact = dict(builder.to_artifact(), version=ARTIFACT_VERSION, fingerprint=prefix_fingerprint(builder.model))
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_request_builder(path: str, model: str) -> Optional[RequestBuilder]:
+    """ The prepared request prefix stored at path, or None when it is missing or stale """
+    try:
+        with open(path, encoding="utf-8") as f:
+            artifact = json.load(f)
+    except FileNotFoundError:
+        logger.info("No precompiled request prefix at %s (build it with: python -m agent_artifacts)", path)
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable request prefix artifact %s: %s", path, e)
+        return None
+    if artifact.get("version") != ARTIFACT_VERSION or artifact.get("fingerprint") != prefix_fingerprint(model):
+        logger.warning("Ignoring stale request prefix artifact %s; rebuild it with: python -m agent_artifacts", path)
+        return None
+    return RequestBuilder.from_artifact(artifact)
+
+
+def snapshot_is_current(config: Dict[str, Any]) -> bool:
+    """ True when the data snapshot exists and is newer than both data files """
+    try:
+        built = os.stat(config['SNAPSHOT_FILE']).st_mtime
+        return all(
+            os.stat(path).st_mtime <= built
+            for path in (config['CUSTOMER_ORDERS_FILE'], config['PRODUCT_CATALOG_FILE'])
+        )
+    except FileNotFoundError:
+        return False
+
+
+def open_snapshot_storage(config: Dict[str, Any]) -> Optional[StorageBackend]:
+    """ The precompiled data snapshot in place of the in-memory JSON backend, when it can stand in for it
+
+    Snapshots are read-only, so they are not used when hot reload is enabled.
+    """
+    if config['STORAGE_BACKEND'] != 'memory' or config['DATA_REFRESH_ENABLED']:
+        return None
+    if not snapshot_is_current(config):
+        logger.info("No current data snapshot at %s; loading the JSON files", config['SNAPSHOT_FILE'])
+        return None
+    return SnapshotBackend(
+        config['SNAPSHOT_FILE'],
+        max_postings=config['PRODUCT_SEARCH_MAX_POSTINGS'],
+        fuzzy_threshold=config['PRODUCT_SEARCH_FUZZY_THRESHOLD'],
+        min_score=config['PRODUCT_SEARCH_MIN_SCORE']
+    )
+
+
+def build_artifacts(config: Dict[str, Any]):
+    """ Write the request prefix artifact and the data snapshot """
+    from data_loader import load_orders, load_products
+    from sierra_outfitters_agent import SierraOutfittersAgent
+    from storage_backends import InMemoryBackend
+
+    # The agent builds its prefix from source here; no data, client or vector index is needed for that
+    fast_start, search_mode = config['FAST_START'], config['PRODUCT_SEARCH_MODE']
+    config['FAST_START'], config['PRODUCT_SEARCH_MODE'] = False, "lexical"
+    try:
+        agent = SierraOutfittersAgent("artifact-build", storage=InMemoryBackend())
+    finally:
+        config['FAST_START'], config['PRODUCT_SEARCH_MODE'] = fast_start, search_mode
+    save_request_builder(agent.request_builder, config['ARTIFACTS_FILE'])
+    agent.session_store.close()
+    agent.discount_codes.close()
+    SnapshotBackend.write(
+        config['SNAPSHOT_FILE'],
+        load_orders(config['CUSTOMER_ORDERS_FILE']),
+        load_products(config['PRODUCT_CATALOG_FILE'])
+    )
+
+
+def main():
+    from config import get_config
+
+    config = get_config()
+    parser = argparse.ArgumentParser(description="Precompile the artifacts loaded in fast-start mode")
+    parser.add_argument("--artifacts", default=config['ARTIFACTS_FILE'], help="Request prefix output path")
+    parser.add_argument("--snapshot", default=config['SNAPSHOT_FILE'], help="Data snapshot output path")
+    args = parser.parse_args()
+
+    config['ARTIFACTS_FILE'] = args.artifacts
+    config['SNAPSHOT_FILE'] = args.snapshot
+    build_artifacts(config)
+    print(f"Wrote request prefix to {args.artifacts} and data snapshot to {args.snapshot}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Sierra Outfitters Async Agent
+
+Asyncio variant of the Sierra Outfitters Agent. One instance shares a single
+pooled AsyncOpenAI client across many concurrent conversations, each keyed by
+a session id whose state lives in the session store between turns.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, AsyncIterator, Optional, Tuple
+
+from config import get_config
+from resilient_client import AsyncResilientClient, connection_limits, request_timeout
+from sierra_outfitters_agent import SierraOutfittersAgent
+from session_store import Session
+from storage_backends import StorageBackend
+from streaming import StreamAccumulator
+
+CONFIG = get_config()
+
+logger = logging.getLogger(__name__)
+
+BASE_CAMP_ERROR = "I'm sorry, I encountered an issue connecting to my base camp. Can you try again in a moment? 🏔️"
+
+
+class AsyncSierraOutfittersAgent(SierraOutfittersAgent):
+    """ Async Sierra Outfitters Agent multiplexing concurrent sessions """
+
+    api_client_class = AsyncResilientClient
+
+    def __init__(self, api_key, max_connections: int = None, storage: StorageBackend = None):
+        """ Initialize the async agent with a shared connection pool """
+        self.max_connections = max_connections or CONFIG['ASYNC_MAX_CONNECTIONS']
+        super().__init__(api_key, storage)
+        # session id -> (lock, turns holding or waiting on it); dropped when the last turn finishes
+        self._session_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    def _create_client(self, api_key):
+        """ Create an AsyncOpenAI client backed by a pooled HTTP client """
+        import httpx
+        from openai import AsyncOpenAI
+
+        http_client = httpx.AsyncClient(
+            limits=connection_limits(CONFIG, self.max_connections),
+            timeout=request_timeout(CONFIG)
+        )
+        # Retries are made by self.api, within the call deadline
+        return AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+
+    async def aclose(self):
+        """ Close the shared HTTP connection pool and stop background refreshes """
+        if self.data_refresher is not None:
+            self.data_refresher.stop()
+        await self.api.close()
+        self.session_store.close()
+        self.discount_codes.close()
+        self.flush_telemetry()
+
+    # ======== Session Management ========
+
+    @asynccontextmanager
+    async def _session_turn(self, session_id: str) -> AsyncIterator[Session]:
+        """ Hold a session for one turn; turns within one conversation never interleave """
+        lock, users = self._session_locks.get(session_id, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._session_locks[session_id] = (lock, users + 1)
+        try:
+            async with lock:
+                with self._turn(session_id) as session:
+                    yield session
+        finally:
+            lock, users = self._session_locks[session_id]
+            if users == 1:
+                del self._session_locks[session_id]
+            else:
+                self._session_locks[session_id] = (lock, users - 1)
+
+    # ======== Async Model Calls ========
+
+    async def _create_completion(self, history: List[Dict[str, Any]], phase: str = "initial"):
+        """ Call the chat completions API with the system prompt and a session history """
+        request = self.request_builder.build(history)
+        with self._model_call(phase, request) as span:
+            response = await self._send_request(request)
+            self._record_usage(span, phase, response.usage)
+        return response.choices[0].message
+
+    async def _stream_completion(self, history: List[Dict[str, Any]], accumulator: StreamAccumulator,
+                                 phase: str = "initial") -> AsyncIterator[str]:
+        """ Stream a completion for a session history, yielding content tokens """
+        request = self.request_builder.build(history, stream=True)
+        with self._model_call(phase, request) as span:
+            stream = await self._send_request(request, stream=True)
+            async for chunk in stream:
+                token = accumulator.add_chunk(chunk)
+                if token:
+                    yield token
+            self._record_usage(span, phase, accumulator.usage)
+
+    async def _process_tool_calls_async(self, message, history: List[Dict[str, Any]]) -> str:
+        """ Run tool calls for a session and get the final model response """
+        logger.info("Tool calls detected: %s", len(message.tool_calls))
+        self._add_to_conversation_history("model_dump", message.model_dump(), history)
+
+        function_responses = await self._execute_tool_calls_async(message.tool_calls)
+        for func_response in function_responses:
+            self._add_to_conversation_history("function_response", func_response, history)
+
+        local_reply = self._render_tool_reply(function_responses, history)
+        if local_reply is not None:
+            self._add_to_conversation_history("assistant", local_reply, history)
+            return local_reply
+
+        try:
+            logger.debug("Calling OpenAI API for final response")
+            final_message = await self._create_completion(history, "final")
+        except Exception as e:
+            logger.error("Error calling OpenAI API for final response: %s", e)
+            return BASE_CAMP_ERROR
+
+        self._add_to_conversation_history("assistant", final_message.content, history)
+        logger.info("Final response generated successfully")
+        return final_message.content
+
+    async def _try_fast_path_async(self, user_message: str, session_id: str,
+                                   history: List[Dict[str, Any]]) -> Optional[str]:
+        """ _try_fast_path() with the lookups run off the event loop """
+        routed = self._route_fast_path(user_message, session_id, history)
+        if routed is None:
+            return None
+        reply, tool_calls = routed
+        if tool_calls:
+            reply = self._fast_path_reply(await self._execute_tool_calls_async(tool_calls), history)
+        self._add_to_conversation_history("assistant", reply, history)
+        return reply
+
+    # ======== Main Agent Function Call ========
+
+    async def process_message(self, session_id: str, user_message: str) -> str:
+        """ Process a message for a session and return a response """
+        async with self._session_turn(session_id) as session:
+            logger.info("[%s] Processing user message: '%.50s...' (truncated)", session_id, user_message)
+            history = session.history
+            self._add_to_conversation_history("user", user_message, history)
+
+            fast_reply = await self._try_fast_path_async(user_message, session_id, history)
+            if fast_reply is not None:
+                return fast_reply
+
+            self._compact_history(history, session_id)
+
+            try:
+                message = await self._create_completion(history)
+            except Exception as e:
+                logger.error("[%s] Error calling OpenAI API: %s", session_id, e)
+                return BASE_CAMP_ERROR
+
+            if message.tool_calls:
+                return await self._process_tool_calls_async(message, history)
+
+            logger.info("No tool calls detected, returning direct response")
+            self._add_to_conversation_history("assistant", message.content, history)
+            return message.content
+
+    async def stream_message(self, session_id: str, user_message: str) -> AsyncIterator[str]:
+        """ Process a message for a session, yielding response tokens as they arrive """
+        async with self._session_turn(session_id) as session:
+            logger.info("[%s] Streaming response for user message: '%.50s...' (truncated)", session_id, user_message)
+            history = session.history
+            self._add_to_conversation_history("user", user_message, history)
+
+            fast_reply = await self._try_fast_path_async(user_message, session_id, history)
+            if fast_reply is not None:
+                yield fast_reply
+                return
+
+            self._compact_history(history, session_id)
+
+            accumulator = StreamAccumulator()
+            try:
+                async for token in self._stream_completion(history, accumulator):
+                    yield token
+            except Exception as e:
+                logger.error("[%s] Error calling OpenAI API: %s", session_id, e)
+                yield BASE_CAMP_ERROR
+                return
+            message = accumulator.to_message()
+
+            if message.tool_calls:
+                logger.info("Tool calls detected: %s", len(message.tool_calls))
+                self._add_to_conversation_history("model_dump", message.model_dump(), history)
+                function_responses = await self._execute_tool_calls_async(message.tool_calls)
+                for func_response in function_responses:
+                    self._add_to_conversation_history("function_response", func_response, history)
+
+                local_reply = self._render_tool_reply(function_responses, history)
+                if local_reply is not None:
+                    self._add_to_conversation_history("assistant", local_reply, history)
+                    yield local_reply
+                    return
+
+                accumulator = StreamAccumulator()
+                try:
+                    async for token in self._stream_completion(history, accumulator, "final"):
+                        yield token
+                except Exception as e:
+                    logger.error("[%s] Error calling OpenAI API for final response: %s", session_id, e)
+                    yield BASE_CAMP_ERROR
+                    return
+                message = accumulator.to_message()
+
+            self._add_to_conversation_history("assistant", message.content, history)
+            logger.info("[%s] Streamed response complete", session_id)
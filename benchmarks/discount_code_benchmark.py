@@ -0,0 +1,93 @@
+"""
+Issuance throughput benchmark for the Early Risers discount code service
+
+Issues codes to distinct customers from concurrent threads against a fresh
+store in a temp dir, then checks every code is unique and recorded. A share
+of the requests repeat a customer, to exercise the per-customer limit. One
+JSON record per run is appended to a JSON Lines file.
+
+Usage:
+    python -m benchmarks.discount_code_benchmark
+    python -m benchmarks.discount_code_benchmark --issuances 50000 --threads 64 --repeat-ratio 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks.lookup_microbench import _git_revision
+from benchmarks.replay_benchmark import percentile
+from discount_codes import DiscountCodeService, PromotionWindow
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Discount code issuance throughput and uniqueness check")
+    parser.add_argument("--issuances", type=int, default=20000, help="Code requests to make")
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent requesters")
+    parser.add_argument("--repeat-ratio", type=float, default=0.1, help="Share of requests from a repeat customer")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Codes generated per pool refill")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="discount_codes.jsonl", help="JSON Lines file the run is appended to")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    customers = []
+    for i in range(args.issuances):
+        repeat = customers and rng.random() < args.repeat_ratio
+        customers.append(rng.choice(customers) if repeat else f"email:customer{i}@example.com")
+
+    path = os.path.join(tempfile.mkdtemp(prefix="sierra-discounts-"), "discount_codes.db")
+    service = DiscountCodeService(path, PromotionWindow("US/Pacific", 8, 10), batch_size=args.batch_size)
+    latencies = []
+
+    def issue(customer):
+        started = time.perf_counter()
+        result = service.issue(customer)
+        latencies.append(time.perf_counter() - started)
+        return customer, result
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        results = list(pool.map(issue, customers))
+    elapsed = time.perf_counter() - started
+    stats = service.stats()
+    service.close()
+
+    codes = {}
+    for customer, result in results:
+        if codes.setdefault(result["code"], customer) != customer:
+            raise AssertionError(f"Code {result['code']} issued to two customers")
+    with sqlite3.connect(path) as conn:
+        recorded = conn.execute("SELECT COUNT(*) FROM discount_codes").fetchone()[0]
+    if recorded != len(codes) or len(codes) != len(set(customers)):
+        raise AssertionError(f"{len(codes)} distinct codes, {recorded} recorded, {len(set(customers))} customers")
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "config": {"issuances": args.issuances, "threads": args.threads, "repeat_ratio": args.repeat_ratio,
+                   "batch_size": args.batch_size},
+        "results": {
+            "issuances_per_second": args.issuances / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "codes_recorded": recorded,
+            "codes_per_commit": stats["issued"] / max(stats["commits"], 1),
+            **stats,
+        },
+    }
+    with open(args.output, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    print(json.dumps(record, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Synthetic data generator for Sierra Outfitters
+
+Writes realistic CustomerOrders and ProductCatalog files at scale (10^4 to
+10^7 rows) in the same schema as the files in data/. Records are streamed
+to disk one at a time, so memory use stays flat regardless of size.
+
+Usage:
+    python -m benchmarks.generate_data --orders 1000000 --products 100000 --out-dir /tmp/sierra-1m
+    python -m benchmarks.generate_data --orders 1000000 --format jsonl --out-dir /tmp/sierra-1m-jsonl
+"""
+
+import argparse
+import json
+import os
+import random
+from typing import Dict, Any, Iterator, List
+
+FIRST_NAMES = ["John", "Jane", "Alice", "Bob", "Charlie", "Diana", "Ethan", "Fiona", "George", "Hannah",
+               "Ishmeet", "Nat", "Beth", "Pol", "Zack", "Dorothy", "Nayely", "Nishita", "Crain", "Bhavish"]
+LAST_NAMES = ["Doe", "Smith", "Johnson", "Brown", "Davis", "Evans", "Garcia", "Miller", "Wilson", "Moore",
+              "Taylor", "Anderson", "Thomas", "Martin", "Lee", "Clark", "Lewis", "Walker", "Young", "King"]
+EMAIL_DOMAINS = ["example.com", "mail.example.com", "trailmail.com", "summit.net"]
+STATUSES = [("delivered", 0.45), ("in-transit", 0.25), ("fulfilled", 0.2), ("error", 0.05), ("processing", 0.05)]
+
+ADJECTIVES = ["Backcountry", "Summit", "Alpine", "Granite", "Ridgeline", "Glacier", "Canyon", "Timberline",
+              "Trailblazer", "Wilderness", "Basecamp", "Switchback", "Highland", "Storm", "Ember", "Frost"]
+NOUNS = ["Backpack", "Tent", "Jacket", "Boots", "Skis", "Wetsuit", "Stove", "Lantern", "Hammock",
+         "Trekking Poles", "Gloves", "Beanie", "Sleeping Bag", "Surfboard", "Kayak", "Headlamp"]
+TAGS = ["Hiking", "Camping", "Snow", "Winter", "Water Sports", "Adventure", "Outdoor Gear", "Trail",
+        "Lightweight", "Weatherproof", "Comfort", "High-Tech", "Lifestyle", "Climbing", "Travel"]
+
+
+def _sku_prefix(noun: str) -> str:
+    letters = "".join(word[0] for word in noun.split())
+    return (letters + noun[1]).upper()[:2]
+
+
+def generate_products(count: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """ Yield product catalog records with unique SKUs """
+    rng = random.Random(seed)
+    for i in range(count):
+        noun = rng.choice(NOUNS)
+        adjective = rng.choice(ADJECTIVES)
+        owner = rng.choice(FIRST_NAMES)
+        tags = rng.sample(TAGS, rng.randint(2, 5))
+        inventory = 0 if rng.random() < 0.08 else int(rng.expovariate(1 / 80))
+        yield {
+            "ProductName": f"{owner}'s {adjective} {noun}",
+            "SKU": f"SO{_sku_prefix(noun)}{i + 1:03d}",
+            "Inventory": inventory,
+            "Description": (f"The {adjective} {noun} is built for {tags[0].lower()} and "
+                            f"{tags[-1].lower()} adventures, with rugged materials that "
+                            f"keep you moving from trailhead to summit."),
+            "Tags": tags,
+        }
+
+
+def generate_orders(count: int, product_skus: List[str], seed: int = 43) -> Iterator[Dict[str, Any]]:
+    """ Yield customer order records; customers place 1-5 orders each """
+    rng = random.Random(seed)
+    statuses, weights = zip(*STATUSES)
+    customer = 0
+    orders_left = 0
+    for i in range(count):
+        if orders_left == 0:
+            customer += 1
+            orders_left = rng.randint(1, 5)
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            email = f"{first.lower()}.{last.lower()}{customer}@{rng.choice(EMAIL_DOMAINS)}"
+        orders_left -= 1
+        status = rng.choices(statuses, weights)[0]
+        has_tracking = status in ("delivered", "in-transit")
+        yield {
+            "CustomerName": f"{first} {last}",
+            "Email": email,
+            "OrderNumber": f"#W{i + 1:03d}",
+            "ProductsOrdered": rng.sample(product_skus, min(len(product_skus), rng.randint(1, 3))),
+            "Status": status,
+            "TrackingNumber": f"TRK{rng.randrange(10 ** 9, 10 ** 10)}" if has_tracking else None,
+        }
+
+
+def write_json_array(path: str, records: Iterator[Dict[str, Any]]) -> int:
+    """ Stream records into a JSON array file and return the record count """
+    count = 0
+    with open(path, "w") as f:
+        f.write("[\n")
+        for record in records:
+            if count:
+                f.write(",\n")
+            f.write(json.dumps(record))
+            count += 1
+        f.write("\n]\n")
+    return count
+
+
+def write_json_lines(path: str, records: Iterator[Dict[str, Any]]) -> int:
+    """ Stream records into a JSON Lines file and return the record count """
+    count = 0
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+
+def generate_dataset(out_dir: str, orders: int, products: int, seed: int = 42,
+                     file_format: str = "json") -> Dict[str, str]:
+    """ Write a catalog and an order file ("json" array or "jsonl") into out_dir and return their paths """
+    os.makedirs(out_dir, exist_ok=True)
+    catalog_path = os.path.join(out_dir, f"ProductCatalog.{file_format}")
+    orders_path = os.path.join(out_dir, f"CustomerOrders.{file_format}")
+    write = write_json_lines if file_format == "jsonl" else write_json_array
+
+    skus = []
+
+    def collect_skus(records):
+        for record in records:
+            skus.append(record["SKU"])
+            yield record
+
+    write(catalog_path, collect_skus(generate_products(products, seed)))
+    write(orders_path, generate_orders(orders, skus, seed + 1))
+    return {"orders": orders_path, "products": catalog_path}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate large synthetic Sierra Outfitters datasets")
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--out-dir", default="data/generated")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json")
+    args = parser.parse_args()
+
+    paths = generate_dataset(args.out_dir, args.orders, args.products, args.seed, args.format)
+    print(f"Wrote {args.orders} orders to {paths['orders']}")
+    print(f"Wrote {args.products} products to {paths['products']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Lookup-path microbenchmarks for the Sierra Outfitters Agent
+
+For each dataset size, generates synthetic data and measures, in a fresh
+subprocess, load_data time, peak RSS and per-lookup latency of
+check_order_status and check_product_availability for the chosen storage
+backend. One JSON record per run is appended to a JSON Lines file so the
+scaling curve can be tracked across releases.
+
+Usage:
+    python -m benchmarks.lookup_microbench --sizes 10000 100000 1000000
+    python -m benchmarks.lookup_microbench --sizes 1000000 --backend snapshot
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List
+
+from benchmarks.generate_data import generate_dataset
+from benchmarks.replay_benchmark import percentile
+
+PRODUCT_QUERIES = ["backpack", "alpine tent", "wetsut", "summit skis", "sleeping bag", "headlamp",
+                   "weatherproof jacket", "trekking poles", "kayak", "glacier boots"]
+
+
+def _latency_summary(samples: List[float]) -> Dict[str, float]:
+    return {
+        "p50_us": percentile(samples, 50) * 1e6,
+        "p99_us": percentile(samples, 99) * 1e6,
+        "mean_us": sum(samples) / len(samples) * 1e6 if samples else 0.0,
+    }
+
+
+def _peak_rss_mb() -> float:
+    """ Peak RSS of this process; VmHWM is reset by exec, unlike ru_maxrss on Linux """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _sample_orders(orders, count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """ Reservoir-sample orders so disk-backed stores are never fully materialized """
+    sample = []
+    for i, order in enumerate(orders):
+        if i < count:
+            sample.append(order)
+        else:
+            j = rng.randrange(i + 1)
+            if j < count:
+                sample[j] = order
+    return sample
+
+
+def measure(orders_file: str, products_file: str, lookups: int, backend: str = "memory",
+            store_file: str = None) -> Dict[str, Any]:
+    """ Load one dataset into an agent and time its lookup paths (runs in the child process) """
+    from config import get_config
+    import sierra_outfitters_agent
+
+    config = get_config()
+    config['CUSTOMER_ORDERS_FILE'] = orders_file
+    config['PRODUCT_CATALOG_FILE'] = products_file
+    config['STORAGE_BACKEND'] = backend
+    config['SQLITE_DB_FILE'] = config['SNAPSHOT_FILE'] = store_file
+    config['TOOL_CACHE_TTLS'] = {}  # measure the lookup paths, not the cache
+
+    class TimedAgent(sierra_outfitters_agent.SierraOutfittersAgent):
+        def load_data(self):
+            started = time.perf_counter()
+            super().load_data()
+            self.load_seconds = time.perf_counter() - started
+
+    agent = TimedAgent("sk-benchmark")
+    peak_rss_mb = _peak_rss_mb()
+    rng = random.Random(1)
+
+    orders = _sample_orders(agent.storage.iter_orders(), lookups, rng)
+    order_samples = []
+    for _ in range(lookups):
+        order = rng.choice(orders)
+        started = time.perf_counter()
+        agent.check_order_status(order["Email"].upper(), order["OrderNumber"].lstrip("#"))
+        order_samples.append(time.perf_counter() - started)
+
+    product_samples = []
+    for i in range(lookups):
+        query = PRODUCT_QUERIES[i % len(PRODUCT_QUERIES)]
+        started = time.perf_counter()
+        agent.check_product_availability(query)
+        product_samples.append(time.perf_counter() - started)
+
+    return {
+        "backend": backend,
+        "orders": agent.storage.order_count(),
+        "products": agent.storage.product_count(),
+        "load_data_seconds": agent.load_seconds,
+        "peak_rss_mb": peak_rss_mb,
+        "order_lookup": _latency_summary(order_samples),
+        "product_lookup": _latency_summary(product_samples),
+    }
+
+
+def build_store(backend: str, store_file: str, paths: Dict[str, str]):
+    """ Build a SQLite database or snapshot from a generated dataset """
+    from data_loader import load_orders, load_products
+    from storage_backends import SQLiteBackend, SnapshotBackend
+
+    orders, products = load_orders(paths["orders"]), load_products(paths["products"])
+    if backend == "sqlite":
+        SQLiteBackend.build(store_file, orders, products).close()
+    else:
+        SnapshotBackend.write(store_file, orders, products)
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling microbenchmarks for order and product lookups")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Order counts to benchmark")
+    parser.add_argument("--product-ratio", type=float, default=0.1, help="Products generated per order")
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json", help="Dataset file format")
+    parser.add_argument("--backend", choices=["memory", "sqlite", "snapshot"], default="memory",
+                        help="Storage backend; sqlite/snapshot stores are built next to the dataset")
+    parser.add_argument("--store", help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help="Reuse/generate datasets here instead of a temp dir")
+    parser.add_argument("--output", default="lookup_scaling.jsonl", help="JSON Lines file the run is appended to")
+    parser.add_argument("--child", nargs=2, metavar=("ORDERS", "PRODUCTS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child[0], args.child[1], args.lookups, args.backend, args.store)))
+        return
+
+    base_dir = args.data_dir or tempfile.mkdtemp(prefix="sierra-bench-")
+    results = []
+    for size in args.sizes:
+        products = max(10, int(size * args.product_ratio))
+        out_dir = os.path.join(base_dir, f"orders-{size}")
+        paths = {"orders": os.path.join(out_dir, f"CustomerOrders.{args.format}"),
+                 "products": os.path.join(out_dir, f"ProductCatalog.{args.format}")}
+        if not all(os.path.exists(path) for path in paths.values()):
+            print(f"Generating {size} orders / {products} products in {out_dir}", file=sys.stderr)
+            paths = generate_dataset(out_dir, size, products, file_format=args.format)
+
+        store_file = os.path.join(out_dir, {"memory": "", "sqlite": "sierra.db", "snapshot": "sierra.snap"}[args.backend])
+        if args.backend != "memory" and not os.path.exists(store_file):
+            print(f"Building {args.backend} store {store_file}", file=sys.stderr)
+            build_store(args.backend, store_file, paths)
+
+        # A fresh interpreter per size keeps peak RSS attributable to that dataset
+        output = subprocess.check_output(
+            [sys.executable, "-m", "benchmarks.lookup_microbench", "--lookups", str(args.lookups),
+             "--backend", args.backend, "--store", store_file, "--child", paths["orders"], paths["products"]],
+            text=True
+        )
+        result = json.loads(output.strip().splitlines()[-1])
+        result["file_bytes"] = os.path.getsize(paths["orders"]) + os.path.getsize(paths["products"])
+        print(json.dumps(result), file=sys.stderr)
+        results.append(result)
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    with open(args.output, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Appended results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Local stand-in for the OpenAI chat completions API
+
+Serves POST /v1/chat/completions (plain and streamed) with configurable
+latency and a rule-based tool-calling policy, so the agent can be replayed
+and load-tested offline. Faults can be injected at random: 503 errors,
+connections dropped without a response, and slow (tail latency) responses;
+tests can also script the faults of the first requests, including 400s.
+GET /stats returns request and fault counters.
+
+Usage:
+    python -m benchmarks.mock_openai_server --port 8099 --latency-ms 300
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 python sierra_outfitters_agent.py
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Iterable
+
+from fast_path_router import EMAIL_RE, ORDER_NUMBER_RE
+
+PROMOTION_RE = re.compile(r"\b(promo(tion)?s?|discount|early risers?|deal)\b", re.IGNORECASE)
+ORDER_ITEMS_RE = re.compile(r"\b(in (my|the|this) order|items?|back in stock)\b", re.IGNORECASE)
+PRODUCT_LIST_RE = re.compile(r"\s*(?:,|\band\b)\s*", re.IGNORECASE)
+PRODUCT_RE = re.compile(r"\b(have|stock|available|availability|what about|looking for|need|buy)\b", re.IGNORECASE)
+QUERY_FILLER_RE = re.compile(
+    r"\b(can|you|check|if|do|does|have|has|a|an|the|any|in|stock|what|about|is|are|there|"
+    r"available|looking|for|i|need|to|buy|please|some|something)\b|[?!.,]",
+    re.IGNORECASE
+)
+
+
+class MockPolicy:
+    """ Decides what the fake model answers for a given message list """
+
+    def __init__(self, latency_ms: float = 300.0, jitter_ms: float = 50.0, token_latency_ms: float = 0.0,
+                 tool_mode: str = "rules", seed: Optional[int] = None, error_rate: float = 0.0,
+                 drop_rate: float = 0.0, slow_rate: float = 0.0, slow_ms: float = 2000.0,
+                 faults: Iterable[Optional[str]] = ()):
+        """ Configure the fake model
+
+        Args:
+            latency_ms: Mean time before the first byte of a response
+            jitter_ms: Uniform +/- jitter applied to latency_ms
+            token_latency_ms: Delay between streamed chunks
+            tool_mode: "rules" to call tools from simple intent rules, "never" for text-only answers
+            error_rate: Fraction of requests answered with a 503
+            drop_rate: Fraction of requests whose connection is closed without a response
+            slow_rate: Fraction of requests delayed by an extra slow_ms
+            faults: Faults of the first requests, in order, before the rates apply ("error", "drop",
+                    "slow", "bad_request" for a 400, or None for none)
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_latency_ms = token_latency_ms
+        self.tool_mode = tool_mode
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self._scripted = deque(faults)
+        self._random = random.Random(seed)
+
+    def sleep(self):
+        delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000)
+
+    def fault(self) -> Optional[str]:
+        """ Injected fault for one request: "error", "drop", "slow", "bad_request" or None """
+        try:
+            return self._scripted.popleft()
+        except IndexError:
+            pass
+        roll = self._random.random()
+        for name, rate in (("error", self.error_rate), ("drop", self.drop_rate), ("slow", self.slow_rate)):
+            if roll < rate:
+                return name
+            roll -= rate
+        return None
+
+    @staticmethod
+    def _latest(pattern: re.Pattern, messages: List[Dict[str, Any]]) -> Optional[str]:
+        for message in reversed(messages):
+            if message.get("role") == "user":
+                matches = pattern.findall(message.get("content") or "")
+                if matches:
+                    return matches[-1]
+        return None
+
+    def respond(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """ Return {"content": str} or {"tool_calls": [...]} for the conversation """
+        last = messages[-1]
+        if last.get("role") == "tool":
+            results = []
+            for message in reversed(messages):
+                if message.get("role") != "tool":
+                    break
+                try:
+                    results.append(json.loads(message["content"]).get("formatted_response", ""))
+                except ValueError:
+                    results.append(message.get("content", ""))
+            return {"content": "🏔️ Trail report: " + " ".join(reversed(results))}
+
+        text = last.get("content") or ""
+        if self.tool_mode == "rules":
+            email = self._latest(EMAIL_RE, messages)
+            order_number = self._latest(ORDER_NUMBER_RE, messages)
+            order_numbers = list(dict.fromkeys(ORDER_NUMBER_RE.findall(text)))
+            if email and (len(order_numbers) > 1 or (order_number and ORDER_ITEMS_RE.search(text))):
+                orders = [{"email": email, "order_number": number} for number in order_numbers or [order_number]]
+                return {"tool_calls": [("check_order_status_batch", {"orders": orders})]}
+            if (EMAIL_RE.search(text) or ORDER_NUMBER_RE.search(text)) and email and order_number:
+                return {"tool_calls": [("check_order_status", {"email": email, "order_number": order_number})]}
+            if PROMOTION_RE.search(text):
+                return {"tool_calls": [("generate_discount_code", {})]}
+            if PRODUCT_RE.search(text):
+                queries = [" ".join(QUERY_FILLER_RE.sub(" ", part).split()) for part in PRODUCT_LIST_RE.split(text)]
+                queries = [query for query in queries if query]
+                if len(queries) > 1:
+                    return {"tool_calls": [("check_product_availability_batch", {"product_queries": queries})]}
+                query = " ".join(QUERY_FILLER_RE.sub(" ", text).split()) or text
+                return {"tool_calls": [("check_product_availability", {"product_query": query})]}
+            if EMAIL_RE.search(text):
+                return {"content": "Thanks, explorer! What's your order number? 🏔️"}
+            if ORDER_NUMBER_RE.search(text):
+                return {"content": "Got it! What email address is on the order? 🏔️"}
+        return {"content": "Happy to help on the trail! Could you tell me a bit more? 🏔️"}
+
+
+def _usage(messages: List[Dict[str, Any]], completion: str) -> Dict[str, int]:
+    prompt_tokens = len(json.dumps(messages)) // 4
+    completion_tokens = len(completion) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def _tool_call_payload(index: int, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return {"index": index, "id": f"call_{uuid.uuid4().hex[:16]}", "type": "function",
+            "function": {"name": name, "arguments": json.dumps(arguments)}}
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """ Request handler implementing the subset of the API the agent uses """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.server.stats())
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        if len(raw) < length:
+            # The client hung up mid-request (e.g. a cancelled hedge)
+            self.close_connection = True
+            return
+        request = json.loads(raw or b"{}")
+        messages = request.get("messages", [])
+        self.server.record_request(len(json.dumps(messages)))
+
+        policy: MockPolicy = self.server.policy
+        fault = policy.fault()
+        if fault is not None:
+            self.server.record_fault(fault)
+        if fault == "drop":
+            # Close the connection without answering, like an upstream reset
+            self.close_connection = True
+            return
+        policy.sleep()
+        if fault == "slow":
+            time.sleep(policy.slow_ms / 1000)
+        elif fault == "error":
+            self._send_json(503, {"error": {"message": "Injected fault", "type": "server_error"}})
+            return
+        elif fault == "bad_request":
+            self._send_json(400, {"error": {"message": "Injected fault", "type": "invalid_request_error"}})
+            return
+        decision = policy.respond(messages)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        base = {"id": completion_id, "created": int(time.time()), "model": request.get("model", "mock")}
+
+        tool_calls = [_tool_call_payload(i, name, args) for i, (name, args) in enumerate(decision.get("tool_calls", []))]
+        content = decision.get("content")
+        finish_reason = "tool_calls" if tool_calls else "stop"
+
+        if not request.get("stream"):
+            message = {"role": "assistant", "content": content}
+            if tool_calls:
+                message["tool_calls"] = [{k: v for k, v in call.items() if k != "index"} for call in tool_calls]
+            self._send_json(200, dict(base, object="chat.completion", choices=[
+                {"index": 0, "message": message, "finish_reason": finish_reason}
+            ], usage=_usage(messages, content or json.dumps(tool_calls))))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send_chunk(delta: Dict[str, Any], finish: Optional[str] = None):
+            chunk = dict(base, object="chat.completion.chunk",
+                         choices=[{"index": 0, "delta": delta, "finish_reason": finish}])
+            self._write_chunked(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        send_chunk({"role": "assistant", "content": ""})
+        if tool_calls:
+            send_chunk({"tool_calls": tool_calls})
+        else:
+            for token in re.findall(r"\S+\s*", content or ""):
+                if policy.token_latency_ms:
+                    time.sleep(policy.token_latency_ms / 1000)
+                send_chunk({"content": token})
+        send_chunk({}, finish_reason)
+        self._write_chunked(b"data: [DONE]\n\n")
+        self._write_chunked(b"")
+
+    def _write_chunked(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """ Threaded HTTP server holding the policy and request counters """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, policy: MockPolicy):
+        super().__init__(address, MockOpenAIHandler)
+        self.policy = policy
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.prompt_bytes = 0
+        self.faults: Dict[str, int] = {}
+
+    def handle_error(self, request, client_address):
+        # Clients hang up on purpose, e.g. a hedged request cancelled after the other copy answered
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record_request(self, prompt_bytes: int):
+        with self._lock:
+            self.request_count += 1
+            self.prompt_bytes += prompt_bytes
+
+    def record_fault(self, fault: str):
+        with self._lock:
+            self.faults[fault] = self.faults.get(fault, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"request_count": self.request_count, "prompt_bytes": self.prompt_bytes, "faults": dict(self.faults)}
+
+
+def start_mock_server(policy: MockPolicy = None, host: str = "127.0.0.1", port: int = 0) -> MockOpenAIServer:
+    """ Start a mock server on a background thread (port 0 picks a free port) """
+    server = MockOpenAIServer((host, port), policy or MockPolicy())
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAI chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--token-latency-ms", type=float, default=0.0)
+    parser.add_argument("--tool-mode", choices=["rules", "never"], default="rules")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of connections dropped unanswered")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests delayed by --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=2000.0)
+    args = parser.parse_args()
+
+    policy = MockPolicy(args.latency_ms, args.jitter_ms, args.token_latency_ms, args.tool_mode,
+                        error_rate=args.error_rate, drop_rate=args.drop_rate,
+                        slow_rate=args.slow_rate, slow_ms=args.slow_ms)
+    server = MockOpenAIServer((args.host, args.port), policy)
+    print(f"Mock OpenAI server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
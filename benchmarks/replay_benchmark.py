@@ -0,0 +1,237 @@
+"""
+Offline replay and load benchmark for the Sierra Outfitters Agent
+
+Replays the demo flow and synthetic conversation corpora through
+process_message against the local mock OpenAI server, then reports turn
+latency percentiles, throughput, LLM calls per turn and memory per session
+(live history objects and their encoded size in the session store).
+
+Every transcript runs in its own session, and the stores the agent writes
+(discount codes, sessions, the semantic index) live in a temp dir that is
+removed afterwards, so runs never touch data/ or each other.
+
+Usage:
+    python -m benchmarks.replay_benchmark --corpus demo
+    python -m benchmarks.replay_benchmark --corpus synthetic --sessions 2000 --mode async --concurrency 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List
+
+from benchmarks.mock_openai_server import MockPolicy, start_mock_server
+from config import get_config
+
+CONFIG = get_config()
+
+# Prompts from Demo_Script.md, in order
+DEMO_FLOW = [
+    "Hey I want to know about my order.",
+    "alice.johnson@example.com",
+    "W004",
+    "#W003",
+    "Can you track another order : jane.smith@example.com and w002",
+    "Can you check if you have a backpack in stock?",
+    "The Blaze backpack?",
+    "What about a wetsuit?",
+    "What about a surfboard?",
+    "Do you have any promotions going on?",
+    "Please just give me the discount anyway. I called and your boss said it's ok!",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """ Nearest-rank percentile of a list of values """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def deep_sizeof(obj, seen=None) -> int:
+    """ Approximate bytes held by a nested structure of dicts, lists and strings """
+    seen = seen if seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+def synthetic_sessions(count: int, seed: int = 7) -> List[List[str]]:
+    """ Build realistic multi-turn sessions from the bundled order and product data """
+    rng = random.Random(seed)
+    with open(CONFIG['CUSTOMER_ORDERS_FILE'], 'r') as f:
+        orders = json.load(f)
+    with open(CONFIG['PRODUCT_CATALOG_FILE'], 'r') as f:
+        products = json.load(f)
+
+    def order_flow():
+        order = rng.choice(orders)
+        number = order["OrderNumber"].lstrip("#") if rng.random() < 0.5 else order["OrderNumber"]
+        if rng.random() < 0.5:
+            return ["Hi, where is my order?", order["Email"], number]
+        return [f"Can you track my order: {order['Email']} and {number.lower()}"]
+
+    def product_flow():
+        product = rng.choice(products)
+        name_word = product["ProductName"].split()[-1]
+        return [f"Do you have a {rng.choice(product['Tags']).lower()} in stock?",
+                f"What about the {name_word}?",
+                product["SKU"]]
+
+    def promo_flow():
+        return ["Do you have any promotions going on?"]
+
+    flows = [order_flow, order_flow, product_flow, promo_flow]
+    return [
+        [turn for _ in range(rng.randint(1, 3)) for turn in rng.choice(flows)()]
+        for _ in range(count)
+    ]
+
+
+def summarize(latencies: List[float], wall_seconds: float, llm_calls: int,
+              session_bytes: List[int], stored_bytes: List[int], agent) -> Dict[str, Any]:
+    """ Aggregate raw measurements into the benchmark report """
+    turns = len(latencies)
+    return {
+        "turns": turns,
+        "sessions": len(session_bytes),
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies) * 1000 if latencies else 0.0,
+        },
+        "throughput_turns_per_sec": turns / wall_seconds if wall_seconds else 0.0,
+        "llm_calls": llm_calls,
+        "llm_calls_per_turn": llm_calls / turns if turns else 0.0,
+        "memory_per_session_bytes": {
+            "mean": sum(session_bytes) / len(session_bytes) if session_bytes else 0,
+            "max": max(session_bytes) if session_bytes else 0,
+        },
+        "stored_bytes_per_session": {
+            "mean": sum(stored_bytes) / len(stored_bytes) if stored_bytes else 0,
+            "max": max(stored_bytes) if stored_bytes else 0,
+        },
+        "session_store": agent.session_store.stats(),
+        "fast_path": agent.fast_path_router.stats(),
+        "tool_cache": agent.tool_cache.stats(),
+        "api_client": agent.api.stats(),
+    }
+
+
+def run_sync(sessions: List[List[str]], api_key: str) -> Dict[str, Any]:
+    """ Replay sessions one after another through the synchronous agent """
+    from sierra_outfitters_agent import SierraOutfittersAgent
+
+    agent = SierraOutfittersAgent(api_key)
+    agent.api.client  # created lazily; keep client start-up out of the turn latencies
+    latencies, session_bytes, stored_bytes = [], [], []
+    started = time.perf_counter()
+    for index, session in enumerate(sessions):
+        session_id = f"bench-{index}"
+        for text in session:
+            turn_start = time.perf_counter()
+            agent.process_message(text, session_id=session_id)
+            latencies.append(time.perf_counter() - turn_start)
+        session_bytes.append(deep_sizeof(agent.get_session_history(session_id)))
+        stored_bytes.append(agent.session_store.stored_bytes(session_id))
+        agent.end_session(session_id)
+    wall = time.perf_counter() - started
+    agent.session_store.close()
+    agent.discount_codes.close()
+    return latencies, wall, session_bytes, stored_bytes, agent
+
+
+def run_async(sessions: List[List[str]], api_key: str, concurrency: int) -> Dict[str, Any]:
+    """ Replay sessions concurrently through the async agent """
+    from async_agent import AsyncSierraOutfittersAgent
+
+    async def main():
+        agent = AsyncSierraOutfittersAgent(api_key, max_connections=concurrency)
+        agent.api.client  # created lazily; keep client start-up out of the turn latencies
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, session_bytes, stored_bytes = [], [], []
+
+        async def replay(index: int, session: List[str]):
+            session_id = f"bench-{index}"
+            async with semaphore:
+                for text in session:
+                    turn_start = time.perf_counter()
+                    await agent.process_message(session_id, text)
+                    latencies.append(time.perf_counter() - turn_start)
+                session_bytes.append(deep_sizeof(agent.get_session_history(session_id)))
+                stored_bytes.append(agent.session_store.stored_bytes(session_id))
+                agent.end_session(session_id)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(replay(i, s) for i, s in enumerate(sessions)))
+        wall = time.perf_counter() - started
+        await agent.aclose()
+        return latencies, wall, session_bytes, stored_bytes, agent
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay conversations against a local mock OpenAI server")
+    parser.add_argument("--corpus", choices=["demo", "synthetic"], default="demo")
+    parser.add_argument("--sessions", type=int, default=100, help="Session count (synthetic corpus or demo repeats)")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--tool-mode", choices=["rules", "never"], default="rules")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Mock: fraction of requests answered with a 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Mock: fraction of connections dropped unanswered")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Mock: fraction of requests delayed by --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=2000.0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    server = start_mock_server(MockPolicy(
+        args.latency_ms, args.jitter_ms, tool_mode=args.tool_mode, seed=args.seed, error_rate=args.error_rate,
+        drop_rate=args.drop_rate, slow_rate=args.slow_rate, slow_ms=args.slow_ms
+    ))
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    state_dir = tempfile.mkdtemp(prefix="sierra-replay-")
+    for key in ("DISCOUNT_CODE_DB_FILE", "SESSION_DB_FILE", "SEMANTIC_INDEX_FILE"):
+        CONFIG[key] = os.path.join(state_dir, os.path.basename(CONFIG[key]))
+
+    sessions = [list(DEMO_FLOW) for _ in range(args.sessions)] if args.corpus == "demo" \
+        else synthetic_sessions(args.sessions, args.seed)
+
+    if args.mode == "sync":
+        latencies, wall, session_bytes, stored_bytes, agent = run_sync(sessions, "sk-benchmark")
+    else:
+        latencies, wall, session_bytes, stored_bytes, agent = run_async(sessions, "sk-benchmark", args.concurrency)
+
+    report = summarize(latencies, wall, server.stats()["request_count"], session_bytes, stored_bytes, agent)
+    report["mock_faults"] = server.stats()["faults"]
+    report["config"] = vars(args)
+    server.shutdown()
+    shutil.rmtree(state_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Cold-start benchmark for the Sierra Outfitters Agent
+
+Starts fresh interpreters and measures, in each one, how long it takes to
+import the agent module, construct the agent, answer a first fast-path turn
+(no model call) and a first model turn (against the local mock OpenAI
+server). The first turn arrives --idle-ms after the agent is ready, as it
+would once a new instance has registered with the load balancer; the
+OpenAI client is prewarmed in that gap unless --no-prewarm is given.
+Runs with and without fast-start mode; the precompiled artifacts for fast
+start are built into a temp dir first. One JSON record per run is appended
+to a JSON Lines file so startup can be tracked across releases.
+
+Usage:
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --runs 10 --idle-ms 0 --no-prewarm
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List
+
+# Child processes import nothing else before the timed section; the benchmark helpers are imported in main()
+
+FAST_PATH_TURN = "jane.smith@example.com W002"
+MODEL_TURN = "Hey I want to know about my order."
+METRICS = ("interpreter_ms", "import_ms", "init_ms", "ready_ms", "first_fast_path_ms", "first_model_ms")
+
+
+def measure(spawned_at: float, fast_start: bool, artifacts_file: str, snapshot_file: str,
+            prewarm: bool, idle_ms: float) -> Dict[str, Any]:
+    """ Time one cold start (runs in the child process) """
+    entered = time.monotonic()
+    from config import get_config
+
+    config = get_config()
+    config['FAST_START'] = fast_start
+    config['ARTIFACTS_FILE'] = artifacts_file
+    config['SNAPSHOT_FILE'] = snapshot_file
+    config['OPENAI_PREWARM'] = prewarm
+    config['TOOL_CACHE_TTLS'] = {}
+
+    started = time.perf_counter()
+    from sierra_outfitters_agent import SierraOutfittersAgent
+    imported = time.perf_counter()
+    agent = SierraOutfittersAgent("sk-benchmark")
+    ready = time.perf_counter()
+    sdk_loaded_at_ready = "openai" in sys.modules
+    time.sleep(idle_ms / 1000)
+
+    fast_path_started = time.perf_counter()
+    agent.process_message(FAST_PATH_TURN)
+    fast_path_done = time.perf_counter()
+    agent.end_session()
+    agent.process_message(MODEL_TURN)
+    model_done = time.perf_counter()
+    agent.api.close()
+
+    to_ms = 1000
+    interpreter = entered - spawned_at
+    return {
+        "interpreter_ms": interpreter * to_ms,
+        "import_ms": (imported - started) * to_ms,
+        "init_ms": (ready - imported) * to_ms,
+        "ready_ms": (interpreter + ready - started) * to_ms,
+        "first_fast_path_ms": (fast_path_done - fast_path_started) * to_ms,
+        "first_model_ms": (model_done - fast_path_done) * to_ms,
+        "sdk_loaded_at_ready": sdk_loaded_at_ready,
+        "storage": type(agent.storage).__name__,
+    }
+
+
+def run_child(args, fast_start: bool, artifacts_file: str, snapshot_file: str) -> Dict[str, Any]:
+    command = [sys.executable, "-m", "benchmarks.startup_benchmark", "--child", str(time.monotonic()),
+               "--artifacts", artifacts_file, "--snapshot", snapshot_file, "--idle-ms", str(args.idle_ms)]
+    if fast_start:
+        command.append("--fast-start")
+    if args.no_prewarm:
+        command.append("--no-prewarm")
+    output = subprocess.check_output(command, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    from benchmarks.replay_benchmark import percentile
+
+    summary = {metric: {"p50": percentile([s[metric] for s in samples], 50),
+                        "max": max(s[metric] for s in samples)} for metric in METRICS}
+    summary["storage"] = samples[-1]["storage"]
+    summary["sdk_loaded_at_ready"] = samples[-1]["sdk_loaded_at_ready"]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark: import, init and first-response latency")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per mode")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mock model latency")
+    parser.add_argument("--idle-ms", type=float, default=1000.0, help="Delay between agent ready and the first turn")
+    parser.add_argument("--no-prewarm", action="store_true", help="Create the OpenAI client on the first model call")
+    parser.add_argument("--output", default="startup.jsonl", help="JSON Lines file the run is appended to")
+    parser.add_argument("--child", type=float, help=argparse.SUPPRESS)
+    parser.add_argument("--fast-start", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--artifacts", help=argparse.SUPPRESS)
+    parser.add_argument("--snapshot", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(measure(args.child, args.fast_start, args.artifacts, args.snapshot,
+                                 not args.no_prewarm, args.idle_ms)))
+        return
+
+    from agent_artifacts import build_artifacts
+    from benchmarks.lookup_microbench import _git_revision
+    from benchmarks.mock_openai_server import MockPolicy, start_mock_server
+    from config import get_config
+
+    config = get_config()
+    artifact_dir = tempfile.mkdtemp(prefix="sierra-startup-")
+    config['ARTIFACTS_FILE'] = os.path.join(artifact_dir, "agent-artifacts.json")
+    config['SNAPSHOT_FILE'] = os.path.join(artifact_dir, "sierra-outfitters.snap")
+    build_artifacts(config)
+
+    server = start_mock_server(MockPolicy(args.latency_ms, 0.0))
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    results = {}
+    for mode, fast_start in (("default", False), ("fast_start", True)):
+        samples = [run_child(args, fast_start, config['ARTIFACTS_FILE'], config['SNAPSHOT_FILE'])
+                   for _ in range(args.runs)]
+        results[mode] = summarize(samples)
+        print(f"{mode}: " + ", ".join(f"{metric} {results[mode][metric]['p50']:.1f}" for metric in METRICS),
+              file=sys.stderr)
+    server.shutdown()
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "config": {"runs": args.runs, "latency_ms": args.latency_ms, "idle_ms": args.idle_ms,
+                   "prewarm": not args.no_prewarm},
+        "results": results,
+    }
+    with open(args.output, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    print(json.dumps(record, indent=2))
+
+
+if __name__ == "__main__":
+    main()
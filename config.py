@@ -10,8 +10,41 @@ CONFIG = {
     'LOG_FILE': 'sierra-outfitters-agent.log',
     'ENV_FILE': '.env.local',
     
+    # Logging: records go through a bounded queue to a background writer thread
+    'LOG_LEVEL': 'INFO',
+    'LOG_QUEUE_ENABLED': True,
+    'LOG_QUEUE_SIZE': 10000,  # records beyond this are dropped rather than blocking a turn
+    'LOG_MAX_BYTES': 10 * 1024 * 1024,
+    'LOG_BACKUP_COUNT': 5,
+    'LOG_SAMPLE_BURST': 50,  # INFO records per message template logged in full each window
+    'LOG_SAMPLE_EVERY': 10,  # then keep 1 in N (1 disables sampling)
+    'LOG_SAMPLE_WINDOW_SECONDS': 60,
+    
     # OpenAI settings
     'OPENAI_MODEL': 'gpt-4o',
+    'OPENAI_TIMEOUT_SECONDS': 30,  # per attempt, and between streamed chunks
+    'OPENAI_CONNECT_TIMEOUT_SECONDS': 5,
+    'OPENAI_MAX_CONNECTIONS': 10,  # sync client pool (the async agent uses ASYNC_MAX_CONNECTIONS)
+    'OPENAI_MAX_KEEPALIVE_CONNECTIONS': 20,
+    'OPENAI_KEEPALIVE_EXPIRY_SECONDS': 30,
+    'STREAM_RESPONSES': True,
+    
+    # Resilient model calls (resilient_client.py)
+    'OPENAI_DEADLINE_SECONDS': 45,  # one model call, all attempts and backoff included
+    'OPENAI_MAX_RETRIES': 3,  # retries of connection errors, timeouts, 408/409/429 and 5xx
+    'OPENAI_BACKOFF_BASE_SECONDS': 0.25,  # full-jitter exponential backoff, doubled per retry
+    'OPENAI_BACKOFF_MAX_SECONDS': 4.0,
+    'OPENAI_HEDGE_AFTER_SECONDS': None,  # e.g. 2.0: race a second copy of a non-streamed call still pending
+    'CIRCUIT_FAILURE_THRESHOLD': 5,  # consecutive failed attempts that open the breaker (0 disables it)
+    'CIRCUIT_RESET_SECONDS': 30,  # open time before a single probe call is let through
+    
+    # Fast start: load precompiled artifacts (python -m agent_artifacts) instead of building them at startup
+    'FAST_START': False,
+    'ARTIFACTS_FILE': 'data/agent-artifacts.json',  # request prefix; the data snapshot goes to SNAPSHOT_FILE
+    'OPENAI_PREWARM': True,  # create the OpenAI client on a background thread instead of on the first model call
+    
+    # Async agent settings
+    'ASYNC_MAX_CONNECTIONS': 100,
     
     # Time zone settings
     'TIMEZONE': 'US/Pacific',
@@ -21,9 +54,92 @@ CONFIG = {
     'EARLY_RISER_END_HOUR': 10,
     'EARLY_RISER_DISCOUNT': '10%',
     
+    # Early Risers discount codes (discount_codes.py)
+    'DISCOUNT_CODE_DB_FILE': 'data/discount_codes.db',
+    'DISCOUNT_CODE_PREFIX': 'EARLY10',
+    'DISCOUNT_CODE_LENGTH': 8,
+    'DISCOUNT_CODE_BATCH_SIZE': 1000,  # codes generated and collision-checked per pool refill
+    'DISCOUNT_CODES_PER_CUSTOMER': 1,  # per promotion day; asking again returns the code already issued
+    
     # Tracking URL templates
     'USPS_TRACKING_URL': 'https://tools.usps.com/go/TrackConfirmAction?tLabels={tracking_number}',
     
+    # Tool execution settings
+    'TOOL_EXECUTOR_MAX_WORKERS': 8,
+    'TOOL_TIMEOUT_SECONDS': 5.0,
+    'TOOL_TIMEOUTS': {},  # Per-tool overrides, e.g. {'check_order_status': 2.0}
+    'TOOL_BATCH_MAX_ITEMS': 20,  # orders or products looked up per batch tool call
+    
+    # Tool result cache (tools without a TTL are never cached)
+    'TOOL_CACHE_MAX_ENTRIES': 10000,
+    'TOOL_CACHE_TTLS': {
+        'check_order_status': 30,
+        'check_product_availability': 60,
+    },
+    
+    # Conversation history compaction
+    'HISTORY_TOKEN_BUDGET': 3000,
+    'HISTORY_KEEP_RECENT_TURNS': 3,
+    
+    # Telemetry: per-turn spans and Prometheus metrics (GET /metrics on the HTTP server)
+    'TELEMETRY_ENABLED': True,
+    'TRACE_FILE': None,  # e.g. 'traces/sierra-{pid}.json', viewable in chrome://tracing or ui.perfetto.dev
+    'METRICS_FILE': None,  # metrics written here on exit, e.g. for a node_exporter textfile collector
+    
+    # Session store: 'memory' (LRU per process) or 'sqlite' (local disk, survives worker restarts)
+    'SESSION_STORE': 'memory',
+    'SESSION_DB_FILE': 'data/sessions.db',
+    'SESSION_MAX_SESSIONS': 10000,
+    'SESSION_IDLE_TIMEOUT_SECONDS': 1800,
+    'SESSION_MAX_BYTES': 64 * 1024,  # encoded size; oldest turns are dropped beyond it
+    
+    # Final replies of tool turns: 'llm' always makes a second model call to phrase the reply;
+    # 'hybrid' renders the tool outcomes listed below from the brand-voice template bank instead,
+    # for turns that hold nothing but emails, order numbers and SKUs. By default only a found order
+    # and an exact-SKU product are rendered; not_found, search matches, the batch tools
+    # ('check_order_status_batch', ...) and discount outcomes are left to the model unless listed
+    'RESPONSE_MODE': 'hybrid',
+    'LOCAL_RESPONSE_POLICY': {
+        'check_order_status': ['delivered', 'in-transit', 'fulfilled', 'processing'],
+        'check_product_availability': ['in_stock', 'low_stock', 'out_of_stock'],
+    },
+    
+    # Fast-path router settings (answer structured turns without the LLM)
+    'FAST_PATH_ENABLED': True,
+    
+    # Product search settings
+    'PRODUCT_SEARCH_TOP_K': 3,
+    'PRODUCT_SEARCH_MAX_POSTINGS': 1000,
+    'PRODUCT_SEARCH_FUZZY_THRESHOLD': 0.4,
+    'PRODUCT_SEARCH_MIN_SCORE': 0.25,  # min BM25 score of a product match
+    
+    # Semantic product retrieval (semantic_search.py, needs NumPy): 'lexical' ranks with BM25 only;
+    # 'hybrid' fuses BM25 with TF-IDF vector matches over name, tags and description
+    'PRODUCT_SEARCH_MODE': 'lexical',
+    'SEMANTIC_INDEX_FILE': 'data/semantic-index.npz',  # reloaded while it matches the product catalog
+    'SEMANTIC_SEARCH_DIMENSIONS': 8192,  # hashed features per product vector (keep it even; fewer raise collision noise)
+    'SEMANTIC_SEARCH_MIN_SCORE': 0.12,  # min cosine similarity for a vector match, above hash collision noise
+    
+    # Storage backend: 'memory' loads the JSON files into each process; 'sqlite' and
+    # 'snapshot' serve one on-disk dataset shared by every worker (python -m storage_backends)
+    'STORAGE_BACKEND': 'memory',
+    'STORAGE_READ_ONLY': False,
+    'SQLITE_DB_FILE': 'data/sierra-outfitters.db',
+    'SQLITE_MMAP_BYTES': 256 * 1024 * 1024,
+    'SNAPSHOT_FILE': 'data/sierra-outfitters.snap',
+    
+    # Hot reload: poll a JSON Lines delta feed and the data files, apply changes without restarting
+    'DATA_REFRESH_ENABLED': False,
+    'DATA_REFRESH_INTERVAL_SECONDS': 5.0,
+    'DATA_DELTA_FEED_FILE': 'data/deltas.jsonl',
+    'DATA_REFRESH_WATCH_FILES': True,
+    
+    # HTTP server (python server.py)
+    'SERVER_HOST': '127.0.0.1',
+    'SERVER_PORT': 8080,
+    'SERVER_WORKERS': 0,  # 0 = one worker process per CPU core
+    'SERVER_MAX_BODY_BYTES': 64 * 1024,
+    
     # Support contacts
     'CUSTOMER_SERVICE_EMAIL': 'help@sierraoutfitters.com',
 }
@@ -0,0 +1,147 @@
+"""
+Sierra Outfitters Data Loader
+
+Streams order and product records from JSON array or JSON Lines files
+without materializing the whole file, and stores each record in a compact
+__slots__ class with interned low-cardinality strings (status, tags, SKUs).
+"""
+
+import json
+import logging
+import sys
+from typing import Dict, Any, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 1 << 20
+JSON_LINES_SUFFIXES = (".jsonl", ".ndjson")
+
+_intern = sys.intern
+
+
+class CompactRecord:
+    """ Read-mostly record with dict-style access over __slots__ fields """
+
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default) if key in self.FIELDS else default
+
+    def keys(self):
+        return self.FIELDS
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS
+
+    def __eq__(self, other) -> bool:
+        try:
+            return all(self[field] == other[field] for field in self.FIELDS)
+        except (KeyError, TypeError):
+            return NotImplemented
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class OrderRecord(CompactRecord):
+    """ Compact customer order """
+
+    __slots__ = ("CustomerName", "Email", "OrderNumber", "ProductsOrdered", "Status", "TrackingNumber")
+    FIELDS = __slots__
+
+    def __init__(self, CustomerName, Email, OrderNumber, ProductsOrdered=(), Status="", TrackingNumber=None):
+        self.CustomerName = CustomerName
+        self.Email = Email
+        self.OrderNumber = OrderNumber
+        self.ProductsOrdered = tuple(map(_intern, ProductsOrdered or ()))
+        self.Status = _intern(Status or "")
+        self.TrackingNumber = TrackingNumber
+
+
+class ProductRecord(CompactRecord):
+    """ Compact product catalog entry """
+
+    __slots__ = ("ProductName", "SKU", "Inventory", "Description", "Tags")
+    FIELDS = __slots__
+
+    def __init__(self, ProductName, SKU, Inventory=0, Description="", Tags=()):
+        self.ProductName = ProductName
+        self.SKU = _intern(SKU)
+        self.Inventory = Inventory
+        self.Description = Description
+        self.Tags = tuple(map(_intern, Tags or ()))
+
+
+def iter_json_records(path: str) -> Iterator[Dict[str, Any]]:
+    """ Yield objects from a JSON array or JSON Lines file one at a time
+
+    JSON arrays are decoded incrementally from fixed-size chunks, so peak
+    memory is bounded by the largest record rather than the file size.
+    """
+    if path.endswith(JSON_LINES_SUFFIXES):
+        with open(path, "r") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        raise ValueError(f"{path}:{line_number}: invalid JSON record: {e}") from e
+        return
+
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        buffer = f.read(READ_CHUNK_SIZE).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path}: expected a JSON array or a JSON Lines file")
+        position = 1
+        eof = False
+        while True:
+            # Skip separators between records
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if eof:
+                    raise ValueError(f"{path}: truncated or invalid JSON near offset {position}")
+                chunk = f.read(READ_CHUNK_SIZE)
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield record
+            position = end
+
+
+def load_orders(path: str) -> Iterator[OrderRecord]:
+    """ Stream compact order records from a JSON or JSON Lines file """
+    for record in iter_json_records(path):
+        get = record.get
+        if not get("Email") or not get("OrderNumber"):
+            logger.warning("Skipping order without an email or order number in %s: %r", path, record)
+            continue
+        yield OrderRecord(get("CustomerName", ""), record["Email"], record["OrderNumber"],
+                          get("ProductsOrdered"), get("Status"), get("TrackingNumber"))
+
+
+def load_products(path: str) -> Iterator[ProductRecord]:
+    """ Stream compact product records from a JSON or JSON Lines file """
+    for record in iter_json_records(path):
+        get = record.get
+        yield ProductRecord(record["ProductName"], record["SKU"], get("Inventory", 0),
+                            get("Description", ""), get("Tags"))
@@ -0,0 +1,324 @@
+"""
+Sierra Outfitters Data Refresher
+
+Keeps inventory and order status current without restarting the agent:
+- tails a JSON Lines delta feed of order/product changes, from its size at
+  startup onwards
+- watches the order and product data files; appended JSON Lines records
+  are read incrementally, rewritten files are diffed against the store
+  (a JSON Lines file only counts as appended to while it is the same file
+  and the bytes already read still hash the same)
+
+Changes are applied in batches through StorageBackend.apply_changes, which
+swaps in updated index copies (or commits one SQLite transaction), so
+lookups never wait on a refresh.
+
+Delta feed lines look like:
+    {"op": "update_product", "sku": "SOBP001", "fields": {"Inventory": 12}}
+    {"op": "update_order", "email": "...", "order_number": "#W001", "fields": {"Status": "delivered"}}
+    {"op": "upsert_order", "record": {...}}    {"op": "remove_order", "email": "...", "order_number": "..."}
+    {"op": "upsert_product", "record": {...}}  {"op": "remove_product", "sku": "..."}
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from data_loader import JSON_LINES_SUFFIXES, OrderRecord, ProductRecord, load_orders, load_products
+from order_repository import normalize_email, normalize_order_number
+
+logger = logging.getLogger(__name__)
+
+OrderKey = Tuple[str, str]
+# Watched file state: (mtime_ns, bytes read, inode, SHA-256 of the bytes read or None for JSON files)
+FileState = Tuple[int, int, int, Optional[bytes]]
+
+
+def _order_key(order: Dict[str, Any]) -> OrderKey:
+    return normalize_email(order["Email"]), normalize_order_number(order["OrderNumber"])
+
+
+def _plain(record: Dict[str, Any]) -> Dict[str, Any]:
+    """ Comparable form of a record (compact records keep sequences as tuples, JSON as lists) """
+    return {key: list(value) if isinstance(value, (list, tuple)) else value for key, value in dict(record).items()}
+
+
+class ChangeBatch:
+    """ Pending changes keyed by record; later changes to the same record win """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.orders: Dict[OrderKey, Optional[Dict[str, Any]]] = {}
+        self.products: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.orders) + len(self.products)
+
+    def current_order(self, email: str, order_number: str) -> Optional[Dict[str, Any]]:
+        key = (normalize_email(email), normalize_order_number(order_number))
+        if key in self.orders:
+            return self.orders[key]
+        return self.storage.get_order(email, order_number)
+
+    def current_product(self, sku: str) -> Optional[Dict[str, Any]]:
+        sku = sku.strip().upper()
+        if sku in self.products:
+            return self.products[sku]
+        return self.storage.get_product_by_sku(sku)
+
+    def upsert_order(self, order: Dict[str, Any]):
+        self.orders[_order_key(order)] = order
+
+    def remove_order(self, email: str, order_number: str):
+        self.orders[(normalize_email(email), normalize_order_number(order_number))] = None
+
+    def upsert_product(self, product: Dict[str, Any]):
+        self.products[product["SKU"].strip().upper()] = product
+
+    def remove_product(self, sku: str):
+        self.products[sku.strip().upper()] = None
+
+    def apply_delta(self, delta: Dict[str, Any]):
+        """ Fold one delta feed entry into the batch """
+        op = delta.get("op")
+        if op == "upsert_order":
+            self.upsert_order(OrderRecord(**delta["record"]))
+        elif op == "remove_order":
+            self.remove_order(delta["email"], delta["order_number"])
+        elif op == "update_order":
+            order = self.current_order(delta["email"], delta["order_number"])
+            if order is None:
+                logger.warning("Delta feed updates unknown order %s for %s", delta['order_number'], delta['email'])
+                return
+            updated = OrderRecord(**dict(order, **delta.get("fields", {})))
+            if _order_key(updated) != _order_key(order):
+                self.remove_order(order["Email"], order["OrderNumber"])
+            self.upsert_order(updated)
+        elif op == "upsert_product":
+            self.upsert_product(ProductRecord(**delta["record"]))
+        elif op == "remove_product":
+            self.remove_product(delta["sku"])
+        elif op == "update_product":
+            product = self.current_product(delta["sku"])
+            if product is None:
+                logger.warning("Delta feed updates unknown product %s", delta['sku'])
+                return
+            self.upsert_product(ProductRecord(**dict(product, **delta.get("fields", {}))))
+        else:
+            logger.warning("Ignoring delta feed entry with unknown op: %r", op)
+
+    def as_changes(self) -> Dict[str, List[Any]]:
+        """ Keyword arguments for StorageBackend.apply_changes """
+        return {
+            "upsert_orders": [order for order in self.orders.values() if order is not None],
+            "remove_orders": [key for key, order in self.orders.items() if order is None],
+            "upsert_products": [product for product in self.products.values() if product is not None],
+            "remove_products": [sku for sku, product in self.products.items() if product is None],
+        }
+
+
+class DataRefresher:
+    """ Polls the delta feed and data files and applies changes to an agent's storage """
+
+    def __init__(self, agent, orders_file: str, products_file: str, delta_file: Optional[str] = None,
+                 interval: float = 5.0, watch_data_files: bool = True):
+        """ Configure the refresher (call start() to poll in the background)
+
+        Args:
+            agent: Agent whose storage and tool cache are refreshed
+            delta_file: JSON Lines delta feed; lines appended after startup are applied
+            interval: Seconds between polls
+            watch_data_files: Also pick up edits to the order and product files
+        """
+        self.agent = agent
+        self.delta_file = delta_file
+        self.interval = interval
+        self.watched_files = {"orders": orders_file, "products": products_file} if watch_data_files else {}
+        # Files are already loaded, so only changes after startup count: entries
+        # already in the feed are taken to be reflected in the loaded data
+        self._delta_offset = self._size(delta_file) if delta_file else 0
+        self._file_states: Dict[str, Optional[FileState]] = {
+            kind: self._file_state(path, self._stat(path)) for kind, path in self.watched_files.items()
+        }
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.applied_changes = 0
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    @staticmethod
+    def _prefix_hash(path: str, length: int):
+        """ SHA-256 hasher fed the first length bytes of a file, or None when it is shorter or unreadable """
+        hasher = hashlib.sha256()
+        try:
+            with open(path, "rb") as f:
+                while length > 0:
+                    chunk = f.read(min(length, 1 << 20))
+                    if not chunk:
+                        return None
+                    hasher.update(chunk)
+                    length -= len(chunk)
+        except OSError:
+            return None
+        return hasher
+
+    def _file_state(self, path: str, stat: Optional[Tuple[int, int, int]]) -> Optional[FileState]:
+        """ State of a file read up to its stat size; only JSON Lines files carry a digest """
+        if stat is None:
+            return None
+        digest = None
+        if path.endswith(JSON_LINES_SUFFIXES):
+            hasher = self._prefix_hash(path, stat[1])
+            digest = hasher.digest() if hasher is not None else None
+        return stat[0], stat[1], stat[2], digest
+
+    # ======== Lifecycle ========
+
+    def start(self) -> "DataRefresher":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="data-refresher", daemon=True)
+            self._thread.start()
+            logger.info("Data refresher started (every %ss)", self.interval)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh_once()
+            except Exception as e:
+                logger.error("Data refresh failed: %s", e, exc_info=True)
+
+    # ======== Refresh ========
+
+    def refresh_once(self) -> int:
+        """ Collect every pending change and apply it as one batch; returns the number of changed records """
+        with self._refresh_lock:
+            batch = ChangeBatch(self.agent.storage)
+            if self.delta_file:
+                self._read_delta_feed(batch)
+            for kind, path in self.watched_files.items():
+                self._read_data_file(kind, path, batch)
+            if batch:
+                self.agent.apply_data_changes(**batch.as_changes())
+                self.applied_changes += len(batch)
+                logger.info("Data refresh applied %d changed records", len(batch))
+            return len(batch)
+
+    def _read_delta_feed(self, batch: ChangeBatch):
+        """ Apply complete lines appended to the delta feed since the last poll """
+        try:
+            size = os.path.getsize(self.delta_file)
+        except OSError:
+            return
+        if size < self._delta_offset:
+            logger.info("Delta feed %s was truncated, reading from the start", self.delta_file)
+            self._delta_offset = 0
+        if size == self._delta_offset:
+            return
+
+        with open(self.delta_file, "rb") as f:
+            f.seek(self._delta_offset)
+            data = f.read(size - self._delta_offset)
+        # A partially written last line is left for the next poll
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            if line.strip():
+                try:
+                    batch.apply_delta(json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning("Skipping invalid delta feed entry: %s", e)
+        self._delta_offset += len(complete)
+
+    def _read_data_file(self, kind: str, path: str, batch: ChangeBatch):
+        state = self._stat(path)
+        previous = self._file_states.get(kind)
+        if state is None or (previous is not None and state == previous[:3]):
+            return
+
+        if (path.endswith(JSON_LINES_SUFFIXES) and previous is not None and previous[3] is not None
+                and state[2] == previous[2] and state[1] > previous[1]):
+            # Hashing the bytes already read is far cheaper than parsing and diffing every record
+            hasher = self._prefix_hash(path, previous[1])
+            if hasher is not None and hasher.digest() == previous[3]:
+                # Appended records only: read the tail, not the whole file
+                consumed = self._read_appended(kind, path, previous[1], batch, hasher)
+                self._file_states[kind] = (state[0], previous[1] + consumed, state[2], hasher.digest())
+                return
+            logger.info("%s file %s changed before the last record read; diffing it", kind.capitalize(), path)
+
+        self._diff_file(kind, load_orders(path) if kind == "orders" else load_products(path), batch)
+        self._file_states[kind] = self._file_state(path, state)
+
+    def _read_appended(self, kind: str, path: str, offset: int, batch: ChangeBatch, hasher) -> int:
+        """ Queue complete records appended after offset and return the bytes consumed
+
+        The consumed bytes are fed to hasher, so it covers everything read so far.
+        """
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        hasher.update(complete)
+        for line in complete.splitlines():
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                    if kind == "orders":
+                        if not record.get("Email") or not record.get("OrderNumber"):
+                            raise ValueError("order without an email or order number")
+                        batch.upsert_order(OrderRecord(**record))
+                    else:
+                        batch.upsert_product(ProductRecord(**record))
+                except (ValueError, TypeError) as e:
+                    logger.warning("Skipping invalid record appended to %s: %s", path, e)
+        return len(complete)
+
+    def _diff_file(self, kind: str, records, batch: ChangeBatch):
+        """ Queue only the records of a rewritten file that differ from the store """
+        storage = self.agent.storage
+        seen = set()
+        if kind == "orders":
+            for order in records:
+                key = _order_key(order)
+                seen.add(key)
+                current = storage.get_order(*key)
+                if current is None or _plain(current) != _plain(order):
+                    batch.upsert_order(order)
+            for order in storage.iter_orders():
+                if _order_key(order) not in seen:
+                    batch.remove_order(order["Email"], order["OrderNumber"])
+        else:
+            for product in records:
+                sku = product["SKU"].strip().upper()
+                seen.add(sku)
+                current = storage.get_product_by_sku(sku)
+                if current is None or _plain(current) != _plain(product):
+                    batch.upsert_product(product)
+            for product in storage.iter_products():
+                if product["SKU"].strip().upper() not in seen:
+                    batch.remove_product(product["SKU"])
+        logger.info("Diffed rewritten %s file against the store", kind)
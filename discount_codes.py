@@ -0,0 +1,345 @@
+"""
+Sierra Outfitters Discount Codes
+
+Issues Early Risers discount codes and keeps a durable record of each one:
+- codes come from a pool generated in batches; each batch is checked for
+  collisions against the store in one query, so issuing a code does no
+  random generation or lookup of its own
+- every code is recorded in a local SQLite file shared by all worker
+  processes; the UNIQUE code column keeps codes unique across them
+- a customer gets at most max_per_customer codes per promotion day; asking
+  again returns the code already issued, so a request that timed out but
+  was committed anyway is answered with its code on retry
+- concurrent issuances are group-committed: one writer thread records every
+  pending request in a single transaction, so many codes share one fsync
+- the promotion window is worked out once per Pacific day and cached as
+  epoch bounds, so checking eligibility is a comparison
+- redemptions are recorded against the issued code
+"""
+
+import logging
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# No 0/O, 1/I/L or 5/S, so codes survive being read aloud or retyped
+CODE_ALPHABET = "2346789ABCDEFGHJKMNPQRTUVWXYZ"
+
+DISCOUNT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS discount_codes (
+    code TEXT PRIMARY KEY,
+    customer TEXT NOT NULL,
+    promo_day TEXT NOT NULL,
+    issued_at REAL NOT NULL,
+    redeemed_at REAL
+);
+CREATE INDEX IF NOT EXISTS discount_codes_customer ON discount_codes (customer, promo_day);
+"""
+
+# Codes per IN (...) query when checking a new batch for collisions
+_LOOKUP_CHUNK = 500
+
+
+class PromotionWindow:
+    """ Daily promotion hours in a time zone, cached as epoch bounds for the current local day """
+
+    def __init__(self, timezone: str, start_hour: int, end_hour: int):
+        self.timezone = timezone
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        # (day start, next day start, window start, window end, ISO date), replaced as a whole
+        self._day: Optional[Tuple[float, float, float, float, str]] = None
+
+    def _compute(self, now: float) -> Tuple[float, float, float, float, str]:
+        import pytz
+
+        tz = pytz.timezone(self.timezone)
+        day = datetime.fromtimestamp(now, tz).date()
+        midnight = datetime(day.year, day.month, day.day)
+
+        def epoch(local: datetime) -> float:
+            return tz.localize(local).timestamp()
+
+        bounds = (epoch(midnight), epoch(midnight + timedelta(days=1)),
+                  epoch(midnight.replace(hour=self.start_hour)), epoch(midnight.replace(hour=self.end_hour)),
+                  day.isoformat())
+        logger.debug("Promotion window for %s: %s", bounds[4], bounds[2:4])
+        return bounds
+
+    def _bounds(self, now: float) -> Tuple[float, float, float, float, str]:
+        bounds = self._day
+        if bounds is None or not bounds[0] <= now < bounds[1]:
+            bounds = self._day = self._compute(now)
+        return bounds
+
+    def is_open(self, now: float = None) -> bool:
+        """ True between the start and end hour of the current local day """
+        now = time.time() if now is None else now
+        bounds = self._bounds(now)
+        return bounds[2] <= now < bounds[3]
+
+    def promo_day(self, now: float = None) -> str:
+        """ The current local date (ISO format), which per-customer limits are counted against """
+        return self._bounds(time.time() if now is None else now)[4]
+
+
+class _Issuance:
+    """ One pending request, completed by the writer thread """
+
+    __slots__ = ("customer", "promo_day", "code", "reissued", "error", "done")
+
+    def __init__(self, customer: str, promo_day: str):
+        self.customer = customer
+        self.promo_day = promo_day
+        self.code: Optional[str] = None
+        self.reissued = False
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class DiscountCodeService:
+    """ Issues unique, recorded discount codes from a pre-generated pool """
+
+    def __init__(self, path: str, window: PromotionWindow, prefix: str = "EARLY10", code_length: int = 8,
+                 batch_size: int = 1000, max_per_customer: int = 1, max_group: int = 256):
+        """ Initialize the service
+
+        Args:
+            path: SQLite file holding the issued codes
+            window: Promotion hours codes are issued in
+            prefix: Prefix of every code, e.g. EARLY10-7KQ2MXC4
+            code_length: Random characters after the prefix
+            batch_size: Codes generated and collision-checked per pool refill
+            max_per_customer: Codes a customer can get per promotion day
+            max_group: Most issuances recorded in one transaction
+        """
+        self.path = path
+        self.window = window
+        self.prefix = prefix
+        self.code_length = code_length
+        self.batch_size = batch_size
+        self.max_per_customer = max_per_customer
+        self.max_group = max_group
+        self._local = threading.local()
+        self._pool: deque = deque()
+        self._pending: "queue.SimpleQueue[Optional[_Issuance]]" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self.issued = 0
+        self.reissued = 0
+        self.collisions = 0
+        self.commits = 0
+        self.redeemed = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self.connection
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(DISCOUNT_SCHEMA)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """ This thread's connection """
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            # Issued codes are money: every commit is synced, and group commit keeps that cheap
+            conn.execute("PRAGMA synchronous = FULL")
+            self._local.connection = conn
+        return conn
+
+    def stats(self) -> Dict[str, int]:
+        return {"issued": self.issued, "reissued": self.reissued, "collisions": self.collisions,
+                "commits": self.commits, "redeemed": self.redeemed, "pool": len(self._pool)}
+
+    # ======== Code pool ========
+
+    def _generate(self, count: int) -> List[str]:
+        alphabet, length = CODE_ALPHABET, self.code_length
+        return [f"{self.prefix}-{''.join(secrets.choice(alphabet) for _ in range(length))}" for _ in range(count)]
+
+    def _refill(self, conn: sqlite3.Connection):
+        """ Add a batch of fresh codes to the pool, dropping any already issued or repeated in the batch """
+        batch = list(dict.fromkeys(self._generate(self.batch_size)))
+        taken = set()
+        for i in range(0, len(batch), _LOOKUP_CHUNK):
+            chunk = batch[i:i + _LOOKUP_CHUNK]
+            taken.update(row[0] for row in conn.execute(
+                f"SELECT code FROM discount_codes WHERE code IN ({','.join('?' * len(chunk))})", chunk))
+        self.collisions += self.batch_size - len(batch) + len(taken)
+        self._pool.extend(code for code in batch if code not in taken)
+
+    def _take_code(self, conn: sqlite3.Connection) -> str:
+        if not self._pool:
+            self._refill(conn)
+        return self._pool.popleft()
+
+    # ======== Issuing ========
+
+    def _ensure_writer(self):
+        """ Start the writer thread, or restart it if it died """
+        writer = self._writer
+        if writer is None or not writer.is_alive():
+            with self._writer_lock:
+                if self._writer is None or not self._writer.is_alive():
+                    if self._writer is not None:
+                        logger.error("Discount code writer stopped; restarting it")
+                    self._writer = threading.Thread(target=self._write_loop, name="discount-codes", daemon=True)
+                    self._writer.start()
+
+    def _write_loop(self):
+        conn = self.connection
+        try:
+            self._refill(conn)
+        except Exception as e:
+            # _take_code() refills an empty pool again while recording the first group
+            logger.warning("Pre-filling the discount code pool failed: %s", e)
+        while True:
+            first = self._pending.get()
+            if first is None:
+                break
+            group = [first]
+            while len(group) < self.max_group:
+                try:
+                    item = self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._pending.put(None)
+                    break
+                group.append(item)
+            try:
+                self._record(conn, group)
+            except Exception as e:
+                # A waiter on a group not marked done gets a TimeoutError; the writer keeps running
+                logger.error("Discount code writer failed on %d issuances: %s", len(group), e)
+        conn.close()
+        self._local.connection = None
+
+    def _record(self, conn: sqlite3.Connection, group: List[_Issuance]):
+        """ Apply the limits and record a group of issuances in one transaction """
+        try:
+            # IMMEDIATE takes the write lock up front, so limits hold across worker processes
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            for item in group:
+                codes = conn.execute(
+                    "SELECT code FROM discount_codes WHERE customer = ? AND promo_day = ? ORDER BY issued_at",
+                    (item.customer, item.promo_day)
+                ).fetchall()
+                if len(codes) >= self.max_per_customer:
+                    item.code, item.reissued = codes[-1][0], True
+                    continue
+                while item.code is None:
+                    code = self._take_code(conn)
+                    # Another process may have issued the same code since the batch was checked
+                    if conn.execute(
+                        "INSERT OR IGNORE INTO discount_codes (code, customer, promo_day, issued_at) "
+                        "VALUES (?, ?, ?, ?)", (code, item.customer, item.promo_day, now)
+                    ).rowcount:
+                        item.code = code
+                    else:
+                        self.collisions += 1
+            conn.execute("COMMIT")
+            self.commits += 1
+        except Exception as e:
+            logger.error("Recording %d discount codes failed: %s", len(group), e)
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for item in group:
+                item.code, item.error = None, e
+        for item in group:
+            if item.error is None:
+                if item.reissued:
+                    self.reissued += 1
+                else:
+                    self.issued += 1
+            item.done.set()
+
+    def issue(self, customer: str, timeout: float = 5.0) -> Dict[str, Any]:
+        """ Issue a code to a customer, or return the one already issued once they reach the limit
+
+        The call returns once the code is committed to disk.
+
+        Returns:
+            Dict with the following structure:
+            {
+                "code": str,  # The discount code
+                "reissued": bool,  # Whether it was issued to this customer before
+            }
+
+        Raises:
+            TimeoutError: The writer did not record the code in time, and none is on record for the customer
+            sqlite3.Error: The code could not be recorded
+        """
+        item = _Issuance(customer, self.window.promo_day())
+        self._ensure_writer()
+        self._pending.put(item)
+        if not item.done.wait(timeout):
+            # The writer may still commit this request; a code on record is what a retry would get
+            code = self.issued_to(customer, item.promo_day)
+            if code is None:
+                raise TimeoutError(f"Discount code not recorded within {timeout}s")
+            return {"code": code, "reissued": True}
+        if item.error is not None:
+            raise item.error
+        return {"code": item.code, "reissued": item.reissued}
+
+    def issued_to(self, customer: str, promo_day: str = None) -> Optional[str]:
+        """ The latest code on record for a customer on a promotion day (today by default), or None """
+        row = self.connection.execute(
+            "SELECT code FROM discount_codes WHERE customer = ? AND promo_day = ? ORDER BY issued_at DESC LIMIT 1",
+            (customer, promo_day or self.window.promo_day())
+        ).fetchone()
+        return row[0] if row else None
+
+    def redeem(self, code: str) -> bool:
+        """ Mark a code as redeemed; False when it was never issued or is already redeemed """
+        cursor = self.connection.execute(
+            "UPDATE discount_codes SET redeemed_at = ? WHERE code = ? AND redeemed_at IS NULL",
+            (time.time(), code)
+        )
+        if cursor.rowcount:
+            self.redeemed += 1
+        return bool(cursor.rowcount)
+
+    def lookup(self, code: str) -> Optional[Dict[str, Any]]:
+        """ The record of an issued code, or None """
+        row = self.connection.execute(
+            "SELECT customer, promo_day, issued_at, redeemed_at FROM discount_codes WHERE code = ?", (code,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"code": code, "customer": row[0], "promo_day": row[1], "issued_at": row[2], "redeemed_at": row[3]}
+
+    def close(self):
+        """ Stop the writer after it records everything pending, and close this thread's connection """
+        if self._writer is not None:
+            self._pending.put(None)
+            self._writer.join()
+            self._writer = None
+        conn = getattr(self._local, "connection", None)
+        if conn is not None:
+            conn.close()
+            self._local.connection = None
+
+
+def create_discount_code_service(config: Dict[str, Any]) -> DiscountCodeService:
+    """ Open the discount code store at CONFIG['DISCOUNT_CODE_DB_FILE'] """
+    window = PromotionWindow(config['TIMEZONE'], config['EARLY_RISER_START_HOUR'], config['EARLY_RISER_END_HOUR'])
+    return DiscountCodeService(
+        config['DISCOUNT_CODE_DB_FILE'],
+        window,
+        prefix=config['DISCOUNT_CODE_PREFIX'],
+        code_length=config['DISCOUNT_CODE_LENGTH'],
+        batch_size=config['DISCOUNT_CODE_BATCH_SIZE'],
+        max_per_customer=config['DISCOUNT_CODES_PER_CUSTOMER']
+    )
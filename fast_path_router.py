@@ -0,0 +1,129 @@
+"""
+Sierra Outfitters Fast-Path Router
+
+Deterministic intent and slot extractor that runs before the LLM. Turns that
+only carry structured data (order numbers, emails, SKUs) are resolved by
+calling the tool functions directly, skipping the model round-trips.
+"""
+
+import logging
+import re
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+ORDER_NUMBER_RE = re.compile(r"(?<![\w#])#?W\d{3,}\b", re.IGNORECASE)
+SKU_RE = re.compile(r"\bSO[A-Z]{2}\d{3,}\b", re.IGNORECASE)
+WORD_RE = re.compile(r"[a-z']+")
+
+# Words that may surround structured data without changing the intent
+FILLER_WORDS = frozenset({
+    "a", "about", "address", "and", "any", "are", "can", "check", "could", "do", "email",
+    "for", "here", "hey", "hi", "hello", "how", "i", "i'm", "is", "it", "it's", "look",
+    "me", "mine", "my", "number", "of", "ok", "okay", "on", "order", "orders", "please",
+    "pls", "product", "s", "sku", "status", "stock", "that", "the", "this", "track",
+    "tracking", "up", "what", "what's", "where", "where's", "with", "you", "yes", "sure",
+    "in", "available", "availability", "have", "too", "also",
+})
+
+# Brand-voice replies asking for the slot still needed for an order lookup
+MISSING_SLOT_PROMPTS = {
+    "email": "Got your order number on the trail map! 🗺️ What email address did you use for the order? Then I'll track it down for you! 🏔️",
+    "order_number": "Thanks, explorer! I've got your email. What's your order number (it looks like #W001)? Then we'll find out where your gear is on the trail! 🏔️",
+}
+
+# Model calls avoided per fast-path outcome
+LLM_CALLS_SAVED_PER_TOOL_TURN = 2
+LLM_CALLS_SAVED_PER_PROMPT_TURN = 1
+
+
+class FastPathRouter:
+    """ Extracts order/email/SKU slots per session and decides when the LLM can be skipped """
+
+    def __init__(self):
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.turns_routed = 0
+        self.turns_deferred = 0
+        self.llm_calls_saved = 0
+
+    def get_slots(self, session_id: str) -> Dict[str, Any]:
+        """ Return the partially filled slots for a session """
+        return self.sessions.setdefault(session_id, {"email": None})
+
+    def clear_session(self, session_id: str):
+        """ Forget the slots held for a session """
+        self.sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        """ Counters describing how much work the fast path absorbed """
+        return {
+            "turns_routed": self.turns_routed,
+            "turns_deferred": self.turns_deferred,
+            "llm_calls_saved": self.llm_calls_saved,
+        }
+
+    @staticmethod
+    def extract(text: str) -> Dict[str, Any]:
+        """ Extract structured entities and report whether anything else was said """
+        emails = EMAIL_RE.findall(text)
+        remainder = EMAIL_RE.sub(" ", text)
+        order_numbers = ["#" + match.lstrip("#").upper() for match in ORDER_NUMBER_RE.findall(remainder)]
+        remainder = ORDER_NUMBER_RE.sub(" ", remainder)
+        skus = [match.upper() for match in SKU_RE.findall(remainder)]
+        remainder = SKU_RE.sub(" ", remainder)
+
+        residual = [word for word in WORD_RE.findall(remainder.lower()) if word not in FILLER_WORDS]
+        return {
+            "emails": emails,
+            "order_numbers": list(dict.fromkeys(order_numbers)),
+            "skus": list(dict.fromkeys(skus)),
+            "structured_only": not residual,
+        }
+
+    def route(self, session_id: str, text: str) -> Optional[Dict[str, Any]]:
+        """ Decide how to handle a user turn without the LLM
+
+        Returns:
+            None when the turn should go to the LLM, otherwise a dict with either
+            "tool_calls" (list of {"name", "arguments"}) or "missing_slot" ("email" or "order_number")
+        """
+        entities = self.extract(text)
+        slots = self.get_slots(session_id)
+
+        # Always remember what the customer told us, even if the LLM handles the turn
+        if entities["emails"]:
+            slots["email"] = entities["emails"][-1]
+        if entities["order_numbers"]:
+            slots["pending_orders"] = entities["order_numbers"]
+
+        has_entities = entities["emails"] or entities["order_numbers"] or entities["skus"]
+        if not has_entities or not entities["structured_only"]:
+            # With both slots filled the LLM will run the lookup itself
+            if slots["email"] and slots.get("pending_orders"):
+                slots["pending_orders"] = []
+            self.turns_deferred += 1
+            return None
+
+        tool_calls: List[Dict[str, Any]] = []
+        pending_orders = slots.get("pending_orders") or []
+        if pending_orders and slots["email"]:
+            for order_number in pending_orders:
+                tool_calls.append({
+                    "name": "check_order_status",
+                    "arguments": {"email": slots["email"], "order_number": order_number},
+                })
+            slots["pending_orders"] = []
+        for sku in entities["skus"]:
+            tool_calls.append({"name": "check_product_availability", "arguments": {"product_query": sku}})
+
+        self.turns_routed += 1
+        if tool_calls:
+            self.llm_calls_saved += LLM_CALLS_SAVED_PER_TOOL_TURN
+            logger.info("[%s] Fast path resolved %s tool call(s) without the LLM", session_id, len(tool_calls))
+            return {"tool_calls": tool_calls}
+
+        self.llm_calls_saved += LLM_CALLS_SAVED_PER_PROMPT_TURN
+        missing_slot = "order_number" if slots["email"] else "email"
+        logger.info("[%s] Fast path asking for missing slot: %s", session_id, missing_slot)
+        return {"missing_slot": missing_slot, "slots": dict(slots)}
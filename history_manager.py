@@ -0,0 +1,241 @@
+"""
+Sierra Outfitters History Manager
+
+Keeps the conversation history sent to the model within a token budget.
+Old tool exchanges are dropped first, then the oldest turns, while verified
+facts (email, orders, products looked up) are kept as a compact session
+memory message.
+"""
+
+import importlib.util
+import json
+import logging
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Loaded on first use: building the tiktoken encoding is one of the slowest steps of a cold start
+_ENCODING = None
+_encoding_loaded = False
+
+MEMORY_PREFIX = "Session memory (verified earlier in this conversation):"
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def _get_encoding():
+    global _ENCODING, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding("o200k_base")
+        except Exception:  # tiktoken is optional; fall back to a character estimate
+            _ENCODING = None
+        _encoding_loaded = True
+    return _ENCODING
+
+
+def tokenizer_name() -> str:
+    """ Tokenizer count_text_tokens() uses, without loading it """
+    return "o200k_base" if importlib.util.find_spec("tiktoken") else "chars/4"
+
+
+def count_text_tokens(text: str) -> int:
+    """ Count tokens in a string locally (tiktoken when installed, else ~4 chars per token) """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def count_message_tokens(message: Dict[str, Any]) -> int:
+    """ Approximate prompt tokens used by one chat message """
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_text_tokens(message.get("content") or "")
+    if message.get("tool_calls"):
+        tokens += count_text_tokens(json.dumps(message["tool_calls"]))
+    return tokens
+
+
+def _is_tool_exchange(message: Dict[str, Any]) -> bool:
+    """ True for assistant tool-call messages and tool result messages """
+    return message.get("role") == "tool" or (message.get("role") == "assistant" and bool(message.get("tool_calls")))
+
+
+def is_memory_message(message: Dict[str, Any]) -> bool:
+    return message.get("role") == "system" and (message.get("content") or "").startswith(MEMORY_PREFIX)
+
+
+class HistoryManager:
+    """ Compacts per-session conversation histories to a token budget """
+
+    def __init__(self, token_budget: int, keep_recent_turns: int = 3):
+        """ Initialize the history manager
+
+        Args:
+            token_budget: Max tokens of history sent with each request
+            keep_recent_turns: Most recent user turns kept verbatim, tool exchanges included
+        """
+        self.token_budget = token_budget
+        self.keep_recent_turns = max(1, keep_recent_turns)
+        self.states: Dict[str, Dict[str, Any]] = {}
+
+    def clear_session(self, session_id: str):
+        """ Forget the structured state held for a session """
+        self.states.pop(session_id, None)
+
+    def count_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """ Count prompt tokens for a list of chat messages """
+        return sum(count_message_tokens(message) for message in messages)
+
+    # ======== Structured Session State ========
+
+    def remember(self, messages: List[Dict[str, Any]], state: Dict[str, Any]):
+        """ Fold verified facts from messages about to be dropped into a session's state """
+        state.setdefault("orders", {})
+        state.setdefault("products", {})
+        self._remember_facts(messages, state)
+        # The facts now only survive as the memory message
+        state["compacted"] = True
+
+    def verified_email(self, history: List[Dict[str, Any]], session_id: str = "default") -> Optional[str]:
+        """ Email of the order most recently confirmed (email and order number) in a session, or None """
+        state = {"orders": {}, "products": {}}
+        self._remember_facts(history, state)
+        return state.get("email") or self.states.get(session_id, {}).get("email")
+
+    def _remember_facts(self, messages: List[Dict[str, Any]], state: Dict[str, Any]):
+        """ Pull verified slots out of tool exchanges before they can be dropped """
+        call_arguments = {}
+        for message in messages:
+            for tool_call in message.get("tool_calls") or []:
+                try:
+                    call_arguments[tool_call["id"]] = json.loads(tool_call["function"]["arguments"] or "{}")
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+            if message.get("role") != "tool":
+                continue
+            try:
+                result = json.loads(message.get("content") or "{}")
+            except ValueError:
+                continue
+            if not result.get("success"):
+                continue
+
+            if message.get("name") == "check_order_status":
+                arguments = call_arguments.get(message.get("tool_call_id"), {})
+                if arguments.get("email"):
+                    state["email"] = arguments["email"]
+                state["customer_name"] = result.get("customer_name")
+                order_number = arguments.get("order_number", "")
+                if order_number:
+                    order_number = "#" + order_number.lstrip("#").upper()
+                    state["orders"][order_number] = result.get("status")
+            elif message.get("name") == "check_product_availability":
+                state["products"][result.get("sku")] = {
+                    "name": result.get("product_name"),
+                    "inventory": result.get("inventory"),
+                }
+            elif message.get("name") == "check_order_status_batch":
+                requested = call_arguments.get(message.get("tool_call_id"), {}).get("orders")
+                requested = requested if isinstance(requested, list) else []
+                for i, item in enumerate(result.get("results") or []):
+                    if not item.get("success"):
+                        continue
+                    # Results are in request order
+                    entry = requested[i] if i < len(requested) and isinstance(requested[i], dict) else {}
+                    if entry.get("email"):
+                        state["email"] = entry["email"]
+                    state["customer_name"] = item.get("customer_name")
+                    state["orders"][item.get("order_number")] = item.get("status")
+                    for product in item.get("products") or []:
+                        if product.get("product_name"):
+                            state["products"][product["sku"]] = {
+                                "name": product["product_name"],
+                                "inventory": product["inventory"],
+                            }
+            elif message.get("name") == "check_product_availability_batch":
+                for item in result.get("results") or []:
+                    if item.get("success"):
+                        state["products"][item.get("sku")] = {
+                            "name": item.get("product_name"),
+                            "inventory": item.get("inventory"),
+                        }
+            elif message.get("name") == "generate_discount_code":
+                state["discount_code"] = result.get("discount_code")
+
+    @staticmethod
+    def _memory_message(state: Dict[str, Any]) -> Dict[str, Any]:
+        """ Render structured session state as one compact system message """
+        facts = []
+        if state.get("customer_name"):
+            facts.append(f"customer={state['customer_name']}")
+        if state.get("email"):
+            facts.append(f"email={state['email']}")
+        if state["orders"]:
+            facts.append("orders=" + ", ".join(f"{number} ({status})" for number, status in state["orders"].items()))
+        if state["products"]:
+            facts.append("products=" + ", ".join(
+                f"{product['name']} [{sku}] inventory {product['inventory']}" for sku, product in state["products"].items()
+            ))
+        if state.get("discount_code"):
+            facts.append(f"discount_code={state['discount_code']}")
+        return {"role": "system", "content": f"{MEMORY_PREFIX} " + "; ".join(facts)}
+
+    # ======== Compaction ========
+
+    @staticmethod
+    def _split_turns(messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """ Group messages into turns, each starting at a user message """
+        turns: List[List[Dict[str, Any]]] = []
+        for message in messages:
+            if message.get("role") == "user" or not turns:
+                turns.append([])
+            turns[-1].append(message)
+        return turns
+
+    def compact(self, history: List[Dict[str, Any]], session_id: str = "default") -> int:
+        """ Compact a history in place so it fits the token budget
+
+        Tool-call/tool message pairs are only ever dropped together, and the
+        current turn is always kept whole.
+
+        Returns:
+            Token count of the compacted history
+        """
+        state = self.states.setdefault(session_id, {"orders": {}, "products": {}, "compacted": False})
+        messages = [message for message in history if not is_memory_message(message)]
+        self._remember_facts(messages, state)
+
+        tokens = self.count_tokens(messages)
+        if tokens > self.token_budget:
+            turns = self._split_turns(messages)
+            recent = turns[-self.keep_recent_turns:]
+            older = [[m for m in turn if not _is_tool_exchange(m)] for turn in turns[:-self.keep_recent_turns]]
+
+            older_tokens = [self.count_tokens(turn) for turn in older]
+            recent_tokens = [self.count_tokens(turn) for turn in recent]
+            while older and sum(older_tokens) + sum(recent_tokens) > self.token_budget:
+                older.pop(0)
+                older_tokens.pop(0)
+
+            # Still over budget: strip tool exchanges from recent turns, oldest first, sparing the current one
+            for index in range(len(recent) - 1):
+                if sum(older_tokens) + sum(recent_tokens) <= self.token_budget:
+                    break
+                recent[index] = [m for m in recent[index] if not _is_tool_exchange(m)]
+                recent_tokens[index] = self.count_tokens(recent[index])
+
+            messages = [message for turn in older + recent for message in turn]
+            tokens = sum(older_tokens) + sum(recent_tokens)
+            state["compacted"] = True
+            logger.info("[%s] Compacted history to %s messages (~%s tokens)", session_id, len(messages), tokens)
+
+        if state["compacted"] and (state.get("email") or state["orders"] or state["products"]):
+            memory = self._memory_message(state)
+            messages = [memory] + messages
+            tokens += count_message_tokens(memory)
+
+        history[:] = messages
+        return tokens
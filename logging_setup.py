@@ -0,0 +1,149 @@
+"""
+Sierra Outfitters Logging Setup
+
+Keeps logging off the request path:
+- records are handed to a bounded queue and written by a background
+  listener thread; when the queue is full, records are dropped instead of
+  blocking a turn
+- messages use %-style arguments and are only formatted by the writer thread
+- the log file is rotated by size
+- high-volume INFO events are sampled per message template: each template
+  logs a burst per window, then one in every N records
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Any, Optional
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_listener: Optional[QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+class InfoSamplingFilter(logging.Filter):
+    """ Samples INFO and DEBUG records per message template; warnings and errors always pass """
+
+    def __init__(self, burst: int, every: int, window: float):
+        """ Configure sampling
+
+        Args:
+            burst: Records of one template logged in full per window
+            every: Beyond the burst, keep one record in every `every`
+            window: Seconds after which each template's burst is reset
+        """
+        super().__init__()
+        self.burst = burst
+        self.every = max(1, every)
+        self.window = window
+        self._window_start = time.monotonic()
+        # Counts are updated without a lock; an occasional lost increment only shifts sampling
+        self._counts: Dict[Any, int] = {}
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or self.every == 1:
+            return True
+        now = time.monotonic()
+        if now - self._window_start > self.window:
+            self._window_start = now
+            self._counts = {}
+        # With lazy formatting the unformatted template identifies the event type
+        key = (record.name, record.msg)
+        count = self._counts.get(key, 0) + 1
+        self._counts[key] = count
+        if count <= self.burst or (count - self.burst) % self.every == 0:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """ Queue handler that never formats on the calling thread and drops records when the queue is full """
+
+    def __init__(self, record_queue: queue.SimpleQueue, max_size: int):
+        super().__init__(record_queue)
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in this process, so the record can cross as-is and be formatted there
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        # SimpleQueue is unbounded but much cheaper to put to than Queue; the size check bounds it
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+def configure_logging(config: Dict[str, Any], log_file: Optional[str] = None, force: bool = False):
+    """ Install the root logging handlers described by CONFIG (once per process unless forced)
+
+    Args:
+        log_file: Overrides CONFIG['LOG_FILE'] (e.g. one file per server worker, so rotation never races)
+        force: Replace handlers already installed, e.g. ones inherited by a forked worker
+    """
+    global _listener
+    with _configure_lock:
+        root = logging.getLogger()
+        if root.handlers and not force:
+            return
+        _stop_listener()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+
+        file_handler = RotatingFileHandler(
+            log_file or config['LOG_FILE'],
+            maxBytes=config['LOG_MAX_BYTES'],
+            backupCount=config['LOG_BACKUP_COUNT'],
+            encoding="utf-8"
+        )
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+
+        if config['LOG_QUEUE_ENABLED']:
+            record_queue = queue.SimpleQueue()
+            handler = NonBlockingQueueHandler(record_queue, config['LOG_QUEUE_SIZE'])
+            _listener = QueueListener(record_queue, file_handler)
+            _listener.start()
+        else:
+            handler = file_handler
+        handler.addFilter(InfoSamplingFilter(
+            config['LOG_SAMPLE_BURST'], config['LOG_SAMPLE_EVERY'], config['LOG_SAMPLE_WINDOW_SECONDS']
+        ))
+        root.addHandler(handler)
+        root.setLevel(config['LOG_LEVEL'])
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def stop_logging():
+    """ Flush queued records to the log file and stop the writer thread """
+    with _configure_lock:
+        _stop_listener()
+
+
+def _reset_after_fork():
+    global _listener, _configure_lock
+    # The writer thread does not survive fork; the child installs its own with configure_logging(force=True)
+    _listener = None
+    _configure_lock = threading.Lock()
+
+
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_reset_after_fork)
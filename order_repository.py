@@ -0,0 +1,258 @@
+"""
+Sierra Outfitters Order Repository
+
+Hash-indexed store for customer orders so status lookups stay constant-time
+as the order table grows.
+"""
+
+import logging
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Overlay entries at which a copy folds them into a new base, as a share of the base size
+_FOLD_RATIO = 0.125
+_FOLD_MIN = 1024
+
+_MISSING = object()
+_REMOVED = object()
+
+
+def normalize_email(email: str) -> str:
+    """ Normalize an email address for index lookups """
+    return (email or "").strip().lower()
+
+
+def normalize_order_number(order_number: str) -> str:
+    """ Normalize an order number (adds the # prefix, uppercases) for index lookups """
+    order_number = (order_number or "").strip()
+    if order_number and not order_number.startswith("#"):
+        order_number = "#" + order_number
+    return order_number.upper()
+
+
+class LayeredMap:
+    """ Mapping over a shared base dict that is never mutated, plus a small private overlay of changes
+
+    copy() shares the base and copies only the overlay, so copy-on-write
+    batch updates cost the size of the recent changes rather than of the
+    whole map. A copy folds the overlay into a new base once it passes a
+    share of the base size, which keeps lookups at two dict probes at most.
+    """
+
+    __slots__ = ("_base", "_overlay", "_size")
+
+    def __init__(self, base: Optional[Dict] = None):
+        self._base = base if base is not None else {}
+        self._overlay: Dict = {}
+        self._size = len(self._base)
+
+    def get(self, key, default=None):
+        value = self._overlay.get(key, _MISSING)
+        if value is _MISSING:
+            return self._base.get(key, default)
+        return default if value is _REMOVED else value
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._size += 1
+        self._overlay[key] = value
+
+    def pop(self, key, default=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        if key in self._base:
+            self._overlay[key] = _REMOVED
+        else:
+            del self._overlay[key]
+        self._size -= 1
+        return value
+
+    def __delitem__(self, key):
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def values(self) -> Iterator:
+        return (value for _, value in self.items())
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        overlay = self._overlay
+        for key, value in self._base.items():
+            if key not in overlay:
+                yield key, value
+        for key, value in overlay.items():
+            if value is not _REMOVED:
+                yield key, value
+
+    def copy(self) -> "LayeredMap":
+        """ Independent copy sharing the base """
+        clone = LayeredMap.__new__(LayeredMap)
+        clone._size = self._size
+        if len(self._overlay) >= max(_FOLD_MIN, len(self._base) * _FOLD_RATIO):
+            base = dict(self._base)
+            for key, value in self._overlay.items():
+                if value is _REMOVED:
+                    del base[key]
+                else:
+                    base[key] = value
+            clone._base, clone._overlay = base, {}
+        else:
+            clone._base, clone._overlay = self._base, dict(self._overlay)
+        return clone
+
+    def freeze(self):
+        """ Make every entry part of the base; only safe while no copy or reader shares this map """
+        if not self._base:
+            # Only entries of the base are ever marked removed, so the overlay is a plain dict here
+            self._base, self._overlay = self._overlay, {}
+        elif self._overlay:
+            self._base, self._overlay = dict(self.items()), {}
+
+
+class OrderRepository:
+    """ In-memory order store with a primary (email, order number) index
+    and secondary indexes by email and by tracking number """
+
+    def __init__(self, orders: Optional[Iterable[Dict[str, Any]]] = None):
+        """ Build the indexes from an iterable of order records """
+        # Layered so batch updates copy only recent changes (see copy())
+        self._orders = LayeredMap()
+        # Per-email key tuples are replaced, never mutated, so copies can share them
+        self._by_email = LayeredMap()
+        self._by_tracking = LayeredMap()
+        if orders:
+            for order in orders:
+                self.upsert(order)
+            for index in (self._orders, self._by_email, self._by_tracking):
+                index.freeze()
+        logger.debug(f"Order repository built with {len(self._orders)} orders")
+
+    @staticmethod
+    def _key(order: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """ Primary key for an order record, or None when it has no email or order number """
+        email, order_number = order.get("Email"), order.get("OrderNumber")
+        normalized_email = normalize_email(email)
+        normalized_order_number = normalize_order_number(order_number)
+        if not normalized_email or not normalized_order_number:
+            return None
+        # Reuse the record's own strings when already normalized so keys add no copies
+        return (email if normalized_email == email else normalized_email,
+                order_number if normalized_order_number == order_number else normalized_order_number)
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def copy(self) -> "OrderRepository":
+        """ Independent copy for copy-on-write batch updates
+
+        Records and the index bases are shared; only the changes since the
+        last fold are copied.
+        """
+        clone = OrderRepository()
+        clone._orders = self._orders.copy()
+        clone._by_email = self._by_email.copy()
+        clone._by_tracking = self._by_tracking.copy()
+        return clone
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._orders.values())
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        email, order_number = key
+        return (normalize_email(email), normalize_order_number(order_number)) in self._orders
+
+    # ======== Lookups ========
+
+    def get(self, email: str, order_number: str) -> Optional[Dict[str, Any]]:
+        """ Return the order matching the email and order number, or None """
+        return self._orders.get((normalize_email(email), normalize_order_number(order_number)))
+
+    def find_by_email(self, email: str) -> List[Dict[str, Any]]:
+        """ Return every order placed with the given email """
+        keys = self._by_email.get(normalize_email(email), ())
+        return [self._orders[key] for key in keys]
+
+    def find_by_tracking_number(self, tracking_number: str) -> Optional[Dict[str, Any]]:
+        """ Return the order shipped with the given tracking number, or None """
+        key = self._by_tracking.get((tracking_number or "").strip().upper())
+        return self._orders.get(key) if key else None
+
+    # ======== Incremental Updates ========
+
+    def upsert(self, order: Dict[str, Any]) -> bool:
+        """ Insert a new order or replace an existing one
+
+        Returns:
+            True if the order was newly inserted, False if it replaced an existing record
+            or was skipped for having no email or order number
+        """
+        key = self._key(order)
+        if key is None:
+            logger.warning("Skipping order without an email or order number: %r", order)
+            return False
+        previous = self._orders.get(key)
+        if previous is not None:
+            self._unindex_tracking(previous, key)
+        else:
+            self._by_email[key[0]] = self._by_email.get(key[0], ()) + (key,)
+
+        self._orders[key] = order
+        tracking_number = order.get("TrackingNumber")
+        if tracking_number:
+            self._by_tracking[tracking_number.strip().upper()] = key
+        return previous is None
+
+    def update(self, email: str, order_number: str, **fields) -> Optional[Dict[str, Any]]:
+        """ Update fields (e.g. Status, TrackingNumber) of an existing order
+
+        Returns:
+            The updated order record, or None if the order does not exist
+        """
+        order = self.get(email, order_number)
+        if order is None:
+            logger.warning(f"Cannot update missing order for email: {email}, order: {order_number}")
+            return None
+        updated = dict(order)
+        updated.update(fields)
+        if self._key(updated) is None:
+            logger.warning("Cannot clear the email or order number of order %s for %s", order_number, email)
+            return None
+        if self._key(updated) != self._key(order):
+            self.remove(email, order_number)
+        self.upsert(updated)
+        return updated
+
+    def remove(self, email: str, order_number: str) -> Optional[Dict[str, Any]]:
+        """ Remove an order from every index and return it """
+        key = (normalize_email(email), normalize_order_number(order_number))
+        order = self._orders.pop(key, None)
+        if order is None:
+            return None
+        self._unindex_tracking(order, key)
+        keys = tuple(k for k in self._by_email.get(key[0], ()) if k != key)
+        if keys:
+            self._by_email[key[0]] = keys
+        else:
+            self._by_email.pop(key[0], None)
+        return order
+
+    def _unindex_tracking(self, order: Dict[str, Any], key: Tuple[str, str]):
+        """ Drop an order's tracking number from the secondary index """
+        tracking_number = order.get("TrackingNumber")
+        if tracking_number:
+            tracking_key = tracking_number.strip().upper()
+            if self._by_tracking.get(tracking_key) == key:
+                del self._by_tracking[tracking_key]
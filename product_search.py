@@ -0,0 +1,377 @@
+"""
+Sierra Outfitters Product Search Engine
+
+Ranked, typo-tolerant product lookup built once at load time:
+- exact SKU index
+- token inverted index over name, tags and description with BM25 scoring
+- trigram index over the vocabulary to resolve misspelled query terms of
+  FUZZY_MIN_LENGTH or more letters
+- a product is returned only when it matches MIN_MATCHED_TERM_SHARE of the
+  query terms and scores at least min_score, so chat words that happen to
+  appear in a description ("where", "stock") do not produce a match
+
+Replaced and removed products are tombstoned; once tombstones pass
+COMPACT_TOMBSTONE_RATIO of the index, compacted() rebuilds it without them.
+"""
+
+import bisect
+import heapq
+import logging
+import math
+import re
+from collections import Counter
+from typing import Dict, Any, List, Optional, Iterable, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+# Field weights applied to term frequencies (BM25F-style)
+FIELD_WEIGHTS = {"name": 3.0, "tags": 2.0, "description": 1.0}
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "any", "are", "do", "for", "have", "i", "in", "is", "it", "me",
+    "my", "of", "on", "or", "some", "something", "the", "to", "with", "you", "your",
+    # Conversational words customers wrap product names in
+    "about", "also", "am", "at", "available", "availability", "be", "buy", "can", "check", "could",
+    "does", "get", "got", "hello", "here", "hey", "hi", "how", "if", "know", "like", "looking", "many",
+    "much", "need", "not", "now", "order", "orders", "please", "sell", "stock", "still", "that", "there",
+    "these", "they", "this", "those", "want", "was", "we", "what", "when", "where", "which", "who",
+    "will", "would", "yes",
+})
+
+# Shortest query token expanded to fuzzy matches; shorter typos are too ambiguous ("tent" -> "tenth")
+FUZZY_MIN_LENGTH = 5
+
+# Share of the query terms (at least one) a product must match to be returned
+MIN_MATCHED_TERM_SHARE = 0.5
+
+# Default minimum BM25 score of a returned product; only terms found in nearly every product score lower
+MIN_SCORE = 0.25
+
+# Share of tombstoned documents at which an engine should be compacted
+COMPACT_TOMBSTONE_RATIO = 0.25
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_POSSESSIVE_RE = re.compile(r"['’]s\b")
+
+
+def tokenize(text: str) -> List[str]:
+    """ Lowercase, drop possessives and split text into search tokens """
+    text = _POSSESSIVE_RE.sub("", (text or "").lower())
+    return [token for token in _TOKEN_RE.findall(text) if token not in STOPWORDS]
+
+
+def trigrams(token: str) -> set:
+    """ Boundary-padded character trigrams of a token """
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def weighted_terms(product: Dict[str, Any]) -> Dict[str, float]:
+    """ Field-weighted term frequencies for a product record """
+    terms: Dict[str, float] = {}
+    fields = {
+        "name": product.get("ProductName", ""),
+        "tags": " ".join(product.get("Tags") or []),
+        "description": product.get("Description", ""),
+    }
+    for field, text in fields.items():
+        weight = FIELD_WEIGHTS[field]
+        for token in tokenize(text):
+            terms[token] = terms.get(token, 0.0) + weight
+    return terms
+
+
+def relevant(scores: Dict[int, float], matched: Counter, token_count: int,
+             min_score: float) -> Dict[int, float]:
+    """ Keep documents that match enough of the query terms and score at least min_score
+
+    Args:
+        scores: Document id -> summed score
+        matched: Document id -> number of distinct query terms it matched
+        token_count: Distinct query terms
+    """
+    required = max(1, math.ceil(MIN_MATCHED_TERM_SHARE * token_count))
+    return {doc_id: score for doc_id, score in scores.items() if matched[doc_id] >= required and score >= min_score}
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], top_k: int, k: int = 60) -> List[Tuple[str, float]]:
+    """ Merge ranked key lists by summing 1 / (k + rank); ties keep the order of first appearance """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])[:top_k]
+
+
+def bm25_impacts(terms: Dict[str, float], doc_freq: Callable[[str], int], doc_count: int,
+                 avg_length: float, k1: float = 1.2, b: float = 0.75) -> Dict[str, float]:
+    """ BM25 contribution of each term of one document, given collection statistics """
+    length_norm = k1 * (1 - b + b * sum(terms.values()) / (avg_length or 1.0))
+    impacts = {}
+    for token, tf in terms.items():
+        df = doc_freq(token)
+        idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+        impacts[token] = idf * tf * (k1 + 1) / (tf + length_norm)
+    return impacts
+
+
+class FuzzyVocabulary:
+    """ Trigram index over vocabulary terms for resolving misspelled query terms """
+
+    def __init__(self, terms: Iterable[str] = (), threshold: float = 0.4, max_expansions: int = 3):
+        self.threshold = threshold
+        self.max_expansions = max_expansions
+        self._index: Dict[str, set] = {}
+        # Grams whose term sets may be shared with another copy (copy-on-write)
+        self._shared: set = set()
+        for term in terms:
+            self.add(term)
+
+    def copy(self) -> "FuzzyVocabulary":
+        clone = FuzzyVocabulary(threshold=self.threshold, max_expansions=self.max_expansions)
+        clone._index = dict(self._index)
+        clone._shared = set(self._index)
+        self._shared = set(self._index)
+        return clone
+
+    def add(self, term: str):
+        for gram in trigrams(term):
+            if gram in self._shared:
+                self._index[gram] = set(self._index[gram])
+                self._shared.discard(gram)
+            self._index.setdefault(gram, set()).add(term)
+
+    def expand(self, token: str) -> List[Tuple[str, float]]:
+        """ Vocabulary terms similar to token, best first, as (term, similarity) """
+        if len(token) < FUZZY_MIN_LENGTH:
+            return []
+        query_grams = trigrams(token)
+        shared: Counter = Counter()
+        for gram in query_grams:
+            shared.update(self._index.get(gram, ()))
+
+        candidates = []
+        for candidate, overlap in shared.items():
+            similarity = overlap / (len(query_grams) + len(trigrams(candidate)) - overlap)
+            if similarity >= self.threshold:
+                candidates.append((candidate, similarity))
+        candidates.sort(key=lambda item: (-item[1], item[0]))
+        return candidates[:self.max_expansions]
+
+
+class ProductSearchEngine:
+    """ Inverted-index product search with BM25 ranking and fuzzy term matching """
+
+    def __init__(self, products: Optional[Iterable[Dict[str, Any]]] = None,
+                 k1: float = 1.2, b: float = 0.75,
+                 max_postings: int = 1000, fuzzy_threshold: float = 0.4, fuzzy_expansions: int = 3,
+                 min_score: float = MIN_SCORE):
+        """ Build the search indexes
+
+        Args:
+            products: Iterable of product catalog records
+            k1, b: BM25 saturation and length-normalization parameters
+            max_postings: Max impact-ordered postings scanned per query term
+            fuzzy_threshold: Min trigram Jaccard similarity for a fuzzy term match
+            fuzzy_expansions: Max vocabulary terms a misspelled query term expands to
+            min_score: Min score of a returned product
+        """
+        self.k1 = k1
+        self.b = b
+        self.max_postings = max_postings
+        self.min_score = min_score
+        self.fuzzy_threshold = fuzzy_threshold
+        self.fuzzy_expansions = fuzzy_expansions
+
+        self.products: List[Optional[Dict[str, Any]]] = []
+        self._sku_index: Dict[str, int] = {}
+        # token -> postings sorted by descending impact, stored as (-impact, doc_id)
+        self._postings: Dict[str, List[Tuple[float, int]]] = {}
+        self._doc_freq: Counter = Counter()
+        self.vocabulary = FuzzyVocabulary(threshold=fuzzy_threshold, max_expansions=fuzzy_expansions)
+        self._total_length = 0.0
+        self._live_docs = 0
+        # Tombstoned documents (see compacted())
+        self._dead_docs = 0
+        # Terms whose postings lists may be shared with another copy (copy-on-write)
+        self._shared_postings: set = set()
+
+        if products:
+            self._build(products)
+
+    def __len__(self) -> int:
+        return self._live_docs
+
+    def copy(self) -> "ProductSearchEngine":
+        """ Independent copy for copy-on-write batch updates
+
+        Containers are copied shallowly; a postings list is only duplicated
+        when one of the two engines first writes to it, so a copy costs
+        O(products + vocabulary) pointer copies rather than a rebuild.
+        """
+        clone = ProductSearchEngine(k1=self.k1, b=self.b, max_postings=self.max_postings,
+                                    fuzzy_threshold=self.fuzzy_threshold, fuzzy_expansions=self.fuzzy_expansions,
+                                    min_score=self.min_score)
+        clone.products = list(self.products)
+        clone._sku_index = dict(self._sku_index)
+        clone._postings = dict(self._postings)
+        clone._doc_freq = Counter(self._doc_freq)
+        clone.vocabulary = self.vocabulary.copy()
+        clone._total_length = self._total_length
+        clone._live_docs = self._live_docs
+        clone._dead_docs = self._dead_docs
+        clone._shared_postings = set(self._postings)
+        self._shared_postings = set(self._postings)
+        return clone
+
+    # ======== Index Construction ========
+
+    def _build(self, products: Iterable[Dict[str, Any]]):
+        """ Bulk-build every index in two passes (statistics, then impacts) """
+        # Term vectors are only held for the duration of the build
+        doc_terms: List[Dict[str, float]] = []
+        for product in products:
+            doc_id = len(self.products)
+            self.products.append(product)
+            self._sku_index[product["SKU"].upper()] = doc_id
+            terms = weighted_terms(product)
+            doc_terms.append(terms)
+            self._total_length += sum(terms.values())
+            self._doc_freq.update(terms.keys())
+            self._live_docs += 1
+
+        postings: Dict[str, List[Tuple[float, int]]] = {}
+        for doc_id, terms in enumerate(doc_terms):
+            for token, impact in self._impacts(terms).items():
+                postings.setdefault(token, []).append((-impact, doc_id))
+        for token, entries in postings.items():
+            entries.sort()
+            self.vocabulary.add(token)
+        self._postings = postings
+        logger.info(f"Product search index built: {self._live_docs} products, {len(postings)} terms")
+
+    @property
+    def avg_length(self) -> float:
+        return self._total_length / self._live_docs if self._live_docs else 1.0
+
+    def _impacts(self, terms: Dict[str, float]) -> Dict[str, float]:
+        """ Precomputed BM25 contribution of each term in a document """
+        return bm25_impacts(terms, self._doc_freq.__getitem__, self._live_docs, self.avg_length, self.k1, self.b)
+
+    # ======== Incremental Updates ========
+
+    def upsert(self, product: Dict[str, Any]):
+        """ Insert or replace a product; re-indexes text only when it changed """
+        sku = product["SKU"].upper()
+        doc_id = self._sku_index.get(sku)
+        terms = weighted_terms(product)
+
+        if doc_id is not None:
+            if weighted_terms(self.products[doc_id]) == terms:
+                # Non-text change (e.g. Inventory): swap the record in place
+                self.products[doc_id] = product
+                return
+            self._retire(doc_id)
+
+        doc_id = len(self.products)
+        self.products.append(product)
+        self._sku_index[sku] = doc_id
+        self._total_length += sum(terms.values())
+        self._doc_freq.update(terms.keys())
+        self._live_docs += 1
+        for token, impact in self._impacts(terms).items():
+            entries = self._postings.get(token)
+            if entries is None:
+                self._postings[token] = entries = []
+                self.vocabulary.add(token)
+            elif token in self._shared_postings:
+                self._postings[token] = entries = list(entries)
+                self._shared_postings.discard(token)
+            bisect.insort(entries, (-impact, doc_id))
+
+    def remove(self, sku: str) -> Optional[Dict[str, Any]]:
+        """ Remove a product by SKU and return it """
+        doc_id = self._sku_index.pop(sku.upper(), None)
+        if doc_id is None:
+            return None
+        product = self.products[doc_id]
+        self._retire(doc_id)
+        return product
+
+    def _retire(self, doc_id: int):
+        """ Tombstone a document; its stale postings are skipped at query time """
+        terms = weighted_terms(self.products[doc_id])
+        self._total_length -= sum(terms.values())
+        self._doc_freq.subtract(terms.keys())
+        self.products[doc_id] = None
+        self._live_docs -= 1
+        self._dead_docs += 1
+
+    @property
+    def needs_compaction(self) -> bool:
+        """ Whether tombstones have passed COMPACT_TOMBSTONE_RATIO of the indexed documents """
+        return self._dead_docs > COMPACT_TOMBSTONE_RATIO * len(self.products)
+
+    def compacted(self) -> "ProductSearchEngine":
+        """ New engine over the live products, without tombstones or their postings
+
+        Document ids are reassigned, so the new engine is swapped in whole
+        rather than rebuilt in place under running queries.
+        """
+        logger.info("Compacting product search index: %d tombstones, %d live products",
+                    self._dead_docs, self._live_docs)
+        return ProductSearchEngine((product for product in self.products if product is not None),
+                                   k1=self.k1, b=self.b, max_postings=self.max_postings,
+                                   fuzzy_threshold=self.fuzzy_threshold, fuzzy_expansions=self.fuzzy_expansions,
+                                   min_score=self.min_score)
+
+    # ======== Queries ========
+
+    def get_by_sku(self, sku: str) -> Optional[Dict[str, Any]]:
+        """ Exact SKU lookup """
+        doc_id = self._sku_index.get((sku or "").strip().upper())
+        return self.products[doc_id] if doc_id is not None else None
+
+    def _expand_term(self, token: str) -> List[Tuple[str, float]]:
+        """ Resolve a query token to indexed terms with a match weight """
+        if token in self._postings:
+            return [(token, 1.0)]
+        return self.vocabulary.expand(token)
+
+    def iter_postings(self) -> Iterable[Tuple[str, List[Tuple[float, int]]]]:
+        """ Yield (term, [(impact, doc_id), ...]) for live documents, highest impact first """
+        products = self.products
+        for term, entries in self._postings.items():
+            live = [(-neg_impact, doc_id) for neg_impact, doc_id in entries if products[doc_id] is not None]
+            if live:
+                yield term, live
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[Dict[str, Any], float]]:
+        """ Return up to top_k (product, score) pairs ranked by relevance """
+        product = self.get_by_sku(query)
+        if product is not None:
+            return [(product, float("inf"))]
+
+        tokens = set(tokenize(query))
+        products = self.products
+        scores: Dict[int, float] = {}
+        get_score = scores.get
+        matched: Counter = Counter()
+        for token in tokens:
+            hits = set()
+            for term, weight in self._expand_term(token):
+                # Only live postings count towards max_postings
+                remaining = self.max_postings
+                for neg_impact, doc_id in self._postings[term]:
+                    if products[doc_id] is not None:
+                        scores[doc_id] = get_score(doc_id, 0.0) - neg_impact * weight
+                        hits.add(doc_id)
+                        remaining -= 1
+                        if not remaining:
+                            break
+            matched.update(hits)
+
+        scores = relevant(scores, matched, len(tokens), self.min_score)
+        # Ties break on catalog order so equal matches stay stable
+        best = heapq.nsmallest(top_k, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(self.products[doc_id], score) for doc_id, score in best]
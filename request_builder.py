@@ -0,0 +1,104 @@
+"""
+Sierra Outfitters Request Builder
+
+Builds chat completion request bodies so the prompt prefix stays byte-stable
+across calls and provider-side prompt caching can apply:
+- the system prompt is normalized and the tool schema (minus the unused
+  `return` blocks) is prepared once at startup and reused by every request
+- the session memory message, which changes as facts are verified, is
+  moved after the conversation so it never invalidates the cached history
+- each request reports its static (cacheable) and dynamic token counts
+
+Bodies are plain JSON-ready dicts posted as-is, skipping the SDK's
+per-call validation of every message and tool definition.
+"""
+
+import json
+import textwrap
+from typing import Dict, Any, List
+
+from history_manager import count_message_tokens, count_text_tokens, is_memory_message
+
+
+def trim_tool_schema(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """ Drop keys the API does not read (the documentation-only `return` blocks) from tool definitions """
+    trimmed = []
+    for tool in tools:
+        function = {key: value for key, value in tool["function"].items() if key != "return"}
+        trimmed.append({"type": tool["type"], "function": function})
+    return trimmed
+
+
+class ChatRequest:
+    """ One request body with its prompt token accounting """
+
+    __slots__ = ("body", "static_tokens", "dynamic_tokens")
+
+    def __init__(self, body: Dict[str, Any], static_tokens: int, dynamic_tokens: int):
+        self.body = body
+        self.static_tokens = static_tokens
+        self.dynamic_tokens = dynamic_tokens
+
+    @property
+    def prompt_tokens(self) -> int:
+        return self.static_tokens + self.dynamic_tokens
+
+
+class RequestBuilder:
+    """ Builds chat completion requests around a static prefix prepared once """
+
+    def __init__(self, system_prompt: str, tools: List[Dict[str, Any]], model: str):
+        """ Prepare the static prefix
+
+        Args:
+            system_prompt: System prompt; indentation and surrounding whitespace are removed
+            tools: Tool definitions as returned by define_tools()
+            model: Chat model name
+        """
+        self.model = model
+        self.system_message = {"role": "system", "content": textwrap.dedent(system_prompt).strip()}
+        self.tools = trim_tool_schema(tools)
+        # Serialized once: the exact bytes the tools contribute, for token accounting
+        self.tools_json = json.dumps(self.tools, separators=(",", ":"), ensure_ascii=False)
+        self.static_tokens = count_message_tokens(self.system_message) + count_text_tokens(self.tools_json)
+
+    def to_artifact(self) -> Dict[str, Any]:
+        """ The prepared prefix as a JSON-ready dict (see agent_artifacts) """
+        return {
+            "model": self.model,
+            "system_message": self.system_message,
+            "tools_json": self.tools_json,
+            "static_tokens": self.static_tokens,
+        }
+
+    @classmethod
+    def from_artifact(cls, artifact: Dict[str, Any]) -> "RequestBuilder":
+        """ Restore a prepared prefix without normalizing, serializing or counting tokens again """
+        builder = cls.__new__(cls)
+        builder.model = artifact["model"]
+        builder.system_message = artifact["system_message"]
+        builder.tools_json = artifact["tools_json"]
+        builder.tools = json.loads(builder.tools_json)
+        builder.static_tokens = artifact["static_tokens"]
+        return builder
+
+    def messages(self, history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """ System prompt, then the history with its session memory message moved last """
+        memory = [message for message in history if is_memory_message(message)]
+        if not memory:
+            return [self.system_message] + history
+        return [self.system_message] + [message for message in history if not is_memory_message(message)] + memory
+
+    def build(self, history: List[Dict[str, Any]], stream: bool = False) -> ChatRequest:
+        """ Request body for one model call over a conversation history """
+        body = {
+            "model": self.model,
+            "messages": self.messages(history),
+            "tools": self.tools,
+            "tool_choice": "auto",
+        }
+        if stream:
+            body["stream"] = True
+            body["stream_options"] = {"include_usage": True}
+        dynamic_tokens = sum(count_message_tokens(message) for message in history)
+        return ChatRequest(body, self.static_tokens, dynamic_tokens)
@@ -0,0 +1,427 @@
+"""
+Sierra Outfitters Resilient API Client
+
+Wraps the OpenAI client used for chat completion calls:
+- the client (and the SDK import behind it) is created on first use, so
+  startup never waits for it
+- a tuned HTTP connection pool (keep-alive, separate connect and read
+  timeouts), shared by every call of a process
+- one deadline per model call, bounding every attempt and backoff together
+- retries of transient failures (connection errors, timeouts, 408/409/429
+  and 5xx responses) with full-jitter exponential backoff, honoring Retry-After
+- optional hedging: when a non-streamed call has not answered after a delay,
+  an identical second request is sent and whichever answers first wins
+- a circuit breaker that fails calls immediately while the upstream keeps
+  failing, then lets a single probe through after a cool-down
+
+Streamed calls are retried only until the stream opens; once tokens have
+been yielded a failure is raised to the caller.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Optional, Callable, Tuple
+
+from telemetry import Telemetry
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = frozenset({408, 409, 429})
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpenError(Exception):
+    """ Raised without calling the API while the circuit breaker is open """
+
+
+def connection_limits(config: Dict[str, Any], max_connections: int = None) -> "httpx.Limits":
+    """ Connection pool limits for the HTTP client under the OpenAI client """
+    import httpx
+
+    return httpx.Limits(
+        max_connections=max_connections or config['OPENAI_MAX_CONNECTIONS'],
+        max_keepalive_connections=config['OPENAI_MAX_KEEPALIVE_CONNECTIONS'],
+        keepalive_expiry=config['OPENAI_KEEPALIVE_EXPIRY_SECONDS']
+    )
+
+
+def request_timeout(config: Dict[str, Any]) -> "httpx.Timeout":
+    """ Default per-attempt timeouts; a dead host fails on connect long before the read timeout """
+    import httpx
+
+    return httpx.Timeout(config['OPENAI_TIMEOUT_SECONDS'], connect=config['OPENAI_CONNECT_TIMEOUT_SECONDS'])
+
+
+def is_retryable(error: BaseException) -> bool:
+    """ True for failures worth another attempt: transport errors, timeouts, throttling and 5xx """
+    # Only reached once a request was attempted, so both are already imported
+    import httpx
+    import openai
+
+    if isinstance(error, openai.APIConnectionError):
+        # Includes APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+def _retry_after(error: BaseException) -> float:
+    """ Seconds the server asked us to wait (Retry-After header), 0 when absent """
+    response = getattr(error, "response", None)
+    if response is None:
+        return 0.0
+    try:
+        return max(0.0, float(response.headers.get("retry-after", 0)))
+    except ValueError:
+        # HTTP-date form; fall back to our own backoff
+        return 0.0
+
+
+class CircuitBreaker:
+    """ Consecutive-failure circuit breaker shared by every call of one client """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        """ Configure the breaker
+
+        Args:
+            failure_threshold: Consecutive failed attempts that open the circuit (0 disables it)
+            reset_seconds: Time the circuit stays open before a single probe call is let through
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+        self.opens = 0
+        self.rejected = 0
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if now - self._opened_at >= self.reset_seconds else "open"
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def allow(self) -> bool:
+        """ Whether a call may go out now; while half open, only one probe at a time """
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(now)
+            if state == "closed":
+                return True
+            # A probe abandoned mid-flight (e.g. a cancelled task) must not wedge the breaker
+            if state == "half_open" and (self._probe_started is None
+                                         or now - self._probe_started >= self.reset_seconds):
+                self._probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started = None
+
+    def record_failure(self):
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            if self._probe_started is not None:
+                # The probe failed: stay open for another cool-down
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+            elif self._opened_at is None and self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self.opens += 1
+                logger.warning("OpenAI circuit breaker opened after %s consecutive failures", self._failures)
+
+
+class _ResilientBase:
+    """ Retry, deadline and hedging policy shared by the sync and async clients """
+
+    def __init__(self, client_factory: Callable[[], Any], deadline_seconds: float, timeout_seconds: float,
+                 connect_timeout_seconds: float, max_retries: int = 3, backoff_base_seconds: float = 0.25,
+                 backoff_max_seconds: float = 4.0, hedge_after_seconds: Optional[float] = None,
+                 breaker: CircuitBreaker = None, seed: int = None):
+        """ Wrap an OpenAI client
+
+        Args:
+            client_factory: Creates the OpenAI or AsyncOpenAI client on first use; its own retries are bypassed
+            deadline_seconds: Time budget of one call across all attempts and backoff
+            timeout_seconds: Read timeout of a single attempt, cut down to what is left of the deadline
+            connect_timeout_seconds: Connect timeout of a single attempt
+            max_retries: Attempts after the first for retryable failures
+            backoff_base_seconds: Backoff cap of the first retry, doubled for each later one
+            backoff_max_seconds: Largest backoff cap
+            hedge_after_seconds: Send a second copy of a non-streamed call still pending after this
+                                 (None disables hedging)
+            breaker: Circuit breaker (a disabled one if omitted)
+            seed: Seed for backoff jitter
+        """
+        self._client_factory = client_factory
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._cast_to = None
+        self._stream_cls = None
+        self.deadline_seconds = deadline_seconds
+        self.timeout_seconds = timeout_seconds
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+        self.breaker = breaker or CircuitBreaker(0, 0)
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.errors = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def client(self):
+        """ The wrapped client, created on first use """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._cast_to, self._stream_cls = self._response_types()
+                    self._client = self._client_factory()
+        return self._client
+
+    @property
+    def created(self) -> bool:
+        return self._client is not None
+
+    @staticmethod
+    def _response_types() -> Tuple[type, type]:
+        """ Classes chat completion responses and streams are parsed into """
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "failures": self.failures,
+            "errors": self.errors,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "circuit_state": self.breaker.state,
+            "circuit_opens": self.breaker.opens,
+            "circuit_rejections": self.breaker.rejected,
+        }
+
+    def _options(self, deadline: float) -> Dict[str, Any]:
+        """ Request options for one attempt: no SDK retries, timeouts within the deadline """
+        import httpx
+
+        remaining = max(0.001, deadline - time.monotonic())
+        return {
+            "max_retries": 0,
+            "timeout": httpx.Timeout(
+                min(self.timeout_seconds, remaining),
+                connect=min(self.connect_timeout_seconds, remaining)
+            ),
+        }
+
+    def _admit(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError("OpenAI API circuit breaker is open; failing fast")
+        self.attempts += 1
+
+    def _retry_delay(self, error: Exception, attempt: int, deadline: float) -> Optional[float]:
+        """ Backoff before the next attempt, or None when the error should be raised """
+        if isinstance(error, CircuitOpenError):
+            return None
+        if not is_retryable(error):
+            # The upstream answered; only this request was rejected
+            self.breaker.record_success()
+            return None
+        self.failures += 1
+        self.breaker.record_failure()
+        if attempt >= self.max_retries:
+            return None
+        # Full jitter keeps clients that failed together from retrying together
+        cap = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        delay = max(self._random.uniform(0, cap), _retry_after(error))
+        if time.monotonic() + delay >= deadline:
+            return None
+        self.retries += 1
+        Telemetry.annotate(retries=attempt + 1)
+        logger.warning("Model call failed (%s), retry %s in %.2fs", type(error).__name__, attempt + 1, delay)
+        return delay
+
+
+class ResilientClient(_ResilientBase):
+    """ Resilient wrapper around a synchronous OpenAI client """
+
+    def __init__(self, client_factory: Callable[[], Any], *args, **kwargs):
+        super().__init__(client_factory, *args, **kwargs)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @staticmethod
+    def _response_types() -> Tuple[type, type]:
+        from openai import Stream
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+        return ChatCompletion, Stream[ChatCompletionChunk]
+
+    def post(self, path: str, *, body: Dict[str, Any], stream: bool = False):
+        """ Post a chat completion request with retries, hedging and circuit breaking, within the call deadline
+
+        Returns:
+            A ChatCompletion, or a Stream of ChatCompletionChunk when stream=True
+        """
+        self.calls += 1
+        client = self.client
+        deadline = time.monotonic() + self.deadline_seconds
+
+        def send() -> Any:
+            self._admit()
+            return client.post(path, body=body, cast_to=self._cast_to, options=self._options(deadline),
+                               stream=stream, stream_cls=self._stream_cls)
+
+        attempt = 0
+        while True:
+            try:
+                if self.hedge_after_seconds and not stream:
+                    result = self._hedged(send)
+                else:
+                    result = send()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    self.errors += 1
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    def _hedged(self, send: Callable[[], Any]) -> Any:
+        """ Run send(), starting a second copy if the first has not answered in time
+
+        The losing request cannot be interrupted from here; it finishes on its
+        executor thread and its response is discarded.
+        """
+        executor = self._get_executor()
+        first = executor.submit(send)
+        done, _ = wait([first], timeout=self.hedge_after_seconds)
+        if done or self.breaker.state != "closed":
+            return first.result()
+        self.hedges += 1
+        second = executor.submit(send)
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self.hedge_wins += 1
+                    return future.result()
+        return first.result()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="openai-hedge")
+            return self._executor
+
+    def close(self):
+        """ Stop the hedging threads and close the connection pool """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if self._client is not None:
+            self._client.close()
+
+
+class AsyncResilientClient(_ResilientBase):
+    """ Resilient wrapper around an AsyncOpenAI client """
+
+    @staticmethod
+    def _response_types() -> Tuple[type, type]:
+        from openai import AsyncStream
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+        return ChatCompletion, AsyncStream[ChatCompletionChunk]
+
+    async def post(self, path: str, *, body: Dict[str, Any], stream: bool = False):
+        """ Post a chat completion request with retries, hedging and circuit breaking, within the call deadline
+
+        Returns:
+            A ChatCompletion, or an AsyncStream of ChatCompletionChunk when stream=True
+        """
+        self.calls += 1
+        client = self.client
+        deadline = time.monotonic() + self.deadline_seconds
+
+        async def send() -> Any:
+            self._admit()
+            return await client.post(path, body=body, cast_to=self._cast_to, options=self._options(deadline),
+                                     stream=stream, stream_cls=self._stream_cls)
+
+        attempt = 0
+        while True:
+            try:
+                if self.hedge_after_seconds and not stream:
+                    result = await self._hedged(send)
+                else:
+                    result = await send()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    self.errors += 1
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def _hedged(self, send: Callable[[], Any]) -> Any:
+        """ Await send(), racing a second copy if the first has not answered in time; the loser is cancelled """
+        first = asyncio.ensure_future(send())
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after_seconds)
+            if done or self.breaker.state != "closed":
+                return await first
+            self.hedges += 1
+            second = asyncio.ensure_future(send())
+            tasks.append(second)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+            # Both failed: retrieve the second error so it is not reported as unhandled
+            second.exception()
+            return first.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
@@ -0,0 +1,235 @@
+"""
+Sierra Outfitters Response Templates
+
+Renders the final reply of a tool turn locally from the structured tool
+results, so common lookups skip the second model call. Each tool outcome
+has a bank of brand-voice templates; a per-tool policy decides which
+outcomes are rendered locally and which still go to the model for a rewrite.
+Results of the batch tools are rendered entry by entry, when the policy
+lists the batch tool itself.
+
+Only lookup-only turns are rendered: a user message with words beyond
+emails, order numbers and SKUs ("W002 arrived broken, I want a refund")
+always goes to the model, as do products found by search rather than by
+their exact SKU ("search_match"), which the model can qualify.
+"""
+
+import logging
+import random
+import threading
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from config import get_config
+from fast_path_router import FastPathRouter
+
+CONFIG = get_config()
+
+logger = logging.getLogger(__name__)
+
+LOW_STOCK_THRESHOLD = 10
+
+# Batch tools, and the single-item tool whose result shape each entry of their "results" has
+BATCH_TOOLS = {
+    "check_order_status_batch": "check_order_status",
+    "check_product_availability_batch": "check_product_availability",
+}
+# Appended to an order's reply when the result lists the order's products
+ORDER_ITEMS_KEY = ("check_order_status", "items")
+
+# (tool, outcome) -> templates, formatted with the fields from _fields()
+TEMPLATE_BANK: Dict[Tuple[str, str], List[str]] = {
+    ("check_order_status", "delivered"): [
+        "Summit reached, {name}! Your order {order_number} has been delivered. Your new gear is ready for the trail! 🏔️",
+        "Great news, {name}! Order {order_number} has made it to basecamp - it's been delivered. Time to gear up and head out! 🌲",
+        "{name}, your order {order_number} has arrived! Everything's delivered and ready for your next adventure. Onward into the unknown! 🏔️",
+    ],
+    ("check_order_status", "in-transit"): [
+        "Your order {order_number} is on the trail, {name}! It's in transit and making good time. {tracking} 🥾",
+        "Good news, {name}! Order {order_number} is in transit - moving like a hiker on a mission. {tracking} 🏔️",
+        "{name}, order {order_number} has left basecamp and is in transit to you. {tracking} The peaks are waiting! 🌄",
+    ],
+    ("check_order_status", "fulfilled"): [
+        "Hello {name}! Your order {order_number} is packed and ready to begin its journey. Onward into the unknown! 🏔️",
+        "{name}, order {order_number} has been fulfilled and is staged at the trailhead, ready to ship soon! 🎒",
+        "Trail update, {name}: order {order_number} is packed up and about to set out. Your adventure is getting closer! 🌲",
+    ],
+    ("check_order_status", "processing"): [
+        "Hi {name}! Your order {order_number} is being processed. The adventure awaits! 🏔️",
+        "{name}, order {order_number} is still being prepared at basecamp. We'll have it on the trail soon! ⛺",
+    ],
+    ORDER_ITEMS_KEY: [
+        "Packed in this order: {items}.",
+        "Here's what's in this order: {items}.",
+    ],
+    ("check_order_status", "not_found"): [
+        "I couldn't find that order. Can you double-check your email and order number? The mountain path is clearer with the right coordinates! 🏔️",
+        "Hmm, that order didn't turn up on my map. Could you check the email and order number and send them again? 🧭",
+    ],
+    ("check_product_availability", "in_stock"): [
+        "Great choice! The {product} (SKU: {sku}) is well-stocked with {inventory} available. Ready for your next adventure! 🏔️",
+        "Good news, trail-seeker! We've got {inventory} of the {product} (SKU: {sku}) in stock and ready to head out. 🎒",
+        "The {product} (SKU: {sku}) is in stock - {inventory} are waiting at basecamp for their next expedition! 🌲",
+    ],
+    ("check_product_availability", "low_stock"): [
+        "Good news, trail-seeker! The {product} (SKU: {sku}) is available, but only {inventory} left in stock - they're going faster than a downhill trail run! 🏔️",
+        "Heads up, explorer: just {inventory} of the {product} (SKU: {sku}) remain in stock. I wouldn't wait too long to claim yours! ⛰️",
+        "The {product} (SKU: {sku}) is in stock, with only {inventory} left on the shelf. Grab one before they summit out! 🎒",
+    ],
+    ("check_product_availability", "out_of_stock"): [
+        "I'm sorry, the {product} (SKU: {sku}) is currently out of stock. Even the best trails need maintenance sometimes - check back soon!{alternatives} 🏔️",
+        "The {product} (SKU: {sku}) is out of stock right now, but restocks come around like the seasons.{alternatives} 🌲",
+    ],
+    ("check_product_availability", "not_found"): [
+        "I couldn't find that product in our catalog. Can you try a different name or description? Every explorer needs the right gear for their journey! 🏔️",
+        "That one isn't on our trail map. Could you describe the product another way so I can scout it out? 🧭",
+    ],
+    ("generate_discount_code", "granted"): [
+        "You've earned an Early Risers discount! Use code {code} for {discount} off your next purchase. The early explorer catches the best views! 🌄",
+        "Rise and shine, explorer! Here's your Early Risers code: {code} for {discount} off. Onward into the unknown! 🏔️",
+    ],
+    ("generate_discount_code", "reissued"): [
+        "You've already claimed today's Early Risers discount! Your code is {code} for {discount} off your next purchase. See you on the trail! 🌄",
+        "Good news, explorer - your Early Risers code is still waiting for you: {code} for {discount} off. One code per adventurer each morning! 🏔️",
+    ],
+    ("generate_discount_code", "outside_hours"): [
+        "The Early Risers Promotion is only available between {start}:00 and {end}:00 AM Pacific Time. Come back during those hours to claim your discount - the mountains will be waiting! 🌄",
+        "Our Early Risers Promotion runs from {start}:00 to {end}:00 AM Pacific Time, so I can't offer a code right now. Catch the sunrise with us then! 🏔️",
+    ],
+    ("generate_discount_code", "unverified"): [
+        "I'd love to get you an Early Risers code! First, could you share the email and order number of one of your orders so I can confirm it's you? 🏔️",
+        "Early Risers codes are for our customers - just share the email and order number of one of your orders and I'll get yours! 🌄",
+    ],
+    ("generate_discount_code", "unavailable"): [
+        "I couldn't confirm your Early Risers code just now. Please ask again in a moment - you'll get the same code once it's recorded! 🏔️",
+    ],
+}
+
+
+def classify(function_name: str, result: Dict[str, Any]) -> Optional[str]:
+    """ Outcome of a tool result used to pick templates and apply the policy (None when unknown) """
+    if "error" in result:
+        return None
+    if function_name == "check_order_status":
+        if not result.get("success"):
+            return "not_found"
+        status = result.get("status")
+        return status if status in ("delivered", "in-transit", "fulfilled", "error") else "processing"
+    if function_name == "check_product_availability":
+        if not result.get("success"):
+            return "not_found"
+        if not result.get("exact_match"):
+            # No templates: a search match may not be what the customer meant
+            return "search_match"
+        if not result.get("in_stock"):
+            return "out_of_stock"
+        return "low_stock" if result.get("inventory", 0) < LOW_STOCK_THRESHOLD else "in_stock"
+    if function_name == "generate_discount_code":
+        if not result.get("success"):
+            return result.get("reason", "outside_hours")
+        return "reissued" if result.get("reissued") else "granted"
+    return None
+
+
+def _fields(result: Dict[str, Any]) -> Dict[str, Any]:
+    """ Template fields for a tool result """
+    alternatives = [match["product_name"] for match in result.get("other_matches") or [] if match.get("in_stock")]
+    items = [f"{item['product_name']} ({'in stock' if item['in_stock'] else 'out of stock'})"
+             for item in result.get("products") or [] if item.get("product_name")]
+    tracking = result.get("tracking_info") or ""
+    return {
+        "name": result.get("customer_name") or "explorer",
+        "order_number": result.get("order_number", "your order"),
+        "tracking": tracking,
+        "product": result.get("product_name"),
+        "sku": result.get("sku"),
+        "inventory": result.get("inventory"),
+        "alternatives": f" You might like the {alternatives[0]} instead, which is in stock." if alternatives else "",
+        "items": ", ".join(items),
+        "code": result.get("discount_code"),
+        "discount": CONFIG['EARLY_RISER_DISCOUNT'],
+        "start": CONFIG['EARLY_RISER_START_HOUR'],
+        "end": CONFIG['EARLY_RISER_END_HOUR'],
+    }
+
+
+class ResponseRenderer:
+    """ Renders tool turns locally when every result's outcome is allowed by the policy """
+
+    def __init__(self, mode: str = "hybrid", policy: Dict[str, Iterable[str]] = None, seed: int = None):
+        """ Initialize the renderer
+
+        Args:
+            mode: 'llm' always asks the model for the final reply, 'hybrid' renders
+                  the outcomes listed in policy locally
+            policy: Tool name -> outcomes rendered locally (see classify()); for a batch
+                    tool, the outcomes of its entries
+            seed: Seed for template choice, for reproducible output
+        """
+        if mode not in ("llm", "hybrid"):
+            raise ValueError(f"Unknown response mode: {mode}")
+        self.mode = mode
+        self.policy = {tool: frozenset(outcomes) for tool, outcomes in (policy or {}).items()}
+        self._random = random.Random(seed)
+        self._last_choice: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self.rendered = 0
+        self.deferred = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"rendered": self.rendered, "deferred": self.deferred}
+
+    def _choose(self, key: Tuple[str, str]) -> str:
+        """ Pick a template, never the one used last for the same outcome """
+        templates = TEMPLATE_BANK[key]
+        with self._lock:
+            index = self._random.randrange(len(templates))
+            if len(templates) > 1 and index == self._last_choice.get(key):
+                index = (index + 1) % len(templates)
+            self._last_choice[key] = index
+        return templates[index]
+
+    def render(self, results: List[Tuple[str, Dict[str, Any]]], user_message: str = None) -> Optional[str]:
+        """ Local reply for a turn's (tool name, result) pairs, or None when the model should answer
+
+        Args:
+            results: The turn's (tool name, result) pairs
+            user_message: The customer's message; anything but emails, order numbers
+                          and SKUs in it sends the turn to the model
+        """
+        if not results:
+            return None
+        if self.mode == "llm" or (user_message is not None
+                                  and not FastPathRouter.extract(user_message)["structured_only"]):
+            self.deferred += 1
+            return None
+        # (policy key, tool whose templates apply, result)
+        items = []
+        for function_name, result in results:
+            item_tool = BATCH_TOOLS.get(function_name)
+            if item_tool is None:
+                items.append((function_name, function_name, result))
+            elif "error" in result or not result.get("results"):
+                self.deferred += 1
+                return None
+            else:
+                items.extend((function_name, item_tool, item) for item in result["results"])
+
+        keys = []
+        for policy_key, function_name, result in items:
+            outcome = classify(function_name, result)
+            if outcome is None or outcome not in self.policy.get(policy_key, ()) \
+                    or (function_name, outcome) not in TEMPLATE_BANK:
+                self.deferred += 1
+                return None
+            keys.append(((function_name, outcome), result))
+
+        replies = []
+        for key, result in keys:
+            fields = _fields(result)
+            reply = self._choose(key).format(**fields)
+            if fields["items"] and key[0] == "check_order_status":
+                reply += " " + self._choose(ORDER_ITEMS_KEY).format(**fields)
+            replies.append(" ".join(reply.split()))
+        self.rendered += 1
+        logger.debug("Rendered reply locally for %s", [key for key, _ in keys])
+        return "\n\n".join(replies)
@@ -0,0 +1,297 @@
+"""
+Sierra Outfitters Semantic Product Retrieval
+
+Vector-space product matching over name, tags and description, computed
+locally (no network) and kept next to the lexical BM25 index:
+- each product is a TF-IDF vector of its field-weighted words plus the
+  character trigrams of those words (so "camping" still meets "camp"),
+  hashed into a fixed number of dimensions and L2-normalized
+- the vectors form one float32 matrix; queries are scored with a single
+  matrix product, batched across queries, and cut to top-k with argpartition
+- a product is returned on trigram overlap alone ("surfing" finds a
+  "surfboard"), so only a cosine similarity of at least min_score counts as
+  a match; enough dimensions keep hash collisions below that score
+- the matrix is saved to disk with a fingerprint of the catalog it was built
+  from, and reloaded only while the catalog still matches it
+- products can be added, replaced or removed one row at a time; IDF weights
+  stay as computed at build time until the next full build
+
+Requires NumPy, which is optional: without it create_semantic_index()
+returns None and product search stays lexical.
+
+Usage:
+    python -m semantic_search
+"""
+
+import hashlib
+import logging
+import math
+import os
+import threading
+import zlib
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from product_search import FIELD_WEIGHTS, tokenize, trigrams
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; semantic search is disabled without it
+    np = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 5
+# Weight of a word's character trigrams relative to the word itself
+SUBWORD_WEIGHT = 0.3
+
+
+def _features(fields: Iterable[Tuple[str, float]]) -> Dict[int, float]:
+    """ Weighted frequencies of the words and word trigrams of text fields, keyed by a stable hash """
+    counts: Dict[int, float] = {}
+    for text, weight in fields:
+        for token in tokenize(text):
+            key = zlib.crc32(token.encode()) & ~1
+            counts[key] = counts.get(key, 0.0) + weight
+            for gram in trigrams(token):
+                # Trigram keys are odd and word keys even, so with even dimensions the two never share a bucket
+                key = zlib.crc32(gram.encode()) | 1
+                counts[key] = counts.get(key, 0.0) + weight * SUBWORD_WEIGHT
+    return counts
+
+
+def _product_fields(product: Dict[str, Any]) -> Tuple[Tuple[str, float], ...]:
+    return (
+        (product.get("ProductName", ""), FIELD_WEIGHTS["name"]),
+        (" ".join(product.get("Tags") or []), FIELD_WEIGHTS["tags"]),
+        (product.get("Description", ""), FIELD_WEIGHTS["description"]),
+    )
+
+
+def product_features(product: Dict[str, Any]) -> Dict[int, float]:
+    return _features(_product_fields(product))
+
+
+def catalog_fingerprint(products: Iterable[Dict[str, Any]]) -> str:
+    """ Product count and digest of the searchable fields of a catalog, independent of product order """
+    digests = sorted(
+        hashlib.sha256("\x1f".join((
+            product["SKU"].upper(), product.get("ProductName", ""),
+            " ".join(product.get("Tags") or []), product.get("Description", "")
+        )).encode()).digest()
+        for product in products
+    )
+    return f"{len(digests)}:{hashlib.sha256(b''.join(digests)).hexdigest()}"
+
+
+class SemanticIndex:
+    """ Dense TF-IDF product matrix with batched top-k cosine scoring """
+
+    def __init__(self, dimensions: int = 8192, min_score: float = 0.12):
+        """ Create an empty index (see build() and load())
+
+        Args:
+            dimensions: Hashed feature dimensions per product vector
+            min_score: Min cosine similarity for a product to be returned
+        """
+        if np is None:
+            raise RuntimeError("Semantic search requires NumPy (pip install numpy)")
+        if dimensions % 2:
+            raise ValueError(f"Semantic index dimensions must be even, got {dimensions}")
+        self.dimensions = dimensions
+        self.min_score = min_score
+        self.idf = np.ones(dimensions, dtype=np.float32)
+        self.matrix = np.zeros((0, dimensions), dtype=np.float32)
+        # Row -> SKU, None for a free row
+        self.skus: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        # catalog_fingerprint() of the products the index was built from
+        self.catalog = ""
+        # Serializes writers; readers never take it
+        self._write_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # ======== Vectors ========
+
+    def _hashed(self, counts: Dict[int, float]) -> "np.ndarray":
+        """ Sublinear term frequencies hashed into the index dimensions, before IDF weighting """
+        buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts)) % self.dimensions
+        weights = [1.0 + math.log(tf) if tf >= 1.0 else tf for tf in counts.values()]
+        return np.bincount(buckets, weights=weights, minlength=self.dimensions).astype(np.float32)
+
+    def _weighted(self, vector: "np.ndarray") -> "np.ndarray":
+        vector = vector * self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def vectorize(self, product: Dict[str, Any]) -> "np.ndarray":
+        """ Normalized TF-IDF vector of a product """
+        return self._weighted(self._hashed(product_features(product)))
+
+    def vectorize_queries(self, queries: List[str]) -> "np.ndarray":
+        """ Normalized TF-IDF vectors of queries, one row each """
+        if not queries:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        return np.stack([self._weighted(self._hashed(_features(((query, 1.0),)))) for query in queries])
+
+    # ======== Build and Persistence ========
+
+    @classmethod
+    def build(cls, products: Iterable[Dict[str, Any]], dimensions: int = 8192,
+              min_score: float = 0.12) -> "SemanticIndex":
+        """ Compute IDF weights and the product matrix from the whole catalog """
+        index = cls(dimensions, min_score)
+        skus, raw = [], []
+        for product in products:
+            skus.append(product["SKU"].upper())
+            raw.append(index._hashed(product_features(product)))
+        tf = np.stack(raw) if raw else np.zeros((0, dimensions), dtype=np.float32)
+        doc_freq = np.count_nonzero(tf, axis=0)
+        index.idf = (np.log((1 + len(skus)) / (1 + doc_freq)) + 1).astype(np.float32)
+        matrix = tf * index.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        index.matrix = np.divide(matrix, norms, out=matrix, where=norms > 0)
+        index.skus = skus
+        index._rows = {sku: row for row, sku in enumerate(skus)}
+        logger.info("Semantic index built: %d products, %d dimensions", len(skus), dimensions)
+        return index
+
+    def save(self, path: str):
+        """ Write the index (atomically replaces path) """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        live = [row for row, sku in enumerate(self.skus) if sku is not None]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, version=np.array(INDEX_VERSION), catalog=np.array(self.catalog), idf=self.idf,
+                     matrix=self.matrix[live], skus=np.array([self.skus[row] for row in live], dtype=str))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, min_score: float = 0.12) -> "SemanticIndex":
+        """ Read an index written by save()
+
+        Raises:
+            ValueError: The file was written by another index version
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                raise ValueError(f"Semantic index version {int(data['version'])}, expected {INDEX_VERSION}")
+            index = cls(len(data["idf"]), min_score)
+            index.catalog = str(data["catalog"])
+            index.idf = data["idf"]
+            index.matrix = np.ascontiguousarray(data["matrix"])
+            index.skus = data["skus"].tolist()
+        index._rows = {sku: row for row, sku in enumerate(index.skus)}
+        return index
+
+    # ======== Incremental Updates ========
+
+    def upsert(self, product: Dict[str, Any]):
+        """ Insert or replace a product's row """
+        sku = product["SKU"].upper()
+        vector = self.vectorize(product)
+        with self._write_lock:
+            row = self._rows.get(sku)
+            if row is None:
+                if self._free:
+                    row = self._free.pop()
+                else:
+                    row = len(self.skus)
+                    if row >= len(self.matrix):
+                        # Grow by doubling; queries running meanwhile keep scoring the old matrix
+                        grown = np.zeros((max(8, 2 * len(self.matrix)), self.dimensions), dtype=np.float32)
+                        grown[:len(self.matrix)] = self.matrix
+                        self.matrix = grown
+                    self.skus.append(None)
+            self.matrix[row] = vector
+            self.skus[row] = sku
+            self._rows[sku] = row
+
+    def remove(self, sku: str) -> bool:
+        """ Drop a product's row; False when it is not indexed """
+        with self._write_lock:
+            row = self._rows.pop(sku.upper(), None)
+            if row is None:
+                return False
+            self.skus[row] = None
+            self.matrix[row] = 0.0
+            self._free.append(row)
+        return True
+
+    # ======== Queries ========
+
+    def search_many(self, queries: List[str], top_k: int = 5) -> List[List[Tuple[str, float]]]:
+        """ Up to top_k (SKU, cosine similarity) pairs per query, best first, scored in one matrix product """
+        matrix, skus = self.matrix, self.skus
+        rows = min(len(skus), len(matrix))
+        if not queries or not rows:
+            return [[] for _ in queries]
+        scores = self.vectorize_queries(queries) @ matrix[:rows].T
+        k = min(top_k, rows)
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for query_scores, candidates in zip(scores, best):
+            # Ties break on row order so equal matches stay stable
+            rows_by_score = sorted(candidates.tolist(), key=lambda row: (-query_scores[row], row))
+            results.append([(skus[row], float(query_scores[row])) for row in rows_by_score
+                            if query_scores[row] >= self.min_score and skus[row] is not None])
+        return results
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """ Up to top_k (SKU, cosine similarity) pairs, best first """
+        return self.search_many([query], top_k)[0]
+
+
+def create_semantic_index(config: Dict[str, Any], products: Iterable[Dict[str, Any]]) -> Optional[SemanticIndex]:
+    """ Load the saved index when it was built from this catalog, else build it from products and save it
+
+    Returns None when NumPy is not installed or there are no products.
+    """
+    if np is None:
+        logger.warning("NumPy is not installed; product search stays lexical")
+        return None
+    products = list(products)
+    if not products:
+        # A 0-row index would be saved as current and leave vector search dead until rebuilt
+        logger.warning("No products to index; product search stays lexical")
+        return None
+    path = config['SEMANTIC_INDEX_FILE']
+    min_score = config['SEMANTIC_SEARCH_MIN_SCORE']
+    catalog = catalog_fingerprint(products)
+    if path and os.path.exists(path):
+        try:
+            index = SemanticIndex.load(path, min_score)
+            if index.catalog == catalog and index.dimensions == config['SEMANTIC_SEARCH_DIMENSIONS']:
+                logger.info("Loaded semantic index from %s: %d products", path, len(index))
+                return index
+            logger.info("Semantic index %s does not match the catalog; rebuilding it", path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable semantic index %s: %s", path, e)
+    index = SemanticIndex.build(products, config['SEMANTIC_SEARCH_DIMENSIONS'], min_score)
+    index.catalog = catalog
+    if path:
+        try:
+            index.save(path)
+        except OSError as e:
+            logger.warning("Could not save the semantic index to %s: %s", path, e)
+    return index
+
+
+def main():
+    from config import get_config
+    from data_loader import load_products
+
+    config = get_config()
+    # The same path as at startup, so the saved index carries the fingerprint startup checks
+    index = create_semantic_index(config, load_products(config['PRODUCT_CATALOG_FILE']))
+    if index is None:
+        raise SystemExit("No semantic index written (NumPy missing or no products)")
+    print(f"Semantic index of {len(index)} products is current in {config['SEMANTIC_INDEX_FILE']}")
+
+
+if __name__ == "__main__":
+    main()
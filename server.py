@@ -0,0 +1,548 @@
+"""
+Sierra Outfitters HTTP Server
+
+Serves the agent over HTTP from a pool of worker processes:
+- a front router accepts client connections and sends every request for a
+  session to the same worker (crc32 of the session id), so each
+  conversation history stays local to one process
+- each worker runs an AsyncSierraOutfittersAgent behind a Unix socket and
+  multiplexes its sessions on one event loop
+- with the in-memory backend, data is loaded once and inherited by forked
+  workers; SQLite and snapshot backends are opened from the shared file
+
+Endpoints:
+    POST   /v1/chat               {"message": str, "session_id": str?, "stream": bool?}
+    DELETE /v1/sessions/<id>      end a session
+    GET    /healthz               router and worker status
+    GET    /metrics               Prometheus metrics of every worker
+
+Streaming responses are Server-Sent Events: one `data: {"token": ...}` event
+per token, then `data: [DONE]`.
+
+Usage:
+    python server.py --port 8080 --workers 4
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import uuid
+import zlib
+from http import HTTPStatus
+from urllib.parse import unquote
+from typing import Dict, Any, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from config import get_config
+from logging_setup import configure_logging
+from telemetry import merge_prometheus
+
+CONFIG = get_config()
+
+logger = logging.getLogger(__name__)
+
+SESSION_HEADER = "x-session-id"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+WORKER_RESTART_DELAY_SECONDS = 1.0
+
+Request = Tuple[str, str, Dict[str, str], bytes]
+
+
+class HTTPError(Exception):
+    """ Error answered with an HTTP status instead of closing the connection """
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# ======== Minimal HTTP/1.1 ========
+
+async def read_request(reader: asyncio.StreamReader, max_body_bytes: int) -> Optional[Request]:
+    """ Read one request; returns None when the peer closed the connection """
+    try:
+        request_line = await reader.readline()
+    except ConnectionError:
+        return None
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+    headers = await _read_headers(reader)
+    length = int(headers.get("content-length") or 0)
+    if length > max_body_bytes:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Request body over {max_body_bytes} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> Dict[str, str]:
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed in headers")
+        if line in (b"\r\n", b"\n"):
+            return headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+def response_head(status: HTTPStatus, headers: Dict[str, str]) -> bytes:
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def json_response(status: HTTPStatus, payload: Dict[str, Any], session_id: str = None) -> bytes:
+    body = json.dumps(payload).encode()
+    headers = {"Content-Type": "application/json", "Content-Length": str(len(body))}
+    if session_id:
+        headers["X-Session-Id"] = session_id
+    return response_head(status, headers) + body
+
+
+def text_response(status: HTTPStatus, text: str, content_type: str = "text/plain; charset=utf-8") -> bytes:
+    body = text.encode()
+    return response_head(status, {"Content-Type": content_type, "Content-Length": str(len(body))}) + body
+
+
+def chunk(data: bytes) -> bytes:
+    return f"{len(data):X}\r\n".encode() + data + b"\r\n"
+
+
+def valid_session_id(session_id: str) -> str:
+    """ Check a client-supplied session id before it is hashed or forwarded in a header
+
+    Raises:
+        HTTPError: 400 when the id is empty, not a string, holds control characters
+            (a CR/LF would inject headers) or is not Latin-1 (headers are Latin-1)
+    """
+    if not isinstance(session_id, str) or not session_id \
+            or any(ord(char) < 0x20 or ord(char) == 0x7f for char in session_id):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid session id")
+    try:
+        session_id.encode("latin-1")
+    except UnicodeEncodeError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Session id must be Latin-1 text")
+    return session_id
+
+
+def session_id_from_path(path: str) -> str:
+    """ The URL-decoded session id of a /v1/sessions/<id> path """
+    return valid_session_id(unquote(path[len("/v1/sessions/"):].partition("?")[0]))
+
+
+def worker_for(session_id: str, workers: int) -> int:
+    """ Stable worker index for a session (Python's hash() differs per process) """
+    return zlib.crc32(session_id.encode()) % workers
+
+
+# ======== Worker Process ========
+
+class AgentWorker:
+    """ One worker process: an async agent serving requests from the router """
+
+    def __init__(self, index: int, agent):
+        self.index = index
+        self.agent = agent
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader, CONFIG['SERVER_MAX_BODY_BYTES'])
+                    if request is None:
+                        break
+                    await self.dispatch(request, writer)
+                except HTTPError as e:
+                    writer.write(json_response(e.status, {"error": str(e)}))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, request: Request, writer: asyncio.StreamWriter):
+        method, path, headers, body = request
+        if method == "GET" and path == "/healthz":
+            writer.write(json_response(HTTPStatus.OK, {
+                "status": "ok", "worker": self.index, "pid": os.getpid(), "sessions": len(self.agent.session_store)
+            }))
+        elif method == "GET" and path == "/metrics":
+            writer.write(text_response(HTTPStatus.OK, self.agent.telemetry.render_prometheus(), PROMETHEUS_CONTENT_TYPE))
+        elif method == "POST" and path == "/v1/chat":
+            await self.chat(headers, body, writer)
+        elif method == "DELETE" and path.startswith("/v1/sessions/"):
+            session_id = valid_session_id(headers[SESSION_HEADER]) if headers.get(SESSION_HEADER) \
+                else session_id_from_path(path)
+            self.agent.end_session(session_id)
+            writer.write(json_response(HTTPStatus.OK, {"session_id": session_id, "ended": True}, session_id))
+        else:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+
+    async def chat(self, headers: Dict[str, str], body: bytes, writer: asyncio.StreamWriter):
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be JSON")
+        message = payload.get("message")
+        if not isinstance(message, str) or not message.strip():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'message' is required")
+        session_id = headers.get(SESSION_HEADER) or payload.get("session_id")
+        session_id = valid_session_id(session_id) if session_id else uuid.uuid4().hex
+
+        if not payload.get("stream"):
+            response = await self.agent.process_message(session_id, message)
+            writer.write(json_response(HTTPStatus.OK, {"session_id": session_id, "response": response}, session_id))
+            return
+
+        writer.write(response_head(HTTPStatus.OK, {
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "Transfer-Encoding": "chunked",
+            "X-Session-Id": session_id,
+        }))
+        async for token in self.agent.stream_message(session_id, message):
+            writer.write(chunk(f"data: {json.dumps({'token': token})}\n\n".encode()))
+            await writer.drain()
+        writer.write(chunk(b"data: [DONE]\n\n") + chunk(b""))
+
+
+def _worker_main(index: int, socket_path: str, api_key: str, storage=None):
+    """ Worker process entry point """
+    # Imported here so the router process never loads the agent
+    from async_agent import AsyncSierraOutfittersAgent
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the router owns Ctrl+C
+    # Each worker rotates its own log file; processes sharing one file would race on rotation
+    log_root, log_ext = os.path.splitext(CONFIG['LOG_FILE'])
+    configure_logging(CONFIG, log_file=f"{log_root}.worker-{index}{log_ext}", force=True)
+
+    async def serve():
+        agent = AsyncSierraOutfittersAgent(api_key, storage=storage)
+        agent.telemetry.constant_labels = (("worker", str(index)),)
+        worker = AgentWorker(index, agent)
+        server = await asyncio.start_unix_server(worker.handle_connection, path=socket_path)
+        stop = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        logger.info(f"Worker {index} (pid {os.getpid()}) serving on {socket_path}")
+        async with server:
+            await stop.wait()
+        await agent.aclose()
+        logger.info(f"Worker {index} stopped")
+
+    asyncio.run(serve())
+
+
+# ======== Router ========
+
+class Router:
+    """ Front process: accepts client connections and relays each request to its session's worker """
+
+    def __init__(self, workers: int, api_key: str, socket_dir: str, storage=None):
+        self.workers = workers
+        self.api_key = api_key
+        self.socket_dir = socket_dir
+        self.storage = storage
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        # Idle keep-alive connections to each worker
+        self._idle: List[List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = [[] for _ in range(workers)]
+        # Forked workers inherit preloaded data; spawned workers open the configured backend themselves
+        method = "fork" if storage is not None else "spawn"
+        self._context = multiprocessing.get_context(method)
+
+    def socket_path(self, index: int) -> str:
+        return os.path.join(self.socket_dir, f"worker-{index}.sock")
+
+    # ======== Worker Supervision ========
+
+    def start_worker(self, index: int):
+        path = self.socket_path(index)
+        if os.path.exists(path):
+            os.unlink(path)
+        process = self._context.Process(
+            target=_worker_main, args=(index, path, self.api_key, self.storage),
+            name=f"sierra-worker-{index}", daemon=True
+        )
+        process.start()
+        self.processes[index] = process
+        self._idle[index].clear()
+
+    async def wait_until_ready(self, timeout: float = 60.0):
+        """ Wait for every worker socket to accept connections """
+        deadline = asyncio.get_running_loop().time() + timeout
+        for index in range(self.workers):
+            while True:
+                try:
+                    _, writer = await asyncio.open_unix_connection(self.socket_path(index))
+                    writer.close()
+                    break
+                except OSError:
+                    if asyncio.get_running_loop().time() > deadline:
+                        raise RuntimeError(f"Worker {index} did not start within {timeout}s")
+                    await asyncio.sleep(0.05)
+
+    async def supervise(self):
+        """ Restart workers that exit; their sessions survive only with the sqlite session store """
+        while True:
+            await asyncio.sleep(WORKER_RESTART_DELAY_SECONDS)
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive():
+                    logger.error(f"Worker {index} exited with code {process.exitcode}; restarting")
+                    self.start_worker(index)
+
+    def stop_workers(self):
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            if process is not None:
+                process.join(timeout=5)
+
+    # ======== Request Relay ========
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = None
+                try:
+                    request = await read_request(reader, CONFIG['SERVER_MAX_BODY_BYTES'])
+                    if request is None:
+                        break
+                    await self.route(request, writer)
+                except HTTPError as e:
+                    writer.write(json_response(e.status, {"error": str(e)}))
+                await writer.drain()
+                if request and request[2].get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def session_id_for(path: str, headers: Dict[str, str], body: bytes) -> Optional[str]:
+        """ The validated session id of a request, or None for a new conversation
+
+        Raises:
+            HTTPError: 400 when the header, path or body carries an invalid id
+        """
+        if headers.get(SESSION_HEADER):
+            return valid_session_id(headers[SESSION_HEADER])
+        if path.startswith("/v1/sessions/"):
+            return session_id_from_path(path)
+        if body:
+            try:
+                session_id = json.loads(body).get("session_id")
+            except (ValueError, AttributeError):
+                return None
+            return valid_session_id(session_id) if session_id else None
+        return None
+
+    async def route(self, request: Request, writer: asyncio.StreamWriter):
+        method, path, headers, body = request
+        if method == "GET" and path == "/healthz":
+            alive = [process is not None and process.is_alive() for process in self.processes]
+            status = HTTPStatus.OK if all(alive) else HTTPStatus.SERVICE_UNAVAILABLE
+            writer.write(json_response(status, {"workers": self.workers, "alive": alive}))
+            return
+        if method == "GET" and path == "/metrics":
+            texts = await asyncio.gather(*(self._fetch_worker(index, "/metrics") for index in range(self.workers)))
+            writer.write(text_response(HTTPStatus.OK, merge_prometheus([text for text in texts if text]),
+                                       PROMETHEUS_CONTENT_TYPE))
+            return
+
+        # New conversations get their id here so the worker choice is known up front
+        session_id = self.session_id_for(path, headers, body) or uuid.uuid4().hex
+        index = worker_for(session_id, self.workers)
+        forwarded = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: worker-{index}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"X-Session-Id: {session_id}\r\n\r\n"
+        ).encode("latin-1") + body
+
+        while True:
+            upstream = self._take_idle(index)
+            pooled = upstream is not None
+            if not pooled:
+                try:
+                    upstream = await asyncio.open_unix_connection(self.socket_path(index))
+                except OSError:
+                    raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, f"Worker {index} is unavailable")
+            upstream_reader, upstream_writer = upstream
+            try:
+                upstream_writer.write(forwarded)
+                await upstream_writer.drain()
+            except ConnectionError:
+                upstream_writer.close()
+                # A stale pooled connection failed before the worker got the request: safe to resend
+                if pooled:
+                    continue
+                raise HTTPError(HTTPStatus.BAD_GATEWAY, f"Worker {index} refused the request")
+            try:
+                status_line = await upstream_reader.readline()
+            except ConnectionError:
+                status_line = b""
+            if not status_line:
+                # The worker may have acted on the request (e.g. a chat turn), so it is never resent
+                upstream_writer.close()
+                raise HTTPError(HTTPStatus.BAD_GATEWAY, f"Worker {index} dropped the request")
+            try:
+                reusable = await self._relay_response(status_line, upstream_reader, writer)
+            except BaseException:
+                # Client gone or upstream response cut short: the connection is mid-response
+                upstream_writer.close()
+                raise
+            if reusable:
+                self._idle[index].append(upstream)
+            else:
+                upstream_writer.close()
+            return
+
+    def _take_idle(self, index: int) -> Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]:
+        """ A pooled connection to a worker, skipping ones the worker closed while idle """
+        idle = self._idle[index]
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return None
+
+    async def _fetch_worker(self, index: int, path: str) -> Optional[str]:
+        """ GET a small non-streamed response body from one worker on a fresh connection """
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.socket_path(index))
+        except OSError:
+            logger.warning(f"Worker {index} is unavailable for GET {path}")
+            return None
+        try:
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: worker-{index}\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            await reader.readline()
+            headers = await _read_headers(reader)
+            return (await reader.readexactly(int(headers.get("content-length") or 0))).decode()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            logger.warning(f"Worker {index} failed GET {path}: {e}")
+            return None
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _relay_response(status_line: bytes, upstream: asyncio.StreamReader,
+                              writer: asyncio.StreamWriter) -> bool:
+        """ Copy one framed response to the client, flushing each chunk as it arrives
+
+        Returns:
+            Whether the upstream connection can be reused for another request
+
+        Raises:
+            ConnectionError: The client went away or the response was cut short
+        """
+        head = bytearray(status_line)
+        while True:
+            line = await upstream.readline()
+            if not line:
+                raise ConnectionError("Worker closed the connection in the response headers")
+            head += line
+            if line in (b"\r\n", b"\n"):
+                break
+        writer.write(bytes(head))
+        headers = {name.strip().lower(): value.strip()
+                   for name, _, value in (line.decode("latin-1").partition(":")
+                                          for line in bytes(head).split(b"\r\n")[1:] if line)}
+
+        try:
+            if headers.get("transfer-encoding", "").lower() == "chunked":
+                while True:
+                    size_line = await upstream.readline()
+                    size = int(size_line.split(b";")[0], 16)
+                    data = await upstream.readexactly(size + 2)
+                    writer.write(size_line + data)
+                    await writer.drain()
+                    if size == 0:
+                        break
+            elif "content-length" in headers:
+                length = int(headers["content-length"])
+                if length:
+                    writer.write(await upstream.readexactly(length))
+            else:
+                # Delimited by the worker closing the connection
+                writer.write(await upstream.read())
+                return False
+        except asyncio.IncompleteReadError as e:
+            raise ConnectionError("Worker response was cut short") from e
+        except ValueError as e:
+            raise ConnectionError(f"Malformed response from the worker: {e}") from e
+        return headers.get("connection", "").lower() != "close"
+
+
+async def serve(host: str, port: int, workers: int, api_key: str):
+    storage = None
+    if CONFIG['STORAGE_BACKEND'] == "memory" and "fork" in multiprocessing.get_all_start_methods():
+        from storage_backends import create_backend
+
+        # Load once and share copy-on-write with every forked worker; freezing the
+        # heap keeps the garbage collector from dirtying the shared pages
+        storage = create_backend(CONFIG)
+        gc.freeze()
+
+    socket_dir = tempfile.mkdtemp(prefix="sierra-workers-")
+    router = Router(workers, api_key, socket_dir, storage)
+    try:
+        for index in range(workers):
+            router.start_worker(index)
+        await router.wait_until_ready()
+        supervisor = asyncio.create_task(router.supervise())
+        server = await asyncio.start_server(router.handle_connection, host, port)
+        print(f"Sierra Outfitters Agent serving on http://{host}:{port} with {workers} workers")
+        logger.info(f"Server listening on {host}:{port} with {workers} workers")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        async with server:
+            await stop.wait()
+        supervisor.cancel()
+    finally:
+        router.stop_workers()
+        shutil.rmtree(socket_dir, ignore_errors=True)
+        logger.info("Server shutdown complete")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Sierra Outfitters Agent over HTTP")
+    parser.add_argument("--host", default=CONFIG['SERVER_HOST'])
+    parser.add_argument("--port", type=int, default=CONFIG['SERVER_PORT'])
+    parser.add_argument("--workers", type=int, default=CONFIG['SERVER_WORKERS'],
+                        help="Worker processes (0 = one per CPU core)")
+    args = parser.parse_args()
+    configure_logging(CONFIG)
+
+    load_dotenv(CONFIG['ENV_FILE'])
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        print("Missing OpenAI API key. Please set the OPENAI_API_KEY environment variable.")
+        return
+
+    workers = args.workers or os.cpu_count() or 1
+    asyncio.run(serve(args.host, args.port, workers, api_key))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""
+Sierra Outfitters Session Store
+
+Holds per-session conversation state between turns in a compact binary
+form instead of live lists of model_dump() dicts:
+- InMemorySessionStore: LRU-bounded, for a single process
+- SQLiteSessionStore: on local disk, so sessions survive worker restarts
+  and can be shared by every worker on a node
+
+Both evict sessions idle longer than a timeout and cap the encoded size of
+each session by dropping its oldest turns.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from history_manager import HistoryManager
+
+logger = logging.getLogger(__name__)
+
+SESSION_FORMAT_VERSION = 1
+FLAG_COMPRESSED = 1
+COMPRESS_MIN_BYTES = 256
+
+ROLES = ("user", "assistant", "system", "tool")
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+_HEADER = struct.Struct("<BB")
+
+
+class Session:
+    """ Conversation state of one session: message history, fast-path slots and history memory """
+
+    __slots__ = ("history", "slots", "memory")
+
+    def __init__(self, history: List[Dict[str, Any]] = None, slots: Dict[str, Any] = None,
+                 memory: Dict[str, Any] = None):
+        self.history = history if history is not None else []
+        self.slots = slots or {}
+        self.memory = memory or {}
+
+
+# ======== Binary Encoding ========
+#
+# Layout: u8 version, u8 flags, then a body (zlib-compressed when flagged):
+#   varint message count
+#   per message: u8 role, str content, varint tool call count,
+#                per call (str id, str function name, str arguments),
+#                str tool_call_id, str name
+#   str JSON {"slots": ..., "memory": ...}
+# A str is varint(byte length + 1) then UTF-8 bytes; a leading 0 means None.
+# Only the fields the chat completions API reads are kept, so model_dump()
+# noise (refusal, audio, function_call, ...) is dropped.
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, position: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def _write_str(out: bytearray, text: Optional[str]):
+    if text is None:
+        out.append(0)
+        return
+    encoded = text.encode()
+    _write_varint(out, len(encoded) + 1)
+    out += encoded
+
+
+def _read_str(data: bytes, position: int) -> Tuple[Optional[str], int]:
+    length, position = _read_varint(data, position)
+    if length == 0:
+        return None, position
+    end = position + length - 1
+    return data[position:end].decode(), end
+
+
+def encode_session(session: Session) -> bytes:
+    """ Serialize a session into the compact binary format """
+    body = bytearray()
+    _write_varint(body, len(session.history))
+    for message in session.history:
+        body.append(_ROLE_CODES[message["role"]])
+        _write_str(body, message.get("content"))
+        tool_calls = message.get("tool_calls") or []
+        _write_varint(body, len(tool_calls))
+        for tool_call in tool_calls:
+            _write_str(body, tool_call["id"])
+            _write_str(body, tool_call["function"]["name"])
+            _write_str(body, tool_call["function"]["arguments"])
+        _write_str(body, message.get("tool_call_id"))
+        _write_str(body, message.get("name"))
+    _write_str(body, json.dumps({"slots": session.slots, "memory": session.memory}, separators=(",", ":")))
+
+    flags = 0
+    if len(body) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(bytes(body), 6)
+        if len(compressed) < len(body):
+            body, flags = compressed, FLAG_COMPRESSED
+    return _HEADER.pack(SESSION_FORMAT_VERSION, flags) + bytes(body)
+
+
+def decode_session(data: bytes) -> Session:
+    """ Rebuild a session from encode_session output """
+    version, flags = _HEADER.unpack_from(data, 0)
+    if version != SESSION_FORMAT_VERSION:
+        raise ValueError(f"Unsupported session format version: {version}")
+    body = data[_HEADER.size:]
+    if flags & FLAG_COMPRESSED:
+        body = zlib.decompress(body)
+
+    count, position = _read_varint(body, 0)
+    history = []
+    for _ in range(count):
+        message: Dict[str, Any] = {"role": ROLES[body[position]]}
+        message["content"], position = _read_str(body, position + 1)
+        call_count, position = _read_varint(body, position)
+        if call_count:
+            tool_calls = []
+            for _ in range(call_count):
+                call_id, position = _read_str(body, position)
+                name, position = _read_str(body, position)
+                arguments, position = _read_str(body, position)
+                tool_calls.append({"id": call_id, "type": "function",
+                                   "function": {"name": name, "arguments": arguments}})
+            message["tool_calls"] = tool_calls
+        tool_call_id, position = _read_str(body, position)
+        if tool_call_id is not None:
+            message["tool_call_id"] = tool_call_id
+        name, position = _read_str(body, position)
+        if name is not None:
+            message["name"] = name
+        history.append(message)
+    state = json.loads(_read_str(body, position)[0])
+    return Session(history, state["slots"], state["memory"])
+
+
+# ======== Stores ========
+
+class SessionStore:
+    """ Base session store: encoding, per-session size cap and the load/save contract """
+
+    def __init__(self, idle_timeout: float = 1800.0, max_session_bytes: int = 64 * 1024):
+        """ Configure limits shared by every store
+
+        Args:
+            idle_timeout: Seconds without a turn after which a session is evicted
+            max_session_bytes: Max encoded size of one session; oldest turns are dropped beyond it
+        """
+        self.idle_timeout = idle_timeout
+        self.max_session_bytes = max_session_bytes
+        self.evicted_idle = 0
+        self.trimmed_turns = 0
+
+    def load(self, session_id: str) -> Session:
+        """ Return the stored session, or a new empty one """
+        data = self._get(session_id)
+        if data is None:
+            return Session()
+        try:
+            return decode_session(data)
+        except (ValueError, IndexError, KeyError, zlib.error) as e:
+            logger.error("[%s] Discarding unreadable session: %s", session_id, e)
+            self.delete(session_id)
+            return Session()
+
+    def save(self, session_id: str, session: Session,
+             on_trim: Callable[[List[Dict[str, Any]], Dict[str, Any]], None] = None) -> int:
+        """ Store a session, trimming its oldest turns to fit max_session_bytes
+
+        Args:
+            on_trim: Called with (history, memory) before turns are dropped, so facts can be kept
+
+        Returns:
+            Encoded size in bytes
+        """
+        data = encode_session(session)
+        if self.max_session_bytes and len(data) > self.max_session_bytes:
+            if on_trim is not None:
+                on_trim(session.history, session.memory)
+            data = self._trim(session_id, session, data)
+        self._put(session_id, data)
+        return len(data)
+
+    def _trim(self, session_id: str, session: Session, data: bytes) -> bytes:
+        """ Drop whole turns (tool exchanges stay paired), oldest first, always keeping the latest """
+        leading = []
+        history = session.history
+        while history and history[0]["role"] == "system":
+            leading.append(history[0])
+            history = history[1:]
+        turns = HistoryManager._split_turns(history)
+        dropped = 0
+        while len(data) > self.max_session_bytes and len(turns) > 1:
+            turns.pop(0)
+            dropped += 1
+            session.history[:] = leading + [message for turn in turns for message in turn]
+            data = encode_session(session)
+        self.trimmed_turns += dropped
+        logger.info("[%s] Session over %s bytes: dropped %s oldest turns",
+                    session_id, self.max_session_bytes, dropped)
+        return data
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def evict_idle(self) -> int:
+        """ Remove sessions idle longer than idle_timeout; returns how many were removed """
+        raise NotImplementedError
+
+    def stored_bytes(self, session_id: str) -> int:
+        data = self._get(session_id)
+        return len(data) if data is not None else 0
+
+    def _get(self, session_id: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def _put(self, session_id: str, data: bytes):
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        return {"sessions": len(self), "evicted_idle": self.evicted_idle, "trimmed_turns": self.trimmed_turns}
+
+    def close(self):
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """ LRU of encoded sessions; the least recently used are evicted beyond max_sessions """
+
+    def __init__(self, max_sessions: int = 10000, idle_timeout: float = 1800.0,
+                 max_session_bytes: int = 64 * 1024):
+        super().__init__(idle_timeout, max_session_bytes)
+        self.max_sessions = max_sessions
+        # session id -> (encoded session, last active); ordered oldest activity first
+        self._sessions: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted_lru = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[1] > self.idle_timeout:
+                del self._sessions[session_id]
+                self.evicted_idle += 1
+                return None
+            return entry[0]
+
+    def _put(self, session_id, data):
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session_id] = (data, now)
+            self._sessions.move_to_end(session_id)
+            self._evict_idle_locked(now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted_lru += 1
+
+    def _evict_idle_locked(self, now: float) -> int:
+        # Entries are ordered by last activity, so expired ones are all at the front
+        evicted = 0
+        while self._sessions:
+            session_id, (_, last_active) = next(iter(self._sessions.items()))
+            if now - last_active <= self.idle_timeout:
+                break
+            del self._sessions[session_id]
+            evicted += 1
+        self.evicted_idle += evicted
+        return evicted
+
+    def evict_idle(self):
+        with self._lock:
+            return self._evict_idle_locked(time.monotonic())
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self):
+        stats = super().stats()
+        stats["evicted_lru"] = self.evicted_lru
+        stats["stored_bytes"] = sum(len(data) for data, _ in list(self._sessions.values()))
+        return stats
+
+
+SESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    last_active REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_last_active ON sessions (last_active);
+"""
+
+
+class SQLiteSessionStore(SessionStore):
+    """ Sessions in a local SQLite file shared by every worker process """
+
+    # Seconds between idle sweeps triggered from save()
+    SWEEP_INTERVAL_SECONDS = 60.0
+
+    def __init__(self, path: str, idle_timeout: float = 1800.0, max_session_bytes: int = 64 * 1024):
+        super().__init__(idle_timeout, max_session_bytes)
+        self.path = path
+        self._local = threading.local()
+        self._last_sweep = 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self.connection
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(SESSION_SCHEMA)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """ This thread's connection """
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            # Durable enough for conversation state and avoids an fsync per turn
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = conn
+        return conn
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def _get(self, session_id):
+        row = self.connection.execute(
+            "SELECT data FROM sessions WHERE session_id = ? AND last_active >= ?",
+            (session_id, time.time() - self.idle_timeout)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _put(self, session_id, data):
+        now = time.time()
+        self.connection.execute(
+            "INSERT INTO sessions (session_id, data, last_active) VALUES (?, ?, ?) "
+            "ON CONFLICT (session_id) DO UPDATE SET data = excluded.data, last_active = excluded.last_active",
+            (session_id, data, now)
+        )
+        if now - self._last_sweep > self.SWEEP_INTERVAL_SECONDS:
+            self._last_sweep = now
+            self.evict_idle()
+
+    def evict_idle(self):
+        cursor = self.connection.execute("DELETE FROM sessions WHERE last_active < ?",
+                                         (time.time() - self.idle_timeout,))
+        self.evicted_idle += cursor.rowcount
+        return cursor.rowcount
+
+    def delete(self, session_id):
+        self.connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def close(self):
+        conn = getattr(self._local, "connection", None)
+        if conn is not None:
+            conn.close()
+            self._local.connection = None
+
+
+def create_session_store(config: Dict[str, Any]) -> SessionStore:
+    """ Open the session store selected by CONFIG['SESSION_STORE'] """
+    kind = config['SESSION_STORE']
+    limits = {
+        "idle_timeout": config['SESSION_IDLE_TIMEOUT_SECONDS'],
+        "max_session_bytes": config['SESSION_MAX_BYTES'],
+    }
+    if kind == "memory":
+        return InMemorySessionStore(config['SESSION_MAX_SESSIONS'], **limits)
+    if kind == "sqlite":
+        return SQLiteSessionStore(config['SESSION_DB_FILE'], **limits)
+    raise ValueError(f"Unknown session store: {kind}")
@@ -1,56 +1,150 @@
-from openai import OpenAI
+# The OpenAI SDK, pytz, colorama, dotenv and NumPy are imported where first used, keeping cold starts fast
 import os
-from dotenv import load_dotenv
-import pytz
 import json
-from typing import Dict, Any, List
+import contextvars
+from typing import Dict, Any, List, Iterator, Optional, Tuple, Union
 import uuid
-from colorama import Fore, Style
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from functools import cached_property
+from types import SimpleNamespace
 import logging
+import sqlite3
+import time
+from agent_artifacts import load_request_builder, open_snapshot_storage
 from config import get_config
+from logging_setup import configure_logging
+from storage_backends import StorageBackend, InMemoryBackend, create_backend
+from data_refresher import DataRefresher
+from discount_codes import create_discount_code_service
+from streaming import StreamAccumulator
+from fast_path_router import FastPathRouter, MISSING_SLOT_PROMPTS
+from order_repository import normalize_email
+from history_manager import HistoryManager, count_text_tokens
+from product_search import reciprocal_rank_fusion
+from request_builder import ChatRequest, RequestBuilder
+from resilient_client import CIRCUIT_STATES, CircuitBreaker, ResilientClient, connection_limits, request_timeout
+from response_templates import ResponseRenderer
+from session_store import Session, create_session_store
+from telemetry import Span, Telemetry
+from tool_executor import ToolExecutor
+from tool_cache import ToolResultCache
 
 # Import configuration from config.py
 CONFIG = get_config()
 
-# Enhanced logging configuration
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    handlers=[
-        logging.FileHandler(CONFIG['LOG_FILE'])
-    ]
-)
-
 logger = logging.getLogger(__name__)
 
+# Session id and session of the turn being handled; tool calls run in a copy of the turn's context
+_current_turn: contextvars.ContextVar[Optional[Tuple[str, Any]]] = contextvars.ContextVar("sierra_turn", default=None)
+
 class SierraOutfittersAgent:
     """ Main class for the Sierra Outfitters Agent """
 
-    def __init__(self, api_key):
-        """ Initialize the Sierra Outfitters Agent """
+    api_client_class = ResilientClient
+
+    def __init__(self, api_key, storage: Optional[StorageBackend] = None):
+        """ Initialize the Sierra Outfitters Agent
+
+        Args:
+            api_key: OpenAI API key
+            storage: Already-open storage backend to share (loads CONFIG's backend if omitted)
+        """
+        # Queue-backed logging: records are written by a background thread, off the request path
+        configure_logging(CONFIG)
         logger.info("Initializing Sierra Outfitters Agent")
-        self.client = OpenAI(api_key=api_key)
-        self.pacific_tz = pytz.timezone(CONFIG['TIMEZONE'])
-        self.orders_data = []
-        self.products_data = []
-        self.conversation_history = []
-        self.load_data()
+        # The OpenAI client is created on first use (or by the prewarm thread below)
+        self.api = self.api_client_class(
+            lambda: self._create_client(api_key),
+            deadline_seconds=CONFIG['OPENAI_DEADLINE_SECONDS'],
+            timeout_seconds=CONFIG['OPENAI_TIMEOUT_SECONDS'],
+            connect_timeout_seconds=CONFIG['OPENAI_CONNECT_TIMEOUT_SECONDS'],
+            max_retries=CONFIG['OPENAI_MAX_RETRIES'],
+            backoff_base_seconds=CONFIG['OPENAI_BACKOFF_BASE_SECONDS'],
+            backoff_max_seconds=CONFIG['OPENAI_BACKOFF_MAX_SECONDS'],
+            hedge_after_seconds=CONFIG['OPENAI_HEDGE_AFTER_SECONDS'],
+            breaker=CircuitBreaker(CONFIG['CIRCUIT_FAILURE_THRESHOLD'], CONFIG['CIRCUIT_RESET_SECONDS'])
+        )
+        trace_file = CONFIG['TRACE_FILE'].format(pid=os.getpid()) if CONFIG['TRACE_FILE'] else None
+        self.telemetry = Telemetry(CONFIG['TELEMETRY_ENABLED'], trace_file)
+        self.storage = InMemoryBackend()
+        self.fast_path_router = FastPathRouter()
+        self.tool_executor = ToolExecutor(
+            max_workers=CONFIG['TOOL_EXECUTOR_MAX_WORKERS'],
+            default_timeout=CONFIG['TOOL_TIMEOUT_SECONDS'],
+            tool_timeouts=CONFIG['TOOL_TIMEOUTS']
+        )
+        self.tool_cache = ToolResultCache(CONFIG['TOOL_CACHE_MAX_ENTRIES'], CONFIG['TOOL_CACHE_TTLS'])
+        self.response_renderer = ResponseRenderer(CONFIG['RESPONSE_MODE'], CONFIG['LOCAL_RESPONSE_POLICY'])
+        self.history_manager = HistoryManager(CONFIG['HISTORY_TOKEN_BUDGET'], CONFIG['HISTORY_KEEP_RECENT_TURNS'])
+        self.session_store = create_session_store(CONFIG)
+        self.discount_codes = create_discount_code_service(CONFIG)
+        self.telemetry.add_collector(self._collect_metrics)
+        if storage is not None:
+            self.storage = storage
+        else:
+            self.load_data()
+        self.semantic_index = self._create_semantic_index()
+        self.data_refresher = None
+        if CONFIG['DATA_REFRESH_ENABLED']:
+            self.start_data_refresher()
+        self.request_builder = self._create_request_builder()
+        if CONFIG['OPENAI_PREWARM']:
+            threading.Thread(target=self._prewarm, name="openai-prewarm", daemon=True).start()
+        logger.info("Agent initialization complete")
+
+    @property
+    def client(self):
+        """ The OpenAI client, created on first use """
+        return self.api.client
+
+    @cached_property
+    def pacific_tz(self):
+        import pytz
+
+        return pytz.timezone(CONFIG['TIMEZONE'])
+
+    def _create_client(self, api_key):
+        """ Create the OpenAI client used for model calls, over a pooled keep-alive HTTP client """
+        import httpx
+        from openai import OpenAI
+
+        http_client = httpx.Client(limits=connection_limits(CONFIG), timeout=request_timeout(CONFIG))
+        # Retries are made by self.api, within the call deadline
+        return OpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+
+    def _prewarm(self):
+        """ Import the SDK, create the client and load the tokenizer off the startup path """
+        started = time.perf_counter()
+        try:
+            self.api.client
+            count_text_tokens("warm up")
+        except Exception as e:
+            logger.warning("Prewarming the OpenAI client failed: %s", e)
+            return
+        logger.info("OpenAI client ready after %.0fms", (time.perf_counter() - started) * 1000)
+
+    def _create_request_builder(self) -> RequestBuilder:
+        """ Prepare the request prefix, loading the precompiled one in fast-start mode when it is current """
+        if CONFIG['FAST_START']:
+            builder = load_request_builder(CONFIG['ARTIFACTS_FILE'], CONFIG['OPENAI_MODEL'])
+            if builder is not None:
+                self.system_prompt = builder.system_message["content"]
+                self.tools = builder.tools
+                return builder
         self.setup_system_prompt()
         self.tools = self.define_tools()
-        logger.info("Agent initialization complete")
+        return RequestBuilder(self.system_prompt, self.tools, CONFIG['OPENAI_MODEL'])
 
     def load_data(self):
-        """ Load data from JSON files """
-        logger.info("Loading data from JSON files")
+        """ Open the configured storage backend (JSON files, SQLite or a mapped snapshot) """
+        logger.info(f"Loading data from the {CONFIG['STORAGE_BACKEND']} storage backend")
         try:
-            with open(CONFIG['CUSTOMER_ORDERS_FILE'], 'r') as f:
-                self.orders_data = json.load(f)
-                logger.info(f"Loaded {len(self.orders_data)} customer orders")
-            with open(CONFIG['PRODUCT_CATALOG_FILE'], 'r') as f:
-                self.products_data = json.load(f)
-                logger.info(f"Loaded {len(self.products_data)} products")
+            snapshot = open_snapshot_storage(CONFIG) if CONFIG['FAST_START'] else None
+            self.storage = snapshot if snapshot is not None else create_backend(CONFIG)
+            logger.info(f"Loaded {self.storage.order_count()} customer orders")
+            logger.info(f"Loaded {self.storage.product_count()} products")
 
         except FileNotFoundError as e:
             logger.error(f"Data files not found: {e}")
@@ -81,6 +175,10 @@ class SierraOutfittersAgent:
         - Prioritize matching products by name over SKU or tags when a customer asks about a product.
         - When using the check_product_availability function, try to extract the most likely product name from the customer's query.
 
+        4. Multi-item questions: answer them with a single tool call.
+        - Use check_order_status_batch for several orders, or for the items in an order and whether they are in stock.
+        - Use check_product_availability_batch for several products.
+
         Guardrails:
         - You can only provide information about the products in the catalog
         - If you don't have the answer, say you don't know instead of making it up
@@ -142,7 +240,7 @@ class SierraOutfittersAgent:
                 "type": "function",
                 "function": {
                     "name": "generate_discount_code",
-                    "description": "Generate a unique discount code for Early Risers Promotion. Only available between 8:00-10:00 AM Pacific Time.",
+                    "description": "Generate a unique discount code for Early Risers Promotion. Only available between 8:00-10:00 AM Pacific Time. One code per customer per day, for customers who have confirmed an order (email and order number) in this conversation.",
                     "parameters": {
                         "type": "object",
                         "properties": {},
@@ -153,6 +251,7 @@ class SierraOutfittersAgent:
                         "properties": {
                             "success": {"type": "boolean"},
                             "discount_code": {"type": "string"},
+                            "reissued": {"type": "boolean"},
                             "formatted_response": {"type": "string", "description": "A complete, ready-to-present response with the Sierra Outfitters voice"}
                         }
                     }
@@ -166,7 +265,7 @@ class SierraOutfittersAgent:
                     "parameters": {
                         "type": "object",
                         "properties": {
-                            "product_query": {"type": "string", "description": "Product SKU, name, or a descriptive term that might match product tags"}
+                            "product_query": {"type": "string", "description": "Product SKU, name, or a description of what the customer is looking for"}
                         },
                         "required": ["product_query"]
                     },
@@ -182,6 +281,65 @@ class SierraOutfittersAgent:
                         }
                     }
                 }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "check_order_status_batch",
+                    "description": "Check several orders at once, including the stock of every product in each order. Use this when a customer asks about more than one order, or about the items in an order.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "orders": {
+                                "type": "array",
+                                "description": "Orders to check",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "email": {"type": "string", "description": "Customer's email address associated with the order"},
+                                        "order_number": {"type": "string", "description": "Order number, with or without the # prefix"}
+                                    },
+                                    "required": ["email", "order_number"]
+                                }
+                            }
+                        },
+                        "required": ["orders"]
+                    },
+                    "return": {
+                        "type": "object",
+                        "properties": {
+                            "success": {"type": "boolean"},
+                            "results": {"type": "array", "description": "One check_order_status result per order, with a products list of the order's items and their stock"},
+                            "formatted_response": {"type": "string", "description": "A complete, ready-to-present response with the Sierra Outfitters voice"}
+                        }
+                    }
+                }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "check_product_availability_batch",
+                    "description": "Check the availability of several products at once. Use this instead of repeated check_product_availability calls.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "product_queries": {
+                                "type": "array",
+                                "description": "Product SKUs, names, or descriptions of what the customer is looking for",
+                                "items": {"type": "string"}
+                            }
+                        },
+                        "required": ["product_queries"]
+                    },
+                    "return": {
+                        "type": "object",
+                        "properties": {
+                            "success": {"type": "boolean"},
+                            "results": {"type": "array", "description": "One check_product_availability result per query"},
+                            "formatted_response": {"type": "string", "description": "A complete, ready-to-present response with the Sierra Outfitters voice"}
+                        }
+                    }
+                }
             }
         ]
 
@@ -195,35 +353,42 @@ class SierraOutfittersAgent:
             {
                 "success": bool,  # Whether the order was found
                 "customer_name": str,  # Name of the customer (if found)
+                "order_number": str,  # Order number as stored (if found)
                 "status": str,  # Status of the order (if found)
                 "tracking_info": str,  # Tracking information (if available)
                 "formatted_response": str  # A properly formatted customer-facing response
             }
         """
 
-        logger.info(f"Checking order status for email: {email}, order: {order_number}")
+        logger.info("Checking order status for email: %s, order: %s", email, order_number)
         # If order_number doesn't have a # prefix, add it
         if order_number and not order_number.startswith("#"):
             order_number = "#" + order_number
-            
-        order = next((order for order in self.orders_data 
-        if order['Email'].lower() == email.lower() 
-        and order['OrderNumber'].lower() == order_number.lower()
-        ), None)
+
+        # Constant-time lookup on the normalized (email, order number) index
+        order = self.storage.get_order(email, order_number)
 
         if not order:
-            logger.warning(f"Order not found for email: {email}, order: {order_number}")
+            logger.warning("Order not found for email: %s, order: %s", email, order_number)
             return {
                 "success": False,
                 "formatted_response": "We couldn't find your order. Please check your email and order number and try again. The mountain path is clearer with the right coordinates! 🏔️"
             }
 
+        logger.info("Order found for %s, status: %s", email, order['Status'])
+        return self._order_status_result(order)
+
+    @staticmethod
+    def _order_status_result(order: Dict[str, Any]) -> Dict[str, Any]:
+        """ check_order_status result for a found order """
+        order_number = order['OrderNumber']
+
         # Generate tracking info if available
         tracking_info = ""
         if order['TrackingNumber']:
             tracking_url = CONFIG['USPS_TRACKING_URL'].format(tracking_number=order['TrackingNumber'])
             tracking_info = f"You can track your order at {tracking_url}."
-            logger.debug(f"Generated tracking URL for order {order_number}: {tracking_url}")
+            logger.debug("Generated tracking URL for order %s: %s", order_number, tracking_url)
 
         # Format status messages with outdoorsy messages
         status_messages = {
@@ -238,10 +403,10 @@ class SierraOutfittersAgent:
             f"Hi {order['CustomerName']}! Your order {order['OrderNumber']} is being processed. The adventure awaits! 🏔️"
         )
 
-        logger.info(f"Order found for {email}, status: {order['Status']}")
         return {
             "success": True,
             "customer_name": order["CustomerName"],
+            "order_number": order["OrderNumber"],
             "status": order['Status'],
             "tracking_info": tracking_info if order['TrackingNumber'] else "No tracking information yet, but your adventure is coming soon! 🏔️",
             "formatted_response": formatted_response
@@ -250,26 +415,26 @@ class SierraOutfittersAgent:
     # ======== Feature 2: Early Risers Promotion ========
 
     def check_early_riser_eligibility(self) -> bool:
-        """ Check if it's time for the Early Risers Promotion """
-
-        logger.debug("Checking Early Risers Promotion eligibility")
-        now = datetime.now(self.pacific_tz)
-        start_time = now.replace(hour=CONFIG['EARLY_RISER_START_HOUR'], minute=0, second=0, microsecond=0)
-        end_time = now.replace(hour=CONFIG['EARLY_RISER_END_HOUR'], minute=0, second=0, microsecond=0)
-
-        # Check if it's between 8:00 and 10:00 AM Pacific Time
-        is_eligible = start_time <= now < end_time
-        logger.info(f"Early Risers eligibility: {is_eligible}, current time (PT): {now.strftime('%H:%M:%S')}")
+        """ Check if it's time for the Early Risers Promotion (the day's window is computed once and cached) """
+        is_eligible = self.discount_codes.window.is_open()
+        logger.debug("Early Risers eligibility: %s", is_eligible)
         return is_eligible
 
     def generate_discount_code(self) -> Dict[str, Any]:
         """ Generate a unique discount code for Early Risers Promotion 
-        
+
+        Codes are recorded, and each customer gets one per day; asking again
+        returns that code. The customer is the email of an order they confirmed
+        (email and order number) in this conversation, so a new session or an
+        unverified email does not get around the limit.
+
         Returns:
             Dict with the following structure:
             {
                 "success": bool,  # Whether a discount code was generated
                 "discount_code": str,  # The generated discount code (if successful)
+                "reissued": bool,  # Whether the customer was given this code before (if successful)
+                "reason": str,  # 'outside_hours', 'unverified' or 'unavailable' (if not successful)
                 "formatted_response": str  # A properly formatted customer-facing response
             }
         """
@@ -278,20 +443,50 @@ class SierraOutfittersAgent:
             logger.info("Early Risers Promotion requested outside of eligible hours")
             return {
                 "success": False,
+                "reason": "outside_hours",
                 "formatted_response": f"The Early Risers Promotion is only available between {CONFIG['EARLY_RISER_START_HOUR']}:00-{CONFIG['EARLY_RISER_END_HOUR']}:00 AM Pacific Time. It's currently {datetime.now(self.pacific_tz).strftime('%I:%M %p')} Pacific Time. Come back during our promotion hours to claim your discount! The mountains will be waiting! 🏔️"
             }
 
-        # Generate a unique discount code
-        unique_id = str(uuid.uuid4())[:8].upper()
-        discount_code = f"EARLY10-{unique_id}"
-        logger.info(f"Generated Early Risers discount code: {discount_code}")
+        email = self._verified_email()
+        if not email:
+            logger.info("Early Risers code requested before the customer confirmed an order")
+            return {
+                "success": False,
+                "reason": "unverified",
+                "formatted_response": "I'd love to get you an Early Risers code! First, could you share the email and order number of one of your orders so I can confirm it's you? 🏔️"
+            }
+        try:
+            issued = self.discount_codes.issue(f"email:{normalize_email(email)}")
+        except (TimeoutError, sqlite3.Error) as e:
+            logger.error("Could not record an Early Risers discount code: %s", e)
+            return {
+                "success": False,
+                "reason": "unavailable",
+                "formatted_response": "I couldn't confirm your Early Risers code just now. Please ask again in a moment - you'll get the same code once it's recorded! 🏔️"
+            }
+        discount_code = issued["code"]
+        if issued["reissued"]:
+            logger.info("Early Risers discount code already issued to this customer: %s", discount_code)
+            formatted_response = f"You've already claimed today's Early Risers discount! Your code is {discount_code} for {CONFIG['EARLY_RISER_DISCOUNT']} off your next purchase. See you on the trail! 🏔️"
+        else:
+            logger.info("Generated Early Risers discount code: %s", discount_code)
+            formatted_response = f"You've earned an Early Risers discount! Use code {discount_code} for {CONFIG['EARLY_RISER_DISCOUNT']} off your next purchase. The early explorer catches the best views! 🏔️"
 
         return {
             "success": True,
             "discount_code": discount_code,
-            "formatted_response": f"You've earned an Early Risers discount! Use code {discount_code} for {CONFIG['EARLY_RISER_DISCOUNT']} off your next purchase. The early explorer catches the best views! 🏔️"
+            "reissued": issued["reissued"],
+            "formatted_response": formatted_response
         }
     
+    def _verified_email(self) -> Optional[str]:
+        """ Email of the order confirmed in the session of the running turn, or None outside a turn """
+        turn = _current_turn.get()
+        if turn is None:
+            return None
+        session_id, session = turn
+        return self.history_manager.verified_email(session.history, session_id)
+    
     # ======== Feature 3: Product Availability ========
 
     def check_product_availability(self, product_query: str) -> Dict[str, Any]:
@@ -305,30 +500,25 @@ class SierraOutfittersAgent:
                 "sku": str,  # SKU of the product (if found)
                 "in_stock": bool,  # Whether the product is in stock (if found)
                 "inventory": int,  # Quantity available (if found)
+                "exact_match": bool,  # Whether the query was the product's SKU (if found)
+                "other_matches": list,  # Next-best ranked matches (if any)
                 "formatted_response": str  # A properly formatted customer-facing response
             }
         """
 
-        logger.info(f"Checking product availability for query: '{product_query}'")
+        logger.info("Checking product availability for query: '%s'", product_query)
 
-        # First, try to find an exact match by SKU
-        product = next((p for p in self.products_data if p["SKU"].lower() == product_query.lower()), None)
-        
-        # If no exact SKU match, try finding by name (partial match)
-        if not product:
-            matching_products = [p for p in self.products_data 
-                                if product_query.lower() in p["ProductName"].lower()]
-            
-            # If still no match, try matching by tags
-            if not matching_products:
-                matching_products = [p for p in self.products_data 
-                                    if any(product_query.lower() in tag.lower() for tag in p["Tags"])]
-            
-            # If we found multiple products, just take the first one for simplicity
-            product = matching_products[0] if matching_products else None
+        # Ranked lookup: exact SKU, then BM25 over name/tags/description with typo tolerance (and vector matches)
+        matches = self._search_products(product_query, CONFIG['PRODUCT_SEARCH_TOP_K'])
+        return self._availability_result(product_query, matches)
+
+    @staticmethod
+    def _availability_result(product_query: str, matches: List[Tuple[Dict[str, Any], float]]) -> Dict[str, Any]:
+        """ check_product_availability result for a query's ranked matches """
+        product = matches[0][0] if matches else None
         
         if not product:
-            logger.warning(f"No product found matching query: '{product_query}'")
+            logger.warning("No product found matching query: '%s'", product_query)
             return {
                 "success": False,
                 "formatted_response": "I couldn't find that product in our catalog. Can you try a different name or description? Every explorer needs the right gear for their journey! 🏔️"
@@ -336,7 +526,8 @@ class SierraOutfittersAgent:
         
         # Check inventory
         in_stock = product["Inventory"] > 0
-        logger.info(f"Product found: {product['ProductName']}, SKU: {product['SKU']}, In Stock: {in_stock}, Quantity: {product['Inventory']}")
+        logger.info("Product found: %s, SKU: %s, In Stock: %s, Quantity: %s",
+                    product['ProductName'], product['SKU'], in_stock, product['Inventory'])
         
         # Format the response based on inventory status
         if in_stock:
@@ -353,94 +544,522 @@ class SierraOutfittersAgent:
             "sku": product["SKU"],
             "in_stock": in_stock,
             "inventory": product["Inventory"],
+            "exact_match": product["SKU"].upper() == product_query.strip().upper(),
+            "other_matches": [
+                {"product_name": p["ProductName"], "sku": p["SKU"], "in_stock": p["Inventory"] > 0}
+                for p, _ in matches[1:]
+            ],
             "formatted_response": formatted_response
         }
 
+    # ======== Multi-item Lookups ========
+
+    def check_order_status_batch(self, orders: List[Dict[str, str]]) -> Dict[str, Any]:
+        """ Check several orders and the availability of every product in them in one call
+
+        Args:
+            orders: List of {"email": str, "order_number": str}
+
+        Returns:
+            Dict with the following structure:
+            {
+                "success": bool,  # Whether any order was found
+                "results": list,  # One check_order_status result per order, in order, plus
+                                  # "products": [{"sku", "product_name", "in_stock", "inventory"}] when found
+                "formatted_response": str  # A properly formatted customer-facing response
+            }
+        """
+        orders = self._batch_items(orders, "orders")
+        logger.info("Checking %d orders", len(orders))
+        found = []
+        for entry in orders:
+            email = entry.get("email", "") if isinstance(entry, dict) else ""
+            order_number = entry.get("order_number", "") if isinstance(entry, dict) else ""
+            if order_number and not order_number.startswith("#"):
+                order_number = "#" + order_number
+            found.append((order_number, self.storage.get_order(email, order_number)))
+
+        # Every SKU of every order, resolved against the SKU index in one pass
+        skus = list(dict.fromkeys(sku for _, order in found if order for sku in order.get("ProductsOrdered") or []))
+        products = dict(zip(skus, self.storage.get_products_by_skus(skus)))
+
+        results = []
+        for order_number, order in found:
+            if order is None:
+                logger.warning("Order not found in batch: %s", order_number)
+                results.append({
+                    "success": False,
+                    "formatted_response": f"We couldn't find {f'order {order_number}' if order_number else 'that order'}. Please check the email and order number and try again. The mountain path is clearer with the right coordinates! 🏔️"
+                })
+                continue
+            result = self._order_status_result(order)
+            result["products"] = [self._product_summary(sku, products.get(sku))
+                                  for sku in order.get("ProductsOrdered") or []]
+            items = ", ".join(
+                f"{item['product_name']} ({'in stock' if item['in_stock'] else 'out of stock'})"
+                for item in result["products"] if item["product_name"]
+            )
+            if items:
+                result["formatted_response"] += f" Items in this order: {items}."
+            results.append(result)
+
+        return {
+            "success": any(result["success"] for result in results),
+            "results": results,
+            "formatted_response": "\n\n".join(result["formatted_response"] for result in results)
+                                  or "Which orders should I look up? Share the email and order numbers and I'll scout them out! 🏔️"
+        }
+
+    def check_product_availability_batch(self, product_queries: List[str]) -> Dict[str, Any]:
+        """ Check the availability of several products (SKUs, names or descriptions) in one call
+
+        Returns:
+            Dict with the following structure:
+            {
+                "success": bool,  # Whether any product was found
+                "results": list,  # One check_product_availability result per query, in order
+                "formatted_response": str  # A properly formatted customer-facing response
+            }
+        """
+        queries = [str(query) for query in self._batch_items(product_queries, "product queries")]
+        logger.info("Checking availability of %d products", len(queries))
+        matches = self._search_products_many(queries, CONFIG['PRODUCT_SEARCH_TOP_K'])
+        results = [self._availability_result(query, query_matches) for query, query_matches in zip(queries, matches)]
+        return {
+            "success": any(result["success"] for result in results),
+            "results": results,
+            "formatted_response": "\n\n".join(result["formatted_response"] for result in results)
+                                  or "Which products should I check? Every explorer needs the right gear for their journey! 🏔️"
+        }
+
+    @staticmethod
+    def _batch_items(items, kind: str) -> list:
+        """ A batch tool's list argument, cut to CONFIG['TOOL_BATCH_MAX_ITEMS'] """
+        items = items if isinstance(items, list) else []
+        if len(items) > CONFIG['TOOL_BATCH_MAX_ITEMS']:
+            logger.warning("Batch of %d %s cut to %d", len(items), kind, CONFIG['TOOL_BATCH_MAX_ITEMS'])
+            items = items[:CONFIG['TOOL_BATCH_MAX_ITEMS']]
+        return items
+
+    @staticmethod
+    def _product_summary(sku: str, product: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """ Availability of an ordered product (product is None when it is no longer in the catalog) """
+        if product is None:
+            return {"sku": sku, "product_name": None, "in_stock": False, "inventory": 0}
+        return {
+            "sku": product["SKU"],
+            "product_name": product["ProductName"],
+            "in_stock": product["Inventory"] > 0,
+            "inventory": product["Inventory"],
+        }
+
+    def _create_semantic_index(self):
+        """ Load or build the vector index used by the 'hybrid' and 'semantic' search modes """
+        mode = CONFIG['PRODUCT_SEARCH_MODE']
+        if mode not in ("lexical", "hybrid", "semantic"):
+            raise ValueError(f"Unknown product search mode: {mode}")
+        if mode == "lexical":
+            return None
+        from semantic_search import create_semantic_index
+
+        return create_semantic_index(CONFIG, self.storage.iter_products())
+
+    def _search_products(self, query: str, top_k: int) -> List[Tuple[Dict[str, Any], float]]:
+        """ Up to top_k (product, score) pairs: BM25 alone, or fused with vector matches by reciprocal rank """
+        if self.semantic_index is None:
+            return self.storage.search_products(query, top_k)
+        return self._search_products_many([query], top_k)[0]
+
+    def _search_products_many(self, queries: List[str], top_k: int) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """ _search_products() for several queries
+
+        Exact SKUs are resolved in one index lookup and vector matches are
+        scored for all remaining queries in one matrix product.
+        """
+        exact = self.storage.get_products_by_skus(queries)
+        results = [[(product, float("inf"))] if product is not None else None for product in exact]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if self.semantic_index is None:
+            for i in pending:
+                results[i] = self.storage.search_products(queries[i], top_k)
+            return results
+
+        hybrid = CONFIG['PRODUCT_SEARCH_MODE'] == "hybrid"
+        vector_matches = self.semantic_index.search_many([queries[i] for i in pending], top_k)
+        for i, matches in zip(pending, vector_matches):
+            rankings = [[sku for sku, _ in matches]]
+            if hybrid:
+                lexical = self.storage.search_products(queries[i], top_k)
+                rankings.insert(0, [product["SKU"].upper() for product, _ in lexical])
+            fused = reciprocal_rank_fusion(rankings, top_k)
+            if hybrid:
+                # A vector-only match never outranks a keyword match (the sort is stable)
+                keyword_skus = set(rankings[0])
+                fused.sort(key=lambda item: item[0] not in keyword_skus)
+            products = self.storage.get_products_by_skus([sku for sku, _ in fused])
+            results[i] = [(product, score) for product, (_, score) in zip(products, fused) if product is not None]
+        return results
+
+    # ======== Data Updates ========
+
+    def update_order(self, email: str, order_number: str, **fields) -> Optional[Dict[str, Any]]:
+        """ Update an order (e.g. Status, TrackingNumber) and invalidate its cached status """
+        order = self.storage.update_order(email, order_number, **fields)
+        self.tool_cache.invalidate_order(email, order_number)
+        if order is not None and "Email" in fields:
+            self.tool_cache.invalidate_order(order["Email"], order["OrderNumber"])
+        return order
+
+    def upsert_order(self, order: Dict[str, Any]):
+        """ Insert or replace an order record and invalidate its cached status """
+        self.storage.upsert_order(order)
+        self.tool_cache.invalidate_order(order["Email"], order["OrderNumber"])
+
+    @staticmethod
+    def _changes_ranking(previous: Optional[Dict[str, Any]], product: Dict[str, Any]) -> bool:
+        """ Whether replacing previous with product can change search results for any query """
+        text_fields = ("ProductName", "Tags", "Description")
+        return previous is None or any(previous.get(field) != product.get(field) for field in text_fields)
+
+    def update_product(self, product: Dict[str, Any]):
+        """ Insert or replace a product record and invalidate affected cached results """
+        previous = self.storage.get_product_by_sku(product["SKU"])
+        self.storage.upsert_product(product)
+        if self._changes_ranking(previous, product):
+            if self.semantic_index is not None:
+                self.semantic_index.upsert(product)
+            # Search ranking may change for any query
+            self.tool_cache.invalidate_tool("check_product_availability")
+        else:
+            self.tool_cache.invalidate_product(product["SKU"])
+
+    def apply_data_changes(self, upsert_orders=(), remove_orders=(), upsert_products=(), remove_products=()):
+        """ Apply a batch of record changes atomically and invalidate affected cached results """
+        reindexed = [product for product in upsert_products
+                     if self._changes_ranking(self.storage.get_product_by_sku(product["SKU"]), product)]
+        ranking_changed = bool(remove_products or reindexed)
+        self.storage.apply_changes(upsert_orders, remove_orders, upsert_products, remove_products)
+        if self.semantic_index is not None:
+            for sku in remove_products:
+                self.semantic_index.remove(sku)
+            for product in reindexed:
+                self.semantic_index.upsert(product)
+
+        for order in upsert_orders:
+            self.tool_cache.invalidate_order(order["Email"], order["OrderNumber"])
+        for email, order_number in remove_orders:
+            self.tool_cache.invalidate_order(email, order_number)
+        if ranking_changed:
+            self.tool_cache.invalidate_tool("check_product_availability")
+        else:
+            for product in upsert_products:
+                self.tool_cache.invalidate_product(product["SKU"])
+
+    def start_data_refresher(self) -> Optional[DataRefresher]:
+        """ Start applying delta feed entries and data file edits in the background """
+        if self.storage.read_only:
+            logger.warning("Storage backend is read-only; hot reload is disabled")
+            return None
+        if self.data_refresher is None:
+            self.data_refresher = DataRefresher(
+                self,
+                CONFIG['CUSTOMER_ORDERS_FILE'],
+                CONFIG['PRODUCT_CATALOG_FILE'],
+                delta_file=CONFIG['DATA_DELTA_FEED_FILE'],
+                interval=CONFIG['DATA_REFRESH_INTERVAL_SECONDS'],
+                watch_data_files=CONFIG['DATA_REFRESH_WATCH_FILES']
+            ).start()
+        return self.data_refresher
+
+    # ======== Session Management ========
+
+    @contextmanager
+    def _session(self, session_id: str) -> Iterator[Session]:
+        """ Load a session's state for one turn and store it back afterwards
+
+        Fast-path slots and history memory are only held by the router and
+        history manager while the turn runs, so idle sessions cost nothing
+        beyond their encoded bytes in the session store.
+        """
+        with self.telemetry.span("session_load"):
+            session = self.session_store.load(session_id)
+        if session.slots:
+            self.fast_path_router.sessions[session_id] = session.slots
+        if session.memory:
+            self.history_manager.states[session_id] = session.memory
+        try:
+            yield session
+        finally:
+            session.slots = self.fast_path_router.sessions.pop(session_id, {})
+            session.memory = self.history_manager.states.pop(session_id, {})
+            with self.telemetry.span("session_save") as span:
+                span.set(bytes=self.session_store.save(session_id, session, on_trim=self.history_manager.remember))
+
+    @contextmanager
+    def _turn(self, session_id: str) -> Iterator[Session]:
+        """ Hold a session for one traced turn """
+        with self.telemetry.span("turn", session=session_id) as span, self._session(session_id) as session:
+            token = _current_turn.set((session_id, session))
+            try:
+                yield session
+            finally:
+                try:
+                    _current_turn.reset(token)
+                except ValueError:
+                    # A streamed turn closed from another context
+                    pass
+                self.telemetry.inc("sierra_turns_total", path=span.attributes.setdefault("path", "model"))
+
+    @property
+    def conversation_history(self) -> List[Dict[str, Any]]:
+        """ A copy of the default session's history; turns work on the history passed to them """
+        return self.get_session_history("default")
+
+    def get_session_history(self, session_id: str = "default") -> List[Dict[str, Any]]:
+        """ Return a copy of the stored conversation history for a session """
+        return self.session_store.load(session_id).history
+
+    def end_session(self, session_id: str = "default"):
+        """ Drop all state held for a session """
+        logger.info("Ending session: %s", session_id)
+        self.session_store.delete(session_id)
+        self.fast_path_router.clear_session(session_id)
+        self.history_manager.clear_session(session_id)
+
+    # ======== Telemetry ========
+
+    @contextmanager
+    def _model_call(self, phase: str, request: ChatRequest) -> Iterator[Span]:
+        """ Trace one chat completion call and record the size of its prompt """
+        telemetry = self.telemetry
+        with telemetry.span("model_call", phase=phase) as span:
+            messages = len(request.body["messages"])
+            telemetry.inc("sierra_llm_calls_total", phase=phase)
+            telemetry.observe("sierra_prompt_tokens", request.static_tokens, phase=phase, part="static")
+            telemetry.observe("sierra_prompt_tokens", request.dynamic_tokens, phase=phase, part="dynamic")
+            telemetry.observe("sierra_prompt_messages", messages, phase=phase)
+            span.set(messages=messages, static_tokens=request.static_tokens, dynamic_tokens=request.dynamic_tokens)
+            try:
+                yield span
+            except Exception:
+                telemetry.inc("sierra_llm_errors_total", phase=phase)
+                telemetry.annotate_turn(path="error")
+                raise
+
+    def _record_usage(self, span: Span, phase: str, usage):
+        """ Record the token usage the API reported for a model call """
+        if usage is None:
+            return
+        self.telemetry.inc("sierra_llm_tokens_total", usage.prompt_tokens, phase=phase, kind="prompt")
+        self.telemetry.inc("sierra_llm_tokens_total", usage.completion_tokens, phase=phase, kind="completion")
+        span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+
+    def _collect_metrics(self) -> List[tuple]:
+        """ Samples read from the caches, router and session store whenever metrics are rendered """
+        cache = self.tool_cache.stats()
+        fast_path = self.fast_path_router.stats()
+        rendered = self.response_renderer.stats()
+        api = self.api.stats()
+        discounts = self.discount_codes.stats()
+        return [
+            ("sierra_tool_cache_hits_total", "counter", "Tool result cache hits", {}, cache["hits"]),
+            ("sierra_tool_cache_misses_total", "counter", "Tool result cache misses", {}, cache["misses"]),
+            ("sierra_tool_cache_hit_ratio", "gauge", "Tool result cache hit ratio since start", {}, cache["hit_rate"]),
+            ("sierra_tool_cache_entries", "gauge", "Tool results currently cached", {}, cache["size"]),
+            ("sierra_tool_timeouts_total", "counter", "Tool calls that exceeded their timeout", {},
+             self.tool_executor.timeouts),
+            ("sierra_fast_path_turns_total", "counter", "Turns seen by the fast-path router, by decision",
+             {"decision": "routed"}, fast_path["turns_routed"]),
+            ("sierra_fast_path_turns_total", "counter", "Turns seen by the fast-path router, by decision",
+             {"decision": "deferred"}, fast_path["turns_deferred"]),
+            ("sierra_fast_path_llm_calls_saved_total", "counter", "Model calls avoided by the fast path", {},
+             fast_path["llm_calls_saved"]),
+            ("sierra_tool_replies_total", "counter", "Tool turn replies, by whether they were rendered locally",
+             {"renderer": "template"}, rendered["rendered"]),
+            ("sierra_tool_replies_total", "counter", "Tool turn replies, by whether they were rendered locally",
+             {"renderer": "model"}, rendered["deferred"]),
+            ("sierra_sessions", "gauge", "Sessions held by the session store", {}, len(self.session_store)),
+            ("sierra_llm_attempts_total", "counter", "Chat completion requests sent, retries and hedges included",
+             {}, api["attempts"]),
+            ("sierra_llm_retries_total", "counter", "Chat completion retries after transient failures", {},
+             api["retries"]),
+            ("sierra_llm_hedges_total", "counter", "Hedged chat completion requests, by which copy answered",
+             {"winner": "hedge"}, api["hedge_wins"]),
+            ("sierra_llm_hedges_total", "counter", "Hedged chat completion requests, by which copy answered",
+             {"winner": "original"}, api["hedges"] - api["hedge_wins"]),
+            ("sierra_circuit_state", "gauge", "OpenAI circuit breaker state (0 closed, 1 half open, 2 open)", {},
+             CIRCUIT_STATES[api["circuit_state"]]),
+            ("sierra_circuit_rejections_total", "counter", "Model calls failed fast by the open circuit breaker",
+             {}, api["circuit_rejections"]),
+            ("sierra_discount_codes_total", "counter", "Early Risers code requests, by whether a new code was issued",
+             {"result": "issued"}, discounts["issued"]),
+            ("sierra_discount_codes_total", "counter", "Early Risers code requests, by whether a new code was issued",
+             {"result": "reissued"}, discounts["reissued"]),
+            ("sierra_discount_code_commits_total", "counter", "Transactions that recorded discount codes", {},
+             discounts["commits"]),
+            ("sierra_discount_code_collisions_total", "counter", "Generated discount codes dropped as duplicates", {},
+             discounts["collisions"]),
+            ("sierra_discount_code_pool", "gauge", "Pre-generated discount codes ready to issue", {},
+             discounts["pool"]),
+        ]
+
+    def flush_telemetry(self):
+        """ Write CONFIG['METRICS_FILE'] when set and close the trace file """
+        if CONFIG['METRICS_FILE']:
+            self.telemetry.write_metrics(CONFIG['METRICS_FILE'])
+        self.telemetry.close()
+
     # ======== Main Agent Helper Functions ========
 
-    def _add_to_conversation_history(self, role: str, content: any):
-        """Add a message to the conversation history"""
+    def _add_to_conversation_history(self, role: str, content: any, history: List[Dict[str, Any]]):
+        """Add a message to a turn's conversation history"""
         if role == "user" or role == "assistant" or role == "system":
             # For standard message types
-            self.conversation_history.append({"role": role, "content": content})
+            history.append({"role": role, "content": content})
         elif role == "model_dump" or role == "function_response":
             # For function responses
-            self.conversation_history.append(content)
+            history.append(content)
         else:
-            logger.warning(f"Unexpected role type in _add_to_conversation_history: {type(role)}")
+            logger.warning("Unexpected role type in _add_to_conversation_history: %s", type(role))
 
-    def _get_initial_model_response(self):
+    def _send_request(self, request: ChatRequest, stream: bool = False):
+        """ Post a prepared request body to the chat completions endpoint
+
+        The body is already in wire format, so it skips the SDK's per-call
+        validation of every message and tool (a coroutine for the async client).
+        Transient failures are retried by self.api within the call deadline.
+        """
+        return self.api.post("/chat/completions", body=request.body, stream=stream)
+
+    def _get_initial_model_response(self, history: List[Dict[str, Any]]):
         """Get the initial response from the LLM"""
         logger.debug("Calling OpenAI API")
         
-        # Construct messages array with system prompt and full conversation history
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-        ] + self.conversation_history
+        # Build the request: static system prompt and tools, then the conversation history
+        request = self.request_builder.build(history)
         
         # Call the OpenAI API
-        response = self.client.chat.completions.create(
-            model=CONFIG['OPENAI_MODEL'],
-            messages=messages,
-            tools=self.tools,
-            tool_choice="auto"
-        )
+        with self._model_call("initial", request) as span:
+            response = self._send_request(request)
+            self._record_usage(span, "initial", response.usage)
         
         logger.debug("Received response from OpenAI API")
         return response.choices[0].message
 
-    def _process_tool_calls(self, message):
+    def _process_tool_calls(self, message, history: List[Dict[str, Any]]):
         """Process tool calls from the model's response"""
-        logger.info(f"Tool calls detected: {len(message.tool_calls)}")
+        logger.info("Tool calls detected: %s", len(message.tool_calls))
         
         # Add the assistant's tool calls to conversation history
-        self._add_to_conversation_history("model_dump", message.model_dump())
+        self._add_to_conversation_history("model_dump", message.model_dump(), history)
         
         # Execute tool calls and collect responses
         function_responses = self._execute_tool_calls(message.tool_calls)
         
         # Add function responses to conversation history
         for func_response in function_responses:
-            self._add_to_conversation_history("function_response", func_response)
+            self._add_to_conversation_history("function_response", func_response, history)
+
+        # Simple lookups are answered from the tool results without a second model call
+        local_reply = self._render_tool_reply(function_responses, history)
+        if local_reply is not None:
+            self._add_to_conversation_history("assistant", local_reply, history)
+            return local_reply
         
         # Get final response incorporating tool results
-        return self._get_final_response_with_tools()
+        return self._get_final_response_with_tools(history)
 
-    def _execute_tool_calls(self, tool_calls):
-        """Execute the tool calls and return the responses"""
-        function_responses = []
-        
+    def _render_tool_reply(self, function_responses, history: List[Dict[str, Any]]) -> Optional[str]:
+        """Render the final reply locally when the response policy covers every tool result of a lookup-only turn"""
+        user_message = next((message.get("content") or "" for message in reversed(history)
+                             if message.get("role") == "user"), "")
+        reply = self.response_renderer.render([
+            (func_response["name"], json.loads(func_response["content"])) for func_response in function_responses
+        ], user_message)
+        if reply is not None:
+            self.telemetry.annotate_turn(path="local_template")
+        return reply
+
+    def _prepare_tool_calls(self, tool_calls):
+        """Parse tool call names and arguments ahead of execution"""
+        calls = []
         for tool_call in tool_calls:
             function_name = tool_call.function.name
             function_args = json.loads(tool_call.function.arguments)
-            logger.info(f"Executing tool call: {function_name}")
-            logger.debug(f"Tool call arguments: {function_args}")
-            
+            logger.info("Executing tool call: %s", function_name)
+            logger.debug("Tool call arguments: %s", function_args)
+            calls.append((function_name, function_args))
+        return calls
+
+    def _run_tool_call(self, function_name, function_args):
+        """Run a single tool call, converting exceptions into an error response"""
+        started = time.perf_counter()
+        with self.telemetry.span("tool", tool=function_name) as span:
             try:
                 function_response = self._call_tool_function(function_name, function_args)
-                
+                outcome = "ok" if function_response.get("success") else "failed"
+
                 # Validate the response
                 if function_response and "formatted_response" in function_response:
                     if function_response.get("success", False):
-                        logger.debug(f"Tool call successful: {function_name}")
+                        logger.debug("Tool call successful: %s", function_name)
             except Exception as e:
-                logger.error(f"Error executing tool call {function_name}: {str(e)}")
+                logger.error("Error executing tool call %s: %s", function_name, e)
+                outcome = "exception"
                 function_response = {
                     "success": False,
                     "error": str(e),
                     "formatted_response": "Sorry, I encountered an issue while processing your request. The trail got a bit rocky there! Can you try again? 🏔️"
                 }
-            
-            function_responses.append({
+            span.set(outcome=outcome)
+        self.telemetry.inc("sierra_tool_calls_total", tool=function_name, outcome=outcome)
+        self.telemetry.observe("sierra_tool_duration_seconds", time.perf_counter() - started, tool=function_name)
+        return function_response
+
+    @staticmethod
+    def _format_tool_responses(tool_calls, results):
+        """Pair tool results with their tool_call ids, preserving call order"""
+        return [
+            {
                 "tool_call_id": tool_call.id,
                 "role": "tool",
-                "name": function_name,
+                "name": tool_call.function.name,
                 "content": json.dumps(function_response)
-            })
-        
-        return function_responses
+            }
+            for tool_call, function_response in zip(tool_calls, results)
+        ]
+
+    def _execute_tool_calls(self, tool_calls):
+        """Execute the tool calls concurrently and return the responses in call order"""
+        calls = self._prepare_tool_calls(tool_calls)
+        with self.telemetry.span("tool_calls", count=len(calls)):
+            results = self.tool_executor.run(self._run_tool_call, calls)
+        return self._format_tool_responses(tool_calls, results)
+
+    async def _execute_tool_calls_async(self, tool_calls):
+        """Execute the tool calls concurrently without blocking the event loop"""
+        calls = self._prepare_tool_calls(tool_calls)
+        with self.telemetry.span("tool_calls", count=len(calls)):
+            results = await self.tool_executor.run_async(self._run_tool_call, calls)
+        return self._format_tool_responses(tool_calls, results)
 
     def _call_tool_function(self, function_name, function_args):
+        """Call the appropriate tool function, serving fresh results from the tool cache"""
+        if not self.tool_cache.is_cacheable(function_name):
+            return self._dispatch_tool_function(function_name, function_args)
+
+        cached = self.tool_cache.get(function_name, function_args)
+        if cached is not None:
+            logger.debug("Tool cache hit: %s", function_name)
+            self.telemetry.annotate(cached=True)
+            return cached
+
+        function_response = self._dispatch_tool_function(function_name, function_args)
+        if "error" not in function_response:
+            self.tool_cache.put(function_name, function_args, function_response)
+        return function_response
+
+    def _dispatch_tool_function(self, function_name, function_args):
         """Call the appropriate tool function based on the function name"""
         if function_name == "check_order_status":
             return self.check_order_status(
@@ -453,73 +1072,220 @@ class SierraOutfittersAgent:
             return self.check_product_availability(
                 function_args.get("product_query", "")
             )
+        elif function_name == "check_order_status_batch":
+            return self.check_order_status_batch(function_args.get("orders", []))
+        elif function_name == "check_product_availability_batch":
+            return self.check_product_availability_batch(function_args.get("product_queries", []))
         else:
-            logger.warning(f"Unknown function called: {function_name}")
+            logger.warning("Unknown function called: %s", function_name)
             return {
                 "success": False,
                 "error": f"Unknown function: {function_name}",
                 "formatted_response": "I don't know how to do that yet. But I'm always learning new trails! 🏔️"
             }
 
-    def _get_final_response_with_tools(self):
+    def _get_final_response_with_tools(self, history: List[Dict[str, Any]]):
         """Get the final response from the model after tool calls"""
         try:
             logger.debug("Calling OpenAI API for final response")
-            final_response = self.client.chat.completions.create(
-                model=CONFIG['OPENAI_MODEL'],
-                messages=[
-                    {"role": "system", "content": self.system_prompt}
-                ] + self.conversation_history,
-                tools=self.tools,
-                tool_choice="auto"
-            )
+            request = self.request_builder.build(history)
+            with self._model_call("final", request) as span:
+                final_response = self._send_request(request)
+                self._record_usage(span, "final", final_response.usage)
             logger.debug("Received final response from OpenAI API")
         except Exception as e:
-            logger.error(f"Error calling OpenAI API for final response: {str(e)}")
+            logger.error("Error calling OpenAI API for final response: %s", e)
             return "I'm sorry, I encountered an issue connecting to my base camp. Can you try again in a moment? 🏔️"
 
         # Extract message from final response
         final_message = final_response.choices[0].message
         
         # Add final assistant response to conversation history
-        self._add_to_conversation_history("assistant", final_message.content)
+        self._add_to_conversation_history("assistant", final_message.content, history)
         logger.info("Final response generated successfully")
         
         return final_message.content
 
-    def _process_direct_response(self, message):
+    def _process_direct_response(self, message, history: List[Dict[str, Any]]):
         """Handle a direct response with no tool calls"""
         logger.info("No tool calls detected, returning direct response")
         response_content = message.content
-        self._add_to_conversation_history("assistant", response_content)
+        self._add_to_conversation_history("assistant", response_content, history)
         return response_content
 
+    def _try_fast_path(self, user_message: str, session_id: str, history: List[Dict[str, Any]]) -> Optional[str]:
+        """Resolve structured turns (order numbers, emails, SKUs) without the LLM
+
+        Returns the reply, or None when the turn should go to the model.
+        """
+        routed = self._route_fast_path(user_message, session_id, history)
+        if routed is None:
+            return None
+        reply, tool_calls = routed
+        if tool_calls:
+            reply = self._fast_path_reply(self._execute_tool_calls(tool_calls), history)
+        self._add_to_conversation_history("assistant", reply, history)
+        return reply
+
+    def _route_fast_path(self, user_message: str, session_id: str,
+                         history: List[Dict[str, Any]]) -> Optional[Tuple[Optional[str], List[Any]]]:
+        """Route a turn for the fast path, recording its synthetic tool calls in the history
+
+        Returns None when the turn should go to the model, else (reply, tool calls):
+        a missing-slot prompt and no calls, or no reply yet and the calls to run.
+        """
+        if not CONFIG['FAST_PATH_ENABLED']:
+            return None
+        with self.telemetry.span("fast_path_route"):
+            decision = self.fast_path_router.route(session_id, user_message)
+        if decision is None:
+            return None
+        self.telemetry.annotate_turn(path="fast_path")
+
+        if "tool_calls" not in decision:
+            return MISSING_SLOT_PROMPTS[decision["missing_slot"]], []
+        # Record a synthetic tool call so the model sees the lookup in later turns
+        tool_calls = [
+            {
+                "id": f"call_fastpath_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])}
+            }
+            for call in decision["tool_calls"]
+        ]
+        # Plain dicts shaped like ChatCompletionMessage, so fast-path turns never need the SDK
+        self._add_to_conversation_history(
+            "model_dump", {"role": "assistant", "content": None, "tool_calls": tool_calls}, history
+        )
+        return None, [SimpleNamespace(id=call["id"], function=SimpleNamespace(**call["function"]))
+                      for call in tool_calls]
+
+    def _fast_path_reply(self, function_responses: List[Dict[str, Any]], history: List[Dict[str, Any]]) -> str:
+        """Record the fast path's tool results and join their formatted responses into the reply"""
+        for func_response in function_responses:
+            self._add_to_conversation_history("function_response", func_response, history)
+        return "\n\n".join(
+            json.loads(func_response["content"])["formatted_response"] for func_response in function_responses
+        )
+
+    def _compact_history(self, history: List[Dict[str, Any]], session_id: str = "default") -> int:
+        """Compact a history to the token budget, traced as its own phase"""
+        with self.telemetry.span("compact") as span:
+            tokens = self.history_manager.compact(history, session_id)
+            span.set(history_tokens=tokens, messages=len(history))
+        return tokens
+
+    def _stream_model_turn(self, history: List[Dict[str, Any]], accumulator: StreamAccumulator,
+                           phase: str = "initial") -> Iterator[str]:
+        """Stream one model call, yielding content tokens and assembling tool-call deltas"""
+        logger.debug("Calling OpenAI API (streaming)")
+        request = self.request_builder.build(history, stream=True)
+        with self._model_call(phase, request) as span:
+            stream = self._send_request(request, stream=True)
+            for chunk in stream:
+                token = accumulator.add_chunk(chunk)
+                if token:
+                    yield token
+            self._record_usage(span, phase, accumulator.usage)
+        logger.debug("OpenAI API stream complete")
+
     # ======== Main Agent Function Call ========
 
-    def process_message(self, user_message: str) -> str:
-        """ Process a message and return a response """
+    def process_message(self, user_message: str, stream: bool = False,
+                        session_id: str = "default") -> Union[str, Iterator[str]]:
+        """ Process a message and return a response, or an iterator of response tokens when stream=True """
         
-        logger.info(f"Processing user message: '{user_message[:50]}...' (truncated)")
+        if stream:
+            return self.stream_message(user_message, session_id)
+
+        with self._turn(session_id) as session:
+            return self._process_turn(user_message, session_id, session.history)
+
+    def _process_turn(self, user_message: str, session_id: str, history: List[Dict[str, Any]]) -> str:
+        """ Run one turn against a session's history """
+        logger.info("Processing user message: '%.50s...' (truncated)", user_message)
         
         # Update conversation with user message
-        self._add_to_conversation_history("user", user_message)
+        self._add_to_conversation_history("user", user_message, history)
+
+        # Structured turns are answered locally without a model call
+        fast_reply = self._try_fast_path(user_message, session_id, history)
+        if fast_reply is not None:
+            return fast_reply
+
+        # Keep the history sent to the model within the token budget
+        self._compact_history(history, session_id)
         
         # Get initial model response
         try:
-            message = self._get_initial_model_response()
+            message = self._get_initial_model_response(history)
         except Exception as e:
-            logger.error(f"Error calling OpenAI API: {str(e)}")
+            logger.error("Error calling OpenAI API: %s", e)
             return "I'm sorry, I encountered an issue connecting to my base camp. Can you try again in a moment? 🏔️"
 
         # Handle tool calls if present
         if message.tool_calls:
-            return self._process_tool_calls(message)
+            return self._process_tool_calls(message, history)
         
         # Handle direct response
-        return self._process_direct_response(message)
+        return self._process_direct_response(message, history)
+
+    def stream_message(self, user_message: str, session_id: str = "default") -> Iterator[str]:
+        """ Process a message, yielding response tokens as they arrive from the model """
+        with self._turn(session_id) as session:
+            yield from self._stream_turn(user_message, session_id, session.history)
+
+    def _stream_turn(self, user_message: str, session_id: str, history: List[Dict[str, Any]]) -> Iterator[str]:
+        """ Stream one turn against a session's history """
+        logger.info("Streaming response for user message: '%.50s...' (truncated)", user_message)
+        self._add_to_conversation_history("user", user_message, history)
+
+        fast_reply = self._try_fast_path(user_message, session_id, history)
+        if fast_reply is not None:
+            yield fast_reply
+            return
+
+        self._compact_history(history, session_id)
+
+        accumulator = StreamAccumulator()
+        try:
+            yield from self._stream_model_turn(history, accumulator)
+        except Exception as e:
+            logger.error("Error calling OpenAI API: %s", e)
+            yield "I'm sorry, I encountered an issue connecting to my base camp. Can you try again in a moment? 🏔️"
+            return
+        message = accumulator.to_message()
+
+        if message.tool_calls:
+            logger.info("Tool calls detected: %s", len(message.tool_calls))
+            self._add_to_conversation_history("model_dump", message.model_dump(), history)
+            function_responses = self._execute_tool_calls(message.tool_calls)
+            for func_response in function_responses:
+                self._add_to_conversation_history("function_response", func_response, history)
+
+            local_reply = self._render_tool_reply(function_responses, history)
+            if local_reply is not None:
+                self._add_to_conversation_history("assistant", local_reply, history)
+                yield local_reply
+                return
+
+            # Stream the final response incorporating tool results
+            accumulator = StreamAccumulator()
+            try:
+                yield from self._stream_model_turn(history, accumulator, "final")
+            except Exception as e:
+                logger.error("Error calling OpenAI API for final response: %s", e)
+                yield "I'm sorry, I encountered an issue connecting to my base camp. Can you try again in a moment? 🏔️"
+                return
+            message = accumulator.to_message()
+
+        self._add_to_conversation_history("assistant", message.content, history)
+        logger.info("Streamed response complete")
 
     def run_chat_loop(self):
         """ Run the main chat loop."""
+        from colorama import Fore, Style
+
         logger.info("Starting chat loop")
         print(f"{Fore.GREEN}🏔️ Sierra Outfitters Assistant{Style.RESET_ALL}")
         print(f"{Fore.CYAN}Type 'exit' to end the conversation{Style.RESET_ALL}")
@@ -528,8 +1294,10 @@ class SierraOutfittersAgent:
         initial_response = "🏔️ Welcome to Sierra Outfitters! How can I help you today? Onward into the unknown!"
         print(f"\n{Fore.GREEN}Sierra: {Style.RESET_ALL}{initial_response}\n")
         
-        # Add initial greeting to conversation history
-        self.conversation_history.append({"role": "assistant", "content": initial_response})
+        # Each chat loop starts a new conversation, even with a persistent session store
+        self.end_session()
+        with self._session("default") as session:
+            session.history.append({"role": "assistant", "content": initial_response})
   
         while True:
             user_input = input(f"{Fore.CYAN}You: {Style.RESET_ALL}").strip()
@@ -539,18 +1307,27 @@ class SierraOutfittersAgent:
                 break
             
             try:
-                response = self.process_message(user_input)
-                print(f"\n{Fore.GREEN}Sierra: {Style.RESET_ALL}{response}\n")
+                if CONFIG['STREAM_RESPONSES']:
+                    # Render tokens as they arrive to cut time-to-first-token
+                    print(f"\n{Fore.GREEN}Sierra: {Style.RESET_ALL}", end="", flush=True)
+                    for token in self.process_message(user_input, stream=True):
+                        print(token, end="", flush=True)
+                    print("\n")
+                else:
+                    response = self.process_message(user_input)
+                    print(f"\n{Fore.GREEN}Sierra: {Style.RESET_ALL}{response}\n")
             except Exception as e:
-                logger.error(f"Error processing message: {str(e)}")
+                logger.error("Error processing message: %s", e)
                 print(f"\n{Fore.GREEN}Sierra: {Style.RESET_ALL}I'm sorry, something went wrong on our hiking trail. Please try again! 🏔️\n")
 
 def main():
     """ Main function to run the Sierra Outfitters Agent """
     try:
+        configure_logging(CONFIG)
         logger.info("Starting Sierra Outfitters Agent")
         
         # Load environment variables
+        from dotenv import load_dotenv
         load_dotenv(CONFIG['ENV_FILE'])
         api_key = os.getenv("OPENAI_API_KEY")
         
@@ -560,7 +1337,12 @@ def main():
             return
         
         agent = SierraOutfittersAgent(api_key)
-        agent.run_chat_loop()
+        try:
+            agent.run_chat_loop()
+        finally:
+            agent.api.close()
+            agent.discount_codes.close()
+            agent.flush_telemetry()
     except KeyboardInterrupt:
         logger.info("Agent terminated by keyboard interrupt")
         print("\nExiting Sierra Agent. Happy trails! 🏔️")
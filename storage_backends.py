@@ -0,0 +1,911 @@
+"""
+Sierra Outfitters Storage Backends
+
+Pluggable storage behind the order and product lookups:
+- InMemoryBackend: loads the JSON files into per-process indexes (default)
+- SQLiteBackend: indexed SQLite database, shared by any number of processes
+- SnapshotBackend: read-only memory-mapped binary snapshot; every process
+  maps the same file, so the OS page cache holds a single copy
+
+All backends rank products with the same BM25 impacts and fuzzy term
+expansion as ProductSearchEngine.
+
+Usage:
+    python -m storage_backends sqlite --out data/sierra-outfitters.db
+    python -m storage_backends snapshot --out data/sierra-outfitters.snap
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import threading
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Tuple
+
+from data_loader import load_orders, load_products
+from order_repository import OrderRepository, normalize_email, normalize_order_number
+from product_search import (MIN_SCORE, ProductSearchEngine, FuzzyVocabulary, weighted_terms, bm25_impacts, relevant,
+                            tokenize)
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_sku(sku: str) -> str:
+    return (sku or "").strip().upper()
+
+
+def normalize_tracking_number(tracking_number: str) -> str:
+    return (tracking_number or "").strip().upper()
+
+
+def _top_k(scores: Dict[int, float], top_k: int) -> List[Tuple[int, float]]:
+    """ Best (doc_id, score) pairs; ties break on catalog order """
+    return heapq.nsmallest(top_k, scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+class StorageBackend:
+    """ Interface the agent uses to read and update orders and products """
+
+    read_only = False
+
+    # ======== Orders ========
+
+    def get_order(self, email: str, order_number: str) -> Optional[Dict[str, Any]]:
+        """ Return the order matching the email and order number, or None """
+        raise NotImplementedError
+
+    def find_orders_by_email(self, email: str) -> List[Dict[str, Any]]:
+        """ Return every order placed with the given email """
+        raise NotImplementedError
+
+    def find_order_by_tracking_number(self, tracking_number: str) -> Optional[Dict[str, Any]]:
+        """ Return the order shipped with the given tracking number, or None """
+        raise NotImplementedError
+
+    def iter_orders(self) -> Iterator[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def order_count(self) -> int:
+        raise NotImplementedError
+
+    def upsert_order(self, order: Dict[str, Any]) -> bool:
+        """ Insert or replace an order; True if it was newly inserted """
+        raise NotImplementedError
+
+    def remove_order(self, email: str, order_number: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def update_order(self, email: str, order_number: str, **fields) -> Optional[Dict[str, Any]]:
+        """ Update fields of an existing order and return the updated record, or None if missing """
+        order = self.get_order(email, order_number)
+        if order is None:
+            logger.warning(f"Cannot update missing order for email: {email}, order: {order_number}")
+            return None
+        updated = dict(order)
+        updated.update(fields)
+        if (normalize_email(updated["Email"]), normalize_order_number(updated["OrderNumber"])) != \
+                (normalize_email(email), normalize_order_number(order_number)):
+            self.remove_order(email, order_number)
+        self.upsert_order(updated)
+        return updated
+
+    # ======== Products ========
+
+    def get_product_by_sku(self, sku: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def get_products_by_skus(self, skus: Iterable[str]) -> List[Optional[Dict[str, Any]]]:
+        """ Products for several SKUs, in order (None for unknown SKUs) """
+        return [self.get_product_by_sku(sku) for sku in skus]
+
+    def search_products(self, query: str, top_k: int = 5) -> List[Tuple[Dict[str, Any], float]]:
+        """ Return up to top_k (product, score) pairs ranked by relevance """
+        raise NotImplementedError
+
+    def product_count(self) -> int:
+        raise NotImplementedError
+
+    def iter_products(self) -> Iterator[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def upsert_product(self, product: Dict[str, Any]):
+        raise NotImplementedError
+
+    def remove_product(self, sku: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    # ======== Batch Updates ========
+
+    def apply_changes(self, upsert_orders: Iterable[Dict[str, Any]] = (),
+                      remove_orders: Iterable[Tuple[str, str]] = (),
+                      upsert_products: Iterable[Dict[str, Any]] = (),
+                      remove_products: Iterable[str] = ()):
+        """ Apply a batch of changes; readers of an index see all of the batch or none of it
+
+        remove_orders holds (email, order number) keys and remove_products holds SKUs.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InMemoryBackend(StorageBackend):
+    """ Per-process hash and inverted indexes built from the JSON data files """
+
+    def __init__(self, orders: Optional[Iterable[Dict[str, Any]]] = None,
+                 products: Optional[Iterable[Dict[str, Any]]] = None, **search_options):
+        self.order_repository = OrderRepository(orders)
+        self.product_search = ProductSearchEngine(products, **search_options)
+        # Serializes writers; readers never take it
+        self._write_lock = threading.Lock()
+
+    @classmethod
+    def from_files(cls, orders_file: str, products_file: str, **search_options) -> "InMemoryBackend":
+        """ Stream JSON or JSON Lines data files straight into the indexes """
+        return cls(load_orders(orders_file), load_products(products_file), **search_options)
+
+    def get_order(self, email, order_number):
+        return self.order_repository.get(email, order_number)
+
+    def find_orders_by_email(self, email):
+        return self.order_repository.find_by_email(email)
+
+    def find_order_by_tracking_number(self, tracking_number):
+        return self.order_repository.find_by_tracking_number(tracking_number)
+
+    def iter_orders(self):
+        return iter(self.order_repository)
+
+    def order_count(self):
+        return len(self.order_repository)
+
+    def upsert_order(self, order):
+        with self._write_lock:
+            return self.order_repository.upsert(order)
+
+    def remove_order(self, email, order_number):
+        with self._write_lock:
+            return self.order_repository.remove(email, order_number)
+
+    def update_order(self, email, order_number, **fields):
+        with self._write_lock:
+            return self.order_repository.update(email, order_number, **fields)
+
+    def get_product_by_sku(self, sku):
+        return self.product_search.get_by_sku(sku)
+
+    def search_products(self, query, top_k=5):
+        return self.product_search.search(query, top_k)
+
+    def product_count(self):
+        return len(self.product_search)
+
+    def iter_products(self):
+        return (product for product in self.product_search.products if product is not None)
+
+    def upsert_product(self, product):
+        with self._write_lock:
+            engine = self.product_search.copy()
+            engine.upsert(product)
+            self._swap_products(engine)
+
+    def remove_product(self, sku):
+        with self._write_lock:
+            engine = self.product_search.copy()
+            product = engine.remove(sku)
+            if product is not None:
+                self._swap_products(engine)
+            return product
+
+    def _swap_products(self, engine: ProductSearchEngine):
+        """ Swap in an updated copy of the product index, compacted once tombstones pile up (write lock held)
+
+        Readers never take the lock, so the live index is never written to;
+        a search sees either the old index or the new one.
+        """
+        self.product_search = engine.compacted() if engine.needs_compaction else engine
+
+    def apply_changes(self, upsert_orders=(), remove_orders=(), upsert_products=(), remove_products=()):
+        """ Apply the batch to copies of the indexes, then swap them in with one assignment each """
+        upsert_orders, remove_orders = list(upsert_orders), list(remove_orders)
+        upsert_products, remove_products = list(upsert_products), list(remove_products)
+        with self._write_lock:
+            if upsert_orders or remove_orders:
+                orders = self.order_repository.copy()
+                for email, order_number in remove_orders:
+                    orders.remove(email, order_number)
+                for order in upsert_orders:
+                    orders.upsert(order)
+                self.order_repository = orders
+            if upsert_products or remove_products:
+                engine = self.product_search.copy()
+                for sku in remove_products:
+                    engine.remove(sku)
+                for product in upsert_products:
+                    engine.upsert(product)
+                self._swap_products(engine)
+
+
+# ======== SQLite ========
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    email TEXT NOT NULL,
+    order_number TEXT NOT NULL,
+    tracking_number TEXT,
+    record TEXT NOT NULL,
+    PRIMARY KEY (email, order_number)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS orders_by_tracking ON orders (tracking_number) WHERE tracking_number IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS products (
+    doc_id INTEGER PRIMARY KEY,
+    sku TEXT NOT NULL UNIQUE,
+    length REAL NOT NULL,
+    record TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    doc_freq INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    impact REAL NOT NULL,
+    doc_id INTEGER NOT NULL,
+    PRIMARY KEY (term, impact DESC, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_by_doc ON postings (doc_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+class SQLiteBackend(StorageBackend):
+    """ SQLite store with indexed order keys and impact-ordered product postings
+
+    Each thread gets its own connection. The database runs in WAL mode, so
+    readers in other processes are never blocked by a writer.
+    """
+
+    def __init__(self, path: str, read_only: bool = False, max_postings: int = 1000,
+                 fuzzy_threshold: float = 0.4, fuzzy_expansions: int = 3, mmap_bytes: int = 256 << 20,
+                 min_score: float = MIN_SCORE):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"SQLite database not found: {path} (build it with: python -m storage_backends sqlite)")
+        self.path = path
+        self.read_only = read_only
+        self.max_postings = max_postings
+        self.fuzzy_threshold = fuzzy_threshold
+        self.fuzzy_expansions = fuzzy_expansions
+        self.min_score = min_score
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._vocabulary: Optional[FuzzyVocabulary] = None
+        self._vocabulary_lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """ This thread's connection """
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            mode = "ro" if self.read_only else "rw"
+            # Only the owning thread uses a connection; close() may run on any thread
+            conn = sqlite3.connect(f"file:{self.path}?mode={mode}", uri=True, timeout=5.0,
+                                   check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size = {int(self.mmap_bytes)}")
+            if self.read_only:
+                conn.execute("PRAGMA query_only = ON")
+            self._local.connection = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """ Commit on exit of the outermost block, so writes can be grouped into one batch """
+        conn = self.connection
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        try:
+            yield conn
+            if depth == 0:
+                conn.commit()
+        except BaseException:
+            if depth == 0:
+                conn.rollback()
+            raise
+        finally:
+            self._local.depth = depth
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    @classmethod
+    def build(cls, path: str, orders: Iterable[Dict[str, Any]], products: Iterable[Dict[str, Any]],
+              k1: float = 1.2, b: float = 0.75, **options) -> "SQLiteBackend":
+        """ Create (or replace) a database from order and product records """
+        if os.path.exists(path):
+            os.remove(path)
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SQLITE_SCHEMA)
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO orders (email, order_number, tracking_number, record) VALUES (?, ?, ?, ?)",
+                    (cls._order_row(order) for order in orders)
+                )
+
+            engine = ProductSearchEngine(products, k1=k1, b=b)
+            with conn:
+                conn.executemany(
+                    "INSERT INTO products (doc_id, sku, length, record) VALUES (?, ?, ?, ?)",
+                    ((doc_id, normalize_sku(product["SKU"]), sum(weighted_terms(product).values()),
+                      json.dumps(dict(product)))
+                     for doc_id, product in enumerate(engine.products))
+                )
+                for term, entries in engine.iter_postings():
+                    conn.execute("INSERT INTO terms (term, doc_freq) VALUES (?, ?)", (term, len(entries)))
+                    conn.executemany("INSERT INTO postings (term, impact, doc_id) VALUES (?, ?, ?)",
+                                     ((term, impact, doc_id) for impact, doc_id in entries))
+                conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+                    ("k1", k1), ("b", b), ("doc_count", len(engine)),
+                    ("total_length", engine.avg_length * len(engine)),
+                ])
+            conn.execute("ANALYZE")
+            logger.info(f"Built SQLite store {path}: {len(engine)} products")
+        finally:
+            conn.close()
+        return cls(path, **options)
+
+    @staticmethod
+    def _order_row(order: Dict[str, Any]) -> Tuple[str, str, Optional[str], str]:
+        tracking_number = order.get("TrackingNumber")
+        return (normalize_email(order["Email"]), normalize_order_number(order["OrderNumber"]),
+                normalize_tracking_number(tracking_number) if tracking_number else None,
+                json.dumps(dict(order)))
+
+    # ======== Orders ========
+
+    def get_order(self, email, order_number):
+        row = self.connection.execute(
+            "SELECT record FROM orders WHERE email = ? AND order_number = ?",
+            (normalize_email(email), normalize_order_number(order_number))
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_orders_by_email(self, email):
+        rows = self.connection.execute("SELECT record FROM orders WHERE email = ?", (normalize_email(email),))
+        return [json.loads(record) for record, in rows]
+
+    def find_order_by_tracking_number(self, tracking_number):
+        row = self.connection.execute(
+            "SELECT record FROM orders WHERE tracking_number = ?", (normalize_tracking_number(tracking_number),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_orders(self):
+        for record, in self.connection.execute("SELECT record FROM orders"):
+            yield json.loads(record)
+
+    def order_count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def upsert_order(self, order):
+        row = self._order_row(order)
+        with self._transaction() as conn:
+            existed = conn.execute("SELECT 1 FROM orders WHERE email = ? AND order_number = ?", row[:2]).fetchone()
+            conn.execute(
+                "INSERT INTO orders (email, order_number, tracking_number, record) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (email, order_number) DO UPDATE SET "
+                "tracking_number = excluded.tracking_number, record = excluded.record",
+                row
+            )
+        return existed is None
+
+    def remove_order(self, email, order_number):
+        order = self.get_order(email, order_number)
+        if order is not None:
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM orders WHERE email = ? AND order_number = ?",
+                             (normalize_email(email), normalize_order_number(order_number)))
+        return order
+
+    # ======== Products ========
+
+    def get_product_by_sku(self, sku):
+        row = self.connection.execute("SELECT record FROM products WHERE sku = ?", (normalize_sku(sku),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_products_by_skus(self, skus):
+        skus = [normalize_sku(sku) for sku in skus]
+        wanted = list(dict.fromkeys(skus))
+        found = {}
+        # One query per chunk instead of one per SKU
+        for i in range(0, len(wanted), 500):
+            chunk = wanted[i:i + 500]
+            found.update(self.connection.execute(
+                f"SELECT sku, record FROM products WHERE sku IN ({','.join('?' * len(chunk))})", chunk))
+        return [json.loads(found[sku]) if sku in found else None for sku in skus]
+
+    def product_count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def iter_products(self):
+        for record, in self.connection.execute("SELECT record FROM products ORDER BY doc_id"):
+            yield json.loads(record)
+
+    def _meta(self, conn: sqlite3.Connection) -> Dict[str, float]:
+        return dict(conn.execute("SELECT key, value FROM meta"))
+
+    def _load_vocabulary(self) -> FuzzyVocabulary:
+        """ Trigram vocabulary, built on the first query term that misses the index """
+        with self._vocabulary_lock:
+            if self._vocabulary is None:
+                terms = (term for term, in self.connection.execute("SELECT term FROM terms"))
+                self._vocabulary = FuzzyVocabulary(terms, self.fuzzy_threshold, self.fuzzy_expansions)
+            return self._vocabulary
+
+    def _expand_term(self, conn: sqlite3.Connection, token: str) -> List[Tuple[str, float]]:
+        if conn.execute("SELECT 1 FROM terms WHERE term = ?", (token,)).fetchone():
+            return [(token, 1.0)]
+        return self._load_vocabulary().expand(token)
+
+    def search_products(self, query, top_k=5):
+        product = self.get_product_by_sku(query)
+        if product is not None:
+            return [(product, float("inf"))]
+
+        conn = self.connection
+        tokens = set(tokenize(query))
+        scores: Dict[int, float] = {}
+        get_score = scores.get
+        matched: Counter = Counter()
+        for token in tokens:
+            hits = set()
+            for term, weight in self._expand_term(conn, token):
+                rows = conn.execute(
+                    "SELECT impact, doc_id FROM postings WHERE term = ? ORDER BY impact DESC LIMIT ?",
+                    (term, self.max_postings)
+                )
+                for impact, doc_id in rows:
+                    scores[doc_id] = get_score(doc_id, 0.0) + impact * weight
+                    hits.add(doc_id)
+            matched.update(hits)
+
+        best = _top_k(relevant(scores, matched, len(tokens), self.min_score), top_k)
+        if not best:
+            return []
+        placeholders = ",".join("?" * len(best))
+        records = dict(conn.execute(f"SELECT doc_id, record FROM products WHERE doc_id IN ({placeholders})",
+                                    [doc_id for doc_id, _ in best]))
+        return [(json.loads(records[doc_id]), score) for doc_id, score in best if doc_id in records]
+
+    def upsert_product(self, product):
+        """ Insert or replace a product; re-indexes text only when it changed """
+        sku = normalize_sku(product["SKU"])
+        terms = weighted_terms(product)
+        record = json.dumps(dict(product))
+        with self._transaction() as conn:
+            row = conn.execute("SELECT doc_id, length, record FROM products WHERE sku = ?", (sku,)).fetchone()
+            if row is not None:
+                doc_id, length, previous = row
+                previous_terms = weighted_terms(json.loads(previous))
+                if previous_terms == terms:
+                    # Non-text change (e.g. Inventory): swap the record in place
+                    conn.execute("UPDATE products SET record = ? WHERE doc_id = ?", (record, doc_id))
+                    return
+                self._retire_product(conn, doc_id, length, previous_terms)
+
+            length = sum(terms.values())
+            # New versions go to the end of the catalog, like the in-memory engine
+            cursor = conn.execute("INSERT INTO products (sku, length, record) VALUES (?, ?, ?)", (sku, length, record))
+            doc_id = cursor.lastrowid
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'doc_count'")
+            conn.execute("UPDATE meta SET value = value + ? WHERE key = 'total_length'", (length,))
+            conn.executemany(
+                "INSERT INTO terms (term, doc_freq) VALUES (?, 1) "
+                "ON CONFLICT (term) DO UPDATE SET doc_freq = doc_freq + 1",
+                ((term,) for term in terms)
+            )
+
+            meta = self._meta(conn)
+            doc_freqs = dict(conn.execute(
+                f"SELECT term, doc_freq FROM terms WHERE term IN ({','.join('?' * len(terms))})", list(terms)
+            )) if terms else {}
+            impacts = bm25_impacts(terms, lambda term: doc_freqs.get(term, 0), int(meta["doc_count"]),
+                                   meta["total_length"] / meta["doc_count"], meta["k1"], meta["b"])
+            conn.executemany("INSERT INTO postings (term, impact, doc_id) VALUES (?, ?, ?)",
+                             ((term, impact, doc_id) for term, impact in impacts.items()))
+
+        if self._vocabulary is not None:
+            with self._vocabulary_lock:
+                for term in terms:
+                    self._vocabulary.add(term)
+
+    def remove_product(self, sku):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT doc_id, length, record FROM products WHERE sku = ?",
+                               (normalize_sku(sku),)).fetchone()
+            if row is None:
+                return None
+            doc_id, length, record = row
+            product = json.loads(record)
+            self._retire_product(conn, doc_id, length, weighted_terms(product))
+        return product
+
+    @staticmethod
+    def _retire_product(conn: sqlite3.Connection, doc_id: int, length: float, terms: Dict[str, float]):
+        """ Delete a product with its postings and back its terms out of the statistics """
+        conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        conn.execute("DELETE FROM products WHERE doc_id = ?", (doc_id,))
+        conn.executemany("UPDATE terms SET doc_freq = doc_freq - 1 WHERE term = ?", ((term,) for term in terms))
+        conn.execute("UPDATE meta SET value = value - 1 WHERE key = 'doc_count'")
+        conn.execute("UPDATE meta SET value = value - ? WHERE key = 'total_length'", (length,))
+
+    def apply_changes(self, upsert_orders=(), remove_orders=(), upsert_products=(), remove_products=()):
+        """ Apply the batch in a single transaction; WAL readers keep the previous version until commit """
+        with self._transaction():
+            for email, order_number in remove_orders:
+                self.remove_order(email, order_number)
+            for order in upsert_orders:
+                self.upsert_order(order)
+            for sku in remove_products:
+                self.remove_product(sku)
+            for product in upsert_products:
+                self.upsert_product(product)
+
+
+# ======== Memory-Mapped Snapshot ========
+#
+# Layout (little-endian):
+#   header    magic, order count, product count, then (offset, size) per section
+#   records   u32 length + UTF-8 JSON per order and product
+#   tables    open-addressing hash tables of (u64 key hash, u64 value + 1) slots;
+#             a zero value marks an empty slot
+#   postings  per term: u16 term length, term, u32 doc_freq, u32 count,
+#             then count x (f64 impact, u32 doc_id) by descending impact
+
+SNAPSHOT_MAGIC = b"SOSNAP01"
+SNAPSHOT_SECTIONS = ("order_table", "email_table", "email_lists", "tracking_table",
+                     "doc_offsets", "sku_table", "term_table", "postings", "vocabulary")
+_HEADER = struct.Struct("<8sQQ" + "QQ" * len(SNAPSHOT_SECTIONS))
+_SLOT = struct.Struct("<QQ")
+_RECORD_LENGTH = struct.Struct("<I")
+_POSTING = struct.Struct("<dI")
+_POSTINGS_HEADER = struct.Struct("<II")
+
+
+def _key_hash(key: str) -> int:
+    """ Stable 64-bit key hash (Python's hash() is salted per process) """
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+
+
+def _order_key(email: str, order_number: str) -> str:
+    return f"{normalize_email(email)}\0{normalize_order_number(order_number)}"
+
+
+def _u64_bytes(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _hash_table(entries: List[Tuple[int, int]]) -> bytes:
+    """ Pack (key hash, value) pairs into a linear-probing table at most half full """
+    capacity = 8
+    while capacity < 2 * len(entries):
+        capacity *= 2
+    slots = array("Q", bytes(16 * capacity))
+    mask = capacity - 1
+    for key_hash, value in entries:
+        slot = key_hash & mask
+        while slots[2 * slot + 1]:
+            slot = (slot + 1) & mask
+        slots[2 * slot] = key_hash
+        slots[2 * slot + 1] = value + 1
+    return _u64_bytes(slots)
+
+
+class SnapshotBackend(StorageBackend):
+    """ Read-only lookups over a memory-mapped binary snapshot """
+
+    read_only = True
+
+    def __init__(self, path: str, max_postings: int = 1000, fuzzy_threshold: float = 0.4,
+                 fuzzy_expansions: int = 3, min_score: float = MIN_SCORE):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Snapshot not found: {path} (build it with: python -m storage_backends snapshot)")
+        self.path = path
+        self.max_postings = max_postings
+        self.fuzzy_threshold = fuzzy_threshold
+        self.fuzzy_expansions = fuzzy_expansions
+        self.min_score = min_score
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        header = _HEADER.unpack_from(self._map, 0)
+        if header[0] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path}: not a Sierra Outfitters snapshot")
+        self._order_count, self._product_count = header[1], header[2]
+        self._sections = {name: (header[3 + 2 * i], header[4 + 2 * i]) for i, name in enumerate(SNAPSHOT_SECTIONS)}
+        self._vocabulary: Optional[FuzzyVocabulary] = None
+        self._vocabulary_lock = threading.Lock()
+
+    def close(self):
+        self._view.release()
+        self._map.close()
+
+    @classmethod
+    def write(cls, path: str, orders: Iterable[Dict[str, Any]], products: Iterable[Dict[str, Any]],
+              k1: float = 1.2, b: float = 0.75):
+        """ Write a snapshot from order and product records (atomically replaces path) """
+        repository = OrderRepository(orders)
+        engine = ProductSearchEngine(products, k1=k1, b=b)
+        sections: Dict[str, Tuple[int, int]] = {}
+        tmp_path = f"{path}.tmp"
+
+        with open(tmp_path, "wb") as f:
+            f.write(bytes(_HEADER.size))
+
+            def write_record(record: Dict[str, Any]) -> int:
+                offset = f.tell()
+                data = json.dumps(dict(record)).encode()
+                f.write(_RECORD_LENGTH.pack(len(data)) + data)
+                return offset
+
+            def write_section(name: str, data: bytes):
+                sections[name] = (f.tell(), len(data))
+                f.write(data)
+
+            order_entries, tracking_entries = [], []
+            email_offsets: Dict[str, List[int]] = {}
+            for order in repository:
+                offset = write_record(order)
+                order_entries.append((_key_hash(_order_key(order["Email"], order["OrderNumber"])), offset))
+                email_offsets.setdefault(normalize_email(order["Email"]), []).append(offset)
+                if order.get("TrackingNumber"):
+                    tracking_entries.append((_key_hash(normalize_tracking_number(order["TrackingNumber"])), offset))
+            doc_offsets = array("Q", (write_record(product) for product in engine.products))
+
+            email_lists = bytearray()
+            email_entries = []
+            for email, offsets in email_offsets.items():
+                email_entries.append((_key_hash(email), len(email_lists)))
+                email_lists += _RECORD_LENGTH.pack(len(offsets)) + _u64_bytes(array("Q", offsets))
+
+            postings = bytearray()
+            term_entries = []
+            terms = []
+            for term, entries in engine.iter_postings():
+                term_bytes = term.encode()
+                term_entries.append((_key_hash(term), len(postings)))
+                terms.append(term)
+                postings += struct.pack("<H", len(term_bytes)) + term_bytes
+                postings += _POSTINGS_HEADER.pack(len(entries), len(entries))
+                for impact, doc_id in entries:
+                    postings += _POSTING.pack(impact, doc_id)
+
+            write_section("order_table", _hash_table(order_entries))
+            write_section("email_table", _hash_table(email_entries))
+            write_section("email_lists", bytes(email_lists))
+            write_section("tracking_table", _hash_table(tracking_entries))
+            write_section("doc_offsets", _u64_bytes(doc_offsets))
+            write_section("sku_table", _hash_table(
+                [(_key_hash(normalize_sku(product["SKU"])), doc_id) for doc_id, product in enumerate(engine.products)]
+            ))
+            write_section("term_table", _hash_table(term_entries))
+            write_section("postings", bytes(postings))
+            write_section("vocabulary", "\n".join(terms).encode())
+
+            f.seek(0)
+            f.write(_HEADER.pack(SNAPSHOT_MAGIC, len(repository), len(engine),
+                                 *(value for name in SNAPSHOT_SECTIONS for value in sections[name])))
+        os.replace(tmp_path, path)
+        logger.info(f"Wrote snapshot {path}: {len(repository)} orders, {len(engine)} products")
+
+    # ======== Low-Level Reads ========
+
+    def _probe(self, table: str, key_hash: int) -> Iterator[int]:
+        """ Yield the values stored under key_hash (more than one only on hash collisions) """
+        offset, size = self._sections[table]
+        mask = size // _SLOT.size - 1
+        slot = key_hash & mask
+        while True:
+            stored_hash, value = _SLOT.unpack_from(self._map, offset + slot * _SLOT.size)
+            if not value:
+                return
+            if stored_hash == key_hash:
+                yield value - 1
+            slot = (slot + 1) & mask
+
+    def _record(self, offset: int) -> Dict[str, Any]:
+        length, = _RECORD_LENGTH.unpack_from(self._map, offset)
+        start = offset + _RECORD_LENGTH.size
+        return json.loads(self._map[start:start + length])
+
+    def _product(self, doc_id: int) -> Dict[str, Any]:
+        offset, _ = self._sections["doc_offsets"]
+        return self._record(struct.unpack_from("<Q", self._map, offset + 8 * doc_id)[0])
+
+    def _postings_entry(self, term: str) -> Optional[Tuple[int, int]]:
+        """ (count, start offset) of a term's postings, or None if the term is not indexed """
+        base, _ = self._sections["postings"]
+        term_bytes = term.encode()
+        for relative in self._probe("term_table", _key_hash(term)):
+            position = base + relative
+            length, = struct.unpack_from("<H", self._map, position)
+            position += 2
+            if self._map[position:position + length] == term_bytes:
+                _, count = _POSTINGS_HEADER.unpack_from(self._map, position + length)
+                return count, position + length + _POSTINGS_HEADER.size
+        return None
+
+    # ======== Orders ========
+
+    def get_order(self, email, order_number):
+        key = (normalize_email(email), normalize_order_number(order_number))
+        for offset in self._probe("order_table", _key_hash(_order_key(email, order_number))):
+            order = self._record(offset)
+            if (normalize_email(order["Email"]), normalize_order_number(order["OrderNumber"])) == key:
+                return order
+        return None
+
+    def find_orders_by_email(self, email):
+        email = normalize_email(email)
+        base, _ = self._sections["email_lists"]
+        for relative in self._probe("email_table", _key_hash(email)):
+            count, = _RECORD_LENGTH.unpack_from(self._map, base + relative)
+            offsets = struct.unpack_from(f"<{count}Q", self._map, base + relative + _RECORD_LENGTH.size)
+            orders = [self._record(offset) for offset in offsets]
+            if orders and normalize_email(orders[0]["Email"]) == email:
+                return orders
+        return []
+
+    def find_order_by_tracking_number(self, tracking_number):
+        tracking_number = normalize_tracking_number(tracking_number)
+        for offset in self._probe("tracking_table", _key_hash(tracking_number)):
+            order = self._record(offset)
+            if normalize_tracking_number(order.get("TrackingNumber")) == tracking_number:
+                return order
+        return None
+
+    def iter_orders(self):
+        offset = _HEADER.size
+        for _ in range(self._order_count):
+            length, = _RECORD_LENGTH.unpack_from(self._map, offset)
+            yield self._record(offset)
+            offset += _RECORD_LENGTH.size + length
+
+    def order_count(self):
+        return self._order_count
+
+    def upsert_order(self, order):
+        raise NotImplementedError("Snapshots are read-only; rebuild the snapshot to change orders")
+
+    def remove_order(self, email, order_number):
+        raise NotImplementedError("Snapshots are read-only; rebuild the snapshot to change orders")
+
+    # ======== Products ========
+
+    def get_product_by_sku(self, sku):
+        sku = normalize_sku(sku)
+        for doc_id in self._probe("sku_table", _key_hash(sku)):
+            product = self._product(doc_id)
+            if normalize_sku(product["SKU"]) == sku:
+                return product
+        return None
+
+    def product_count(self):
+        return self._product_count
+
+    def _load_vocabulary(self) -> FuzzyVocabulary:
+        with self._vocabulary_lock:
+            if self._vocabulary is None:
+                offset, size = self._sections["vocabulary"]
+                terms = self._map[offset:offset + size].decode().split("\n") if size else []
+                self._vocabulary = FuzzyVocabulary(terms, self.fuzzy_threshold, self.fuzzy_expansions)
+            return self._vocabulary
+
+    def search_products(self, query, top_k=5):
+        product = self.get_product_by_sku(query)
+        if product is not None:
+            return [(product, float("inf"))]
+
+        tokens = set(tokenize(query))
+        scores: Dict[int, float] = {}
+        get_score = scores.get
+        matched: Counter = Counter()
+        for token in tokens:
+            entry = self._postings_entry(token)
+            if entry is not None:
+                entries = [(entry, 1.0)]
+            else:
+                entries = [(self._postings_entry(term), weight) for term, weight in self._load_vocabulary().expand(token)]
+            hits = set()
+            for (count, start), weight in entries:
+                end = start + min(count, self.max_postings) * _POSTING.size
+                for impact, doc_id in _POSTING.iter_unpack(self._view[start:end]):
+                    scores[doc_id] = get_score(doc_id, 0.0) + impact * weight
+                    hits.add(doc_id)
+            matched.update(hits)
+
+        scores = relevant(scores, matched, len(tokens), self.min_score)
+        return [(self._product(doc_id), score) for doc_id, score in _top_k(scores, top_k)]
+
+    def iter_products(self):
+        return (self._product(doc_id) for doc_id in range(self._product_count))
+
+    def upsert_product(self, product):
+        raise NotImplementedError("Snapshots are read-only; rebuild the snapshot to change products")
+
+    def remove_product(self, sku):
+        raise NotImplementedError("Snapshots are read-only; rebuild the snapshot to change products")
+
+    def apply_changes(self, upsert_orders=(), remove_orders=(), upsert_products=(), remove_products=()):
+        raise NotImplementedError("Snapshots are read-only; rebuild the snapshot to apply changes")
+
+
+def create_backend(config: Dict[str, Any]) -> StorageBackend:
+    """ Open the storage backend selected by CONFIG['STORAGE_BACKEND'] """
+    kind = config['STORAGE_BACKEND']
+    search_options = {
+        "max_postings": config['PRODUCT_SEARCH_MAX_POSTINGS'],
+        "fuzzy_threshold": config['PRODUCT_SEARCH_FUZZY_THRESHOLD'],
+        "min_score": config['PRODUCT_SEARCH_MIN_SCORE'],
+    }
+    if kind == "memory":
+        return InMemoryBackend.from_files(config['CUSTOMER_ORDERS_FILE'], config['PRODUCT_CATALOG_FILE'],
+                                          **search_options)
+    if kind == "sqlite":
+        return SQLiteBackend(config['SQLITE_DB_FILE'], read_only=config['STORAGE_READ_ONLY'],
+                             mmap_bytes=config['SQLITE_MMAP_BYTES'], **search_options)
+    if kind == "snapshot":
+        return SnapshotBackend(config['SNAPSHOT_FILE'], **search_options)
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+
+def main():
+    from config import get_config
+
+    config = get_config()
+    parser = argparse.ArgumentParser(description="Build a shared on-disk store from the JSON data files")
+    parser.add_argument("kind", choices=["sqlite", "snapshot"])
+    parser.add_argument("--orders", default=config['CUSTOMER_ORDERS_FILE'])
+    parser.add_argument("--products", default=config['PRODUCT_CATALOG_FILE'])
+    parser.add_argument("--out", help="Output path (defaults to SQLITE_DB_FILE / SNAPSHOT_FILE)")
+    args = parser.parse_args()
+
+    if args.kind == "sqlite":
+        out = args.out or config['SQLITE_DB_FILE']
+        SQLiteBackend.build(out, load_orders(args.orders), load_products(args.products)).close()
+    else:
+        out = args.out or config['SNAPSHOT_FILE']
+        SnapshotBackend.write(out, load_orders(args.orders), load_products(args.products))
+    print(f"Wrote {args.kind} store to {out}")
+
+
+if __name__ == "__main__":
+    main()
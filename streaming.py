@@ -0,0 +1,63 @@
+"""
+Sierra Outfitters Streaming Helpers
+
+Assembles streamed chat completion chunks (content tokens and tool-call
+deltas) back into a complete assistant message.
+"""
+
+from typing import Dict, Any, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletionMessage
+
+
+class StreamAccumulator:
+    """ Incrementally rebuilds an assistant message from streamed chunks """
+
+    def __init__(self):
+        self.content_parts = []
+        self.tool_calls: Dict[int, Dict[str, Any]] = {}
+        # Token usage, sent in a final chunk without choices when the request asks for it
+        self.usage = None
+
+    def add_chunk(self, chunk) -> Optional[str]:
+        """ Fold one streamed chunk into the message
+
+        Returns:
+            The content token carried by the chunk, if any
+        """
+        if getattr(chunk, "usage", None) is not None:
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return None
+        delta = chunk.choices[0].delta
+
+        for tool_call in delta.tool_calls or []:
+            entry = self.tool_calls.setdefault(tool_call.index, {
+                "id": "",
+                "type": "function",
+                "function": {"name": "", "arguments": ""}
+            })
+            if tool_call.id:
+                entry["id"] = tool_call.id
+            if tool_call.function:
+                if tool_call.function.name:
+                    entry["function"]["name"] += tool_call.function.name
+                if tool_call.function.arguments:
+                    entry["function"]["arguments"] += tool_call.function.arguments
+
+        if delta.content:
+            self.content_parts.append(delta.content)
+            return delta.content
+        return None
+
+    def to_message(self) -> "ChatCompletionMessage":
+        """ Build the assembled assistant message """
+        # Imported here so the SDK stays off the import path until a model call streams
+        from openai.types.chat import ChatCompletionMessage
+
+        return ChatCompletionMessage(
+            role="assistant",
+            content="".join(self.content_parts) or None,
+            tool_calls=[self.tool_calls[index] for index in sorted(self.tool_calls)] or None
+        )
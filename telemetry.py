@@ -0,0 +1,318 @@
+"""
+Sierra Outfitters Telemetry
+
+Per-turn tracing and metrics:
+- spans for each phase of a turn (fast path, compaction, model calls, tool
+  calls), nested through a context variable so they follow async tasks and
+  tool executor threads
+- counters and histograms for model calls, token usage, prompt sizes, tool
+  durations and outcomes, plus gauges collected from the caches on demand
+- Prometheus text exposition output, and an optional Chrome trace event
+  file (open it in chrome://tracing or https://ui.perfetto.dev)
+"""
+
+import contextvars
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Callable, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+# name -> (type, help, histogram buckets)
+METRICS: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {
+    "sierra_turns_total": ("counter", "Turns processed, by how they were answered", ()),
+    "sierra_span_duration_seconds": ("histogram", "Duration of each traced phase of a turn", SECONDS_BUCKETS),
+    "sierra_llm_calls_total": ("counter", "Chat completion calls, by phase", ()),
+    "sierra_llm_errors_total": ("counter", "Chat completion calls that failed, by phase", ()),
+    "sierra_llm_tokens_total": ("counter", "Tokens reported by the API, by phase and kind", ()),
+    "sierra_prompt_tokens": ("histogram", "Estimated prompt tokens per model call, by static prefix and dynamic part",
+                             SIZE_BUCKETS),
+    "sierra_prompt_messages": ("histogram", "Messages sent per model call", (2, 4, 8, 16, 32, 64, 128)),
+    "sierra_tool_calls_total": ("counter", "Tool calls, by tool and outcome", ()),
+    "sierra_tool_duration_seconds": ("histogram", "Tool function run time, by tool", SECONDS_BUCKETS),
+}
+
+LabelSet = Tuple[Tuple[str, str], ...]
+# Collectors return (metric name, type, help, labels, value) samples read at render time
+Sample = Tuple[str, str, str, Dict[str, Any], float]
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("sierra_span", default=None)
+
+
+def _label_set(labels: Dict[str, Any]) -> LabelSet:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelSet) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="' + value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') + '"'
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Span:
+    """ One timed phase of a turn """
+
+    __slots__ = ("name", "trace_id", "parent", "attributes", "start", "duration")
+
+    def __init__(self, name: str, trace_id: int, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.parent = parent
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.duration = 0.0
+
+    def set(self, **attributes):
+        """ Attach attributes known only once the phase has run (token counts, outcomes, ...) """
+        self.attributes.update(attributes)
+
+
+class _NullSpan:
+    """ Stand-in yielded while telemetry is disabled """
+
+    __slots__ = ()
+    attributes: Dict[str, Any] = {}
+
+    def set(self, **attributes):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Telemetry:
+    """ Thread-safe metrics registry and span tracer """
+
+    def __init__(self, enabled: bool = True, trace_file: Optional[str] = None,
+                 constant_labels: Dict[str, Any] = None):
+        """ Initialize telemetry
+
+        Args:
+            enabled: When False, spans and metrics are no-ops
+            trace_file: Append finished spans to this Chrome trace event file
+            constant_labels: Labels added to every exported sample (e.g. the worker index)
+        """
+        self.enabled = enabled
+        self.constant_labels = _label_set(constant_labels or {})
+        self._counters: Dict[Tuple[str, LabelSet], float] = {}
+        # (name, labels) -> [per-bucket counts..., sum, count]
+        self._histograms: Dict[Tuple[str, LabelSet], List[float]] = {}
+        self._collectors: List[Callable[[], List[Sample]]] = []
+        self._lock = threading.Lock()
+        self._trace_ids = itertools.count(1)
+        self._epoch = time.perf_counter()
+        self._trace = None
+        if enabled and trace_file:
+            self._open_trace(trace_file)
+
+    # ======== Metrics ========
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """ Add to a counter """
+        if not self.enabled:
+            return
+        key = (name, _label_set(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """ Record one histogram observation """
+        if not self.enabled:
+            return
+        buckets = METRICS[name][2]
+        key = (name, _label_set(labels))
+        with self._lock:
+            values = self._histograms.get(key)
+            if values is None:
+                values = self._histograms[key] = [0] * (len(buckets) + 2)
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def add_collector(self, collector: Callable[[], List[Sample]]):
+        """ Register a callable whose samples are read each time metrics are rendered """
+        self._collectors.append(collector)
+
+    def render_prometheus(self) -> str:
+        """ Every metric in the Prometheus text exposition format """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+
+        families: Dict[str, Tuple[str, str, List[str]]] = {}
+
+        def family(name: str, kind: str, help_text: str) -> List[str]:
+            if name not in families:
+                families[name] = (kind, help_text, [])
+            return families[name][2]
+
+        for (name, labels), value in sorted(counters.items()):
+            kind, help_text, _ = METRICS[name]
+            family(name, kind, help_text).append(
+                f"{name}{_format_labels(labels + self.constant_labels)} {_format_value(value)}")
+
+        for (name, labels), values in sorted(histograms.items()):
+            kind, help_text, buckets = METRICS[name]
+            lines = family(name, kind, help_text)
+            cumulative = 0
+            for bound, count in zip(buckets + (float("inf"),), values[:len(buckets)] + [0]):
+                # Observations above the largest bound only show up in the +Inf bucket
+                cumulative = cumulative + count if bound != float("inf") else values[-1]
+                bucket_labels = _label_set(dict(labels + self.constant_labels, le=_format_value(bound)))
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {_format_value(cumulative)}")
+            lines.append(f"{name}_sum{_format_labels(labels + self.constant_labels)} {_format_value(values[-2])}")
+            lines.append(f"{name}_count{_format_labels(labels + self.constant_labels)} {_format_value(values[-1])}")
+
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, labels, value in samples:
+                family(name, kind, help_text).append(
+                    f"{name}{_format_labels(_label_set(labels) + self.constant_labels)} {_format_value(value)}")
+
+        output = []
+        for name, (kind, help_text, lines) in families.items():
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(lines)
+        return "\n".join(output) + "\n"
+
+    def write_metrics(self, path: str):
+        """ Write the metrics atomically for a node_exporter textfile collector """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    # ======== Tracing ========
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """ Time a phase of a turn; spans opened inside it become its children
+
+        The duration is recorded in sierra_span_duration_seconds and, when a
+        trace file is configured, written as a trace event.
+        """
+        if not self.enabled:
+            yield NULL_SPAN
+            return
+        parent = _current_span.get()
+        span = Span(name, parent.trace_id if parent else next(self._trace_ids), parent, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # A generator closed from another context; that context never saw the span
+                pass
+            span.duration = time.perf_counter() - span.start
+            self.observe("sierra_span_duration_seconds", span.duration, span=name)
+            if self._trace is not None:
+                self._write_span(span)
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        return _current_span.get()
+
+    @staticmethod
+    def annotate(**attributes):
+        """ Attach attributes to the innermost open span """
+        span = _current_span.get()
+        if span is not None:
+            span.set(**attributes)
+
+    @staticmethod
+    def annotate_turn(**attributes):
+        """ Attach attributes to the root span of the current trace """
+        span = _current_span.get()
+        if span is None:
+            return
+        while span.parent is not None:
+            span = span.parent
+        span.set(**attributes)
+
+    def _open_trace(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The JSON array format allows the closing bracket to be missing, so events are simply appended
+        self._trace = open(path, "w")
+        self._trace.write("[\n")
+        self._trace_pid = os.getpid()
+        logger.info(f"Writing trace events to {path}")
+
+    def _write_span(self, span: Span):
+        event = {
+            "name": span.name,
+            "cat": span.parent.name if span.parent else "turn",
+            "ph": "X",
+            "ts": round((span.start - self._epoch) * 1e6, 1),
+            "dur": round(span.duration * 1e6, 1),
+            "pid": self._trace_pid,
+            # One row per turn, so concurrent turns do not overlap in the viewer
+            "tid": span.trace_id,
+            "args": span.attributes,
+        }
+        line = json.dumps(event, default=str) + ",\n"
+        with self._lock:
+            if self._trace is not None:
+                self._trace.write(line)
+
+    def flush(self):
+        with self._lock:
+            if self._trace is not None:
+                self._trace.flush()
+
+    def close(self):
+        with self._lock:
+            if self._trace is not None:
+                self._trace.close()
+                self._trace = None
+
+
+def merge_prometheus(texts: List[str]) -> str:
+    """ Merge expositions from several processes, keeping each family's samples together """
+    families: Dict[str, List[str]] = {}
+    current = None
+    for text in texts:
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith("# "):
+                name = line.split(" ", 3)[2]
+                lines = families.setdefault(name, [])
+                if line not in lines:
+                    lines.append(line)
+                current = name
+            elif current is not None:
+                families[current].append(line)
+    return "\n".join(line for lines in families.values() for line in lines) + "\n"
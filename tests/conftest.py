@@ -0,0 +1,31 @@
+"""
+Shared pytest fixtures
+
+The modules under test live at the repository root; tests run from there
+with `python -m pytest`.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mock_server():
+    """ Start local mock OpenAI servers for a test: mock_server(MockPolicy(...)) -> server """
+    from benchmarks.mock_openai_server import start_mock_server
+
+    servers = []
+
+    def start(policy):
+        server = start_mock_server(policy)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,68 @@
+""" Synchronous agent turns: each turn works on its own session's history, even across threads """
+
+import threading
+
+import pytest
+
+from benchmarks.mock_openai_server import MockPolicy
+from config import CONFIG
+
+
+@pytest.fixture
+def agent(mock_server, monkeypatch, tmp_path):
+    from sierra_outfitters_agent import SierraOutfittersAgent
+
+    server = mock_server(MockPolicy(latency_ms=30.0, jitter_ms=20.0, tool_mode="never", seed=3))
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    for key in ("DISCOUNT_CODE_DB_FILE", "SESSION_DB_FILE", "SEMANTIC_INDEX_FILE"):
+        monkeypatch.setitem(CONFIG, key, str(tmp_path / key.lower()))
+    monkeypatch.setitem(CONFIG, "DATA_REFRESH_ENABLED", False)
+    monkeypatch.setitem(CONFIG, "OPENAI_PREWARM", False)
+    agent = SierraOutfittersAgent("sk-test")
+    yield agent
+    agent.session_store.close()
+    agent.discount_codes.close()
+
+
+def user_messages(history):
+    return [message["content"] for message in history if message.get("role") == "user"]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_concurrent_turns_keep_their_own_history(agent, stream):
+    sessions = {f"session-{i}": [f"Tell me a story about trail {i}, part {turn}" for turn in range(3)]
+                for i in range(6)}
+    errors = []
+
+    def converse(session_id, messages):
+        try:
+            for text in messages:
+                reply = agent.process_message(text, stream=stream, session_id=session_id)
+                if stream:
+                    reply = "".join(reply)
+                assert reply
+        except Exception as e:  # surfaced in the main thread
+            errors.append(e)
+
+    threads = [threading.Thread(target=converse, args=item) for item in sessions.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    for session_id, messages in sessions.items():
+        history = agent.get_session_history(session_id)
+        assert user_messages(history) == messages
+        assert history[-1]["role"] == "assistant"
+
+
+def test_conversation_history_is_a_read_only_view_of_the_default_session(agent):
+    agent.process_message("Tell me a story about the mountains")
+    view = agent.conversation_history
+    assert user_messages(view) == ["Tell me a story about the mountains"]
+
+    view.clear()
+    assert user_messages(agent.conversation_history) == ["Tell me a story about the mountains"]
+    with pytest.raises(AttributeError):
+        agent.conversation_history = []
@@ -0,0 +1,132 @@
+""" Data refresh: delta feed entries are applied in batches, appended JSON Lines records are read
+incrementally and rewritten files are diffed """
+
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from data_loader import load_orders, load_products
+from data_refresher import DataRefresher
+from storage_backends import InMemoryBackend
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def order(number, status="processing"):
+    return {"CustomerName": "Jane Doe", "Email": "jane@example.com", "OrderNumber": f"#W{number:03d}",
+            "ProductsOrdered": ["SOBP001"], "Status": status, "TrackingNumber": None}
+
+
+def write_lines(path, records, mode="w"):
+    with open(path, mode) as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+@pytest.fixture
+def orders_file(tmp_path):
+    path = str(tmp_path / "orders.jsonl")
+    write_lines(path, [order(1), order(2)])
+    return path
+
+
+@pytest.fixture
+def delta_file(tmp_path):
+    path = str(tmp_path / "deltas.jsonl")
+    # Entries already in the feed at startup are taken to be loaded
+    write_lines(path, [{"op": "remove_order", "email": "jane@example.com", "order_number": "#W001"}])
+    return path
+
+
+@pytest.fixture
+def refresher(orders_file, delta_file, monkeypatch):
+    storage = InMemoryBackend(load_orders(orders_file), load_products(os.path.join(DATA_DIR, "ProductCatalog.json")))
+    agent = SimpleNamespace(storage=storage, apply_data_changes=storage.apply_changes)
+    refresher = DataRefresher(agent, orders_file, os.path.join(DATA_DIR, "ProductCatalog.json"), delta_file)
+    diffs = []
+    diff_file = refresher._diff_file
+
+    def counting_diff(kind, records, batch):
+        diffs.append(kind)
+        diff_file(kind, records, batch)
+
+    monkeypatch.setattr(refresher, "_diff_file", counting_diff)
+    refresher.diffs = diffs
+    return refresher
+
+
+def status(refresher, number):
+    found = refresher.agent.storage.get_order("jane@example.com", f"#W{number:03d}")
+    return found and found["Status"]
+
+
+def test_appended_records_are_read_without_a_diff(refresher, orders_file):
+    write_lines(orders_file, [order(3)], mode="a")
+    assert refresher.refresh_once() == 1
+    assert status(refresher, 3) == "processing" and refresher.diffs == []
+
+    # A partly written line waits for the next poll
+    with open(orders_file, "a") as f:
+        f.write(json.dumps(order(4))[:20])
+    assert refresher.refresh_once() == 0
+    with open(orders_file, "a") as f:
+        f.write(json.dumps(order(4))[20:] + "\n")
+    assert refresher.refresh_once() == 1
+    assert status(refresher, 4) == "processing" and refresher.diffs == []
+
+
+def test_rewritten_prefix_is_diffed_even_when_the_file_grew(refresher, orders_file):
+    # Same inode, more bytes, but an earlier record changed and one was dropped
+    with open(orders_file, "r+") as f:
+        f.truncate(0)
+        for record in [order(1, "delivered"), order(3), order(4)]:
+            f.write(json.dumps(record) + "\n")
+    assert refresher.refresh_once() == 4
+    assert refresher.diffs == ["orders"]
+    assert status(refresher, 1) == "delivered" and status(refresher, 2) is None and status(refresher, 4)
+
+    # Appending after the diff goes back to the incremental path
+    write_lines(orders_file, [order(5)], mode="a")
+    assert refresher.refresh_once() == 1
+    assert status(refresher, 5) and refresher.diffs == ["orders"]
+
+
+def test_replaced_file_is_diffed(refresher, orders_file, tmp_path):
+    replacement = str(tmp_path / "replacement.jsonl")
+    write_lines(replacement, [order(1), order(2), order(3, "delivered")])
+    os.replace(replacement, orders_file)
+    assert refresher.refresh_once() == 1
+    assert status(refresher, 3) == "delivered" and refresher.diffs == ["orders"]
+
+
+def test_delta_feed_entries_are_applied_as_one_batch(refresher, delta_file):
+    storage = refresher.agent.storage
+    assert refresher.refresh_once() == 0 and status(refresher, 1) == "processing"
+
+    write_lines(delta_file, [
+        {"op": "update_order", "email": "JANE@example.com", "order_number": "W001", "fields": {"Status": "in-transit"}},
+        {"op": "update_order", "email": "jane@example.com", "order_number": "#W001", "fields": {"Status": "delivered"}},
+        {"op": "update_product", "sku": "sobp001", "fields": {"Inventory": 42}},
+        {"op": "upsert_order", "record": order(7)},
+        {"op": "remove_order", "email": "jane@example.com", "order_number": "#W002"},
+        {"op": "remove_product", "sku": "SOWB004"},
+        {"op": "update_order", "email": "nobody@example.com", "order_number": "#W404", "fields": {"Status": "x"}},
+        {"op": "teleport"},
+    ], mode="a")
+    with open(delta_file, "a") as f:
+        f.write("not json\n")
+        f.write(json.dumps({"op": "remove_order", "email": "jane@example.com", "order_number": "#W007"})[:15])
+
+    # Later entries for the same record win; unknown records, ops and invalid lines are skipped
+    assert refresher.refresh_once() == 5
+    assert status(refresher, 1) == "delivered" and status(refresher, 2) is None and status(refresher, 7)
+    assert storage.get_product_by_sku("SOBP001")["Inventory"] == 42
+    assert storage.get_product_by_sku("SOWB004") is None
+
+    # The partly written last line is applied once it is complete
+    with open(delta_file, "a") as f:
+        f.write(json.dumps({"op": "remove_order", "email": "jane@example.com", "order_number": "#W007"})[15:] + "\n")
+    assert refresher.refresh_once() == 1 and status(refresher, 7) is None
+    assert refresher.applied_changes == 6
@@ -0,0 +1,173 @@
+""" Early Risers code issuance: per-customer limits, uniqueness, timeouts and the promotion window """
+
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+pytz = pytest.importorskip("pytz")
+
+from discount_codes import CODE_ALPHABET, DiscountCodeService, PromotionWindow
+from history_manager import HistoryManager
+
+
+@pytest.fixture
+def make_service(tmp_path):
+    services = []
+
+    def make(**options):
+        service = DiscountCodeService(str(tmp_path / "discount_codes.db"), PromotionWindow("US/Pacific", 8, 10),
+                                      **options)
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.close()
+
+
+def test_one_code_per_customer_per_day(make_service):
+    service = make_service()
+    first = service.issue("email:jane@example.com")
+    assert first["code"].startswith("EARLY10-") and not first["reissued"]
+    assert set(first["code"].split("-", 1)[1]) <= set(CODE_ALPHABET)
+    assert service.issue("email:jane@example.com") == {"code": first["code"], "reissued": True}
+    assert service.issue("email:john@example.com")["code"] != first["code"]
+    assert service.issued_to("email:jane@example.com") == first["code"]
+    assert service.issued_to("email:nobody@example.com") is None
+    assert service.stats()["issued"] == 2 and service.stats()["reissued"] == 1
+
+
+def test_limit_counts_per_promotion_day(make_service, monkeypatch):
+    service = make_service()
+    first = service.issue("email:jane@example.com")["code"]
+    monkeypatch.setattr(service.window, "promo_day", lambda now=None: "2099-01-01")
+    second = service.issue("email:jane@example.com")
+    assert second["code"] != first and not second["reissued"]
+    assert service.lookup(second["code"])["promo_day"] == "2099-01-01"
+
+
+def test_higher_limit_returns_the_latest_code(make_service):
+    service = make_service(max_per_customer=2)
+    codes = [service.issue("email:jane@example.com") for _ in range(3)]
+    assert [code["reissued"] for code in codes] == [False, False, True]
+    assert codes[2]["code"] == codes[1]["code"] != codes[0]["code"]
+
+
+def test_limit_holds_across_services_sharing_a_file(make_service):
+    first, second = make_service(), make_service()
+    code = first.issue("email:jane@example.com")["code"]
+    assert second.issue("email:jane@example.com") == {"code": code, "reissued": True}
+
+
+def test_concurrent_issuance_is_unique_and_limited(make_service):
+    service = make_service(batch_size=50)
+    customers = [f"email:customer{i % 150}@example.com" for i in range(600)]
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(service.issue, customers))
+    codes = {}
+    for customer, result in zip(customers, results):
+        assert codes.setdefault(customer, result["code"]) == result["code"]
+    assert len(set(codes.values())) == 150
+    assert service.stats()["issued"] == 150 and service.stats()["reissued"] == 450
+    # Group commit: many codes per transaction
+    assert service.stats()["commits"] < 600
+
+
+def test_timeout_returns_a_code_committed_late(make_service, monkeypatch):
+    service = make_service()
+    record = service._record
+    release = threading.Event()
+
+    def slow_record(conn, group):
+        release.wait(5)
+        record(conn, group)
+
+    monkeypatch.setattr(service, "_record", slow_record)
+    with pytest.raises(TimeoutError):
+        service.issue("email:jane@example.com", timeout=0.05)
+    release.set()
+    # The timed-out request was still recorded; asking again gets that code
+    deadline = time.monotonic() + 5
+    while service.issued_to("email:jane@example.com") is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    code = service.issued_to("email:jane@example.com")
+    assert code is not None
+    release.clear()
+    assert service.issue("email:jane@example.com", timeout=0.05) == {"code": code, "reissued": True}
+    release.set()
+
+
+def test_refill_failure_does_not_stop_the_writer(make_service, monkeypatch):
+    service = make_service()
+    refill = service._refill
+    failures = []
+
+    def failing_refill(conn):
+        if not failures:
+            failures.append(1)
+            raise sqlite3.OperationalError("disk I/O error")
+        refill(conn)
+
+    monkeypatch.setattr(service, "_refill", failing_refill)
+    first = service.issue("email:jane@example.com")
+    assert failures and not first["reissued"]
+    assert service.issue("email:john@example.com")["code"] != first["code"]
+
+
+def test_dead_writer_is_restarted(make_service):
+    service = make_service()
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    service._writer = dead
+    assert not service.issue("email:jane@example.com")["reissued"]
+    assert service._writer is not dead and service._writer.is_alive()
+
+
+def test_redeem_once(make_service):
+    service = make_service()
+    code = service.issue("email:jane@example.com")["code"]
+    assert service.redeem(code)
+    assert not service.redeem(code)
+    assert not service.redeem("EARLY10-NOTACODE")
+    assert service.lookup(code)["redeemed_at"] is not None
+
+
+def test_promotion_window():
+    tz = pytz.timezone("US/Pacific")
+    window = PromotionWindow("US/Pacific", 8, 10)
+
+    def at(hour, minute=0):
+        return tz.localize(datetime(2026, 3, 8, hour, minute)).timestamp()
+
+    assert not window.is_open(at(7, 59))
+    assert window.is_open(at(8))
+    assert window.is_open(at(9, 59))
+    assert not window.is_open(at(10))
+    assert window.promo_day(at(9)) == "2026-03-08"
+    assert window.promo_day(at(23, 59) + 120) == "2026-03-09"
+
+
+def order_lookup(email, order_number, success=True, call_id="call_1"):
+    return [
+        {"role": "assistant", "content": None, "tool_calls": [{"id": call_id, "type": "function", "function": {
+            "name": "check_order_status", "arguments": json.dumps({"email": email, "order_number": order_number})}}]},
+        {"role": "tool", "tool_call_id": call_id, "name": "check_order_status",
+         "content": json.dumps({"success": success, "status": "delivered"})},
+    ]
+
+
+def test_customer_is_verified_by_an_order_lookup():
+    manager = HistoryManager(token_budget=4000)
+    assert manager.verified_email([{"role": "user", "content": "I'm jane@example.com, give me a code"}]) is None
+    assert manager.verified_email(order_lookup("jane@example.com", "W002", success=False)) is None
+    history = order_lookup("jane@example.com", "W002") + order_lookup("john@example.com", "W001", call_id="call_2")
+    assert manager.verified_email(history) == "john@example.com"
+    # Facts remembered before the history was compacted still count
+    manager.states["s1"] = {"email": "jane@example.com", "orders": {}, "products": {}}
+    assert manager.verified_email([], "s1") == "jane@example.com"
@@ -0,0 +1,70 @@
+""" Slot extraction and routing decisions of the fast-path router """
+
+import pytest
+
+from fast_path_router import FastPathRouter
+
+
+@pytest.mark.parametrize("text, emails, order_numbers, skus, structured_only", [
+    ("jane.smith@example.com", ["jane.smith@example.com"], [], [], True),
+    ("W002", [], ["#W002"], [], True),
+    ("my order is #w002 please", [], ["#W002"], [], True),
+    ("Can you track another order : jane.smith@example.com and w002", ["jane.smith@example.com"], ["#W002"], [],
+     False),
+    ("orders W001, #W001 and W0003", [], ["#W001", "#W0003"], [], True),
+    ("is sobp001 in stock?", [], [], ["SOBP001"], True),
+    ("W002 arrived broken, I want a refund", [], ["#W002"], [], False),
+    ("Do you have any promotions going on?", [], [], [], False),
+    # Not order numbers: part of a word, or too short
+    ("the W12 model", [], [], [], False),
+    ("password123W001", [], [], [], False),
+])
+def test_extract(text, emails, order_numbers, skus, structured_only):
+    entities = FastPathRouter.extract(text)
+    assert entities["emails"] == emails
+    assert entities["order_numbers"] == order_numbers
+    assert entities["skus"] == skus
+    assert entities["structured_only"] is structured_only
+
+
+def test_slots_fill_across_turns():
+    router = FastPathRouter()
+    assert router.route("s1", "Hey I want to know about my order.") is None
+    assert router.route("s1", "alice.johnson@example.com") == {
+        "missing_slot": "order_number", "slots": {"email": "alice.johnson@example.com"}}
+    routed = router.route("s1", "W004")
+    assert routed == {"tool_calls": [{"name": "check_order_status",
+                                      "arguments": {"email": "alice.johnson@example.com", "order_number": "#W004"}}]}
+    # The email is kept for the next order number
+    assert router.route("s1", "#W003")["tool_calls"][0]["arguments"]["order_number"] == "#W003"
+    assert router.stats() == {"turns_routed": 3, "turns_deferred": 1, "llm_calls_saved": 5}
+
+
+def test_order_number_first_asks_for_email():
+    router = FastPathRouter()
+    assert router.route("s1", "W002")["missing_slot"] == "email"
+    calls = router.route("s1", "jane.smith@example.com")["tool_calls"]
+    assert calls[0]["arguments"] == {"email": "jane.smith@example.com", "order_number": "#W002"}
+
+
+def test_free_text_goes_to_the_llm_but_slots_are_kept():
+    router = FastPathRouter()
+    assert router.route("s1", "I'm jane.smith@example.com and my package is late") is None
+    assert router.get_slots("s1")["email"] == "jane.smith@example.com"
+    # With both slots the LLM runs the lookup, so nothing is left pending
+    assert router.route("s1", "order W002 is late, what happened?") is None
+    assert router.get_slots("s1")["pending_orders"] == []
+
+
+def test_skus_route_to_availability():
+    calls = FastPathRouter().route("s1", "SOBP001 and SOWB004")["tool_calls"]
+    assert calls == [{"name": "check_product_availability", "arguments": {"product_query": "SOBP001"}},
+                     {"name": "check_product_availability", "arguments": {"product_query": "SOWB004"}}]
+
+
+def test_sessions_are_isolated():
+    router = FastPathRouter()
+    router.route("a", "jane.smith@example.com")
+    assert router.route("b", "W002")["missing_slot"] == "email"
+    router.clear_session("a")
+    assert router.get_slots("a") == {"email": None}
@@ -0,0 +1,83 @@
+""" History compaction: token budget, whole tool exchanges, the current turn and session memory """
+
+import json
+
+from history_manager import HistoryManager, is_memory_message
+
+
+def order_turn(number, filler=""):
+    """ One user turn with an order lookup tool exchange and a reply """
+    call_id = f"call_{number}"
+    return [
+        {"role": "user", "content": f"Where is order W{number:03d}? jane@example.com {filler}"},
+        {"role": "assistant", "content": None, "tool_calls": [{
+            "id": call_id, "type": "function", "function": {
+                "name": "check_order_status",
+                "arguments": json.dumps({"email": "jane@example.com", "order_number": f"W{number:03d}"})}}]},
+        {"role": "tool", "tool_call_id": call_id, "name": "check_order_status", "content": json.dumps({
+            "success": True, "customer_name": "Jane Doe", "status": "delivered", "details": "x" * 400})},
+        {"role": "assistant", "content": f"Order W{number:03d} was delivered. {filler}"},
+    ]
+
+
+def conversation(turns, filler=""):
+    return [message for number in range(1, turns + 1) for message in order_turn(number, filler)]
+
+
+def test_history_under_budget_is_unchanged():
+    manager = HistoryManager(token_budget=100000)
+    history = conversation(3)
+    original = [dict(message) for message in history]
+    assert manager.compact(history) == manager.count_tokens(original)
+    assert history == original
+
+
+def test_compaction_fits_the_budget_and_keeps_the_current_turn():
+    manager = HistoryManager(token_budget=400, keep_recent_turns=2)
+    history = conversation(8, filler="more words " * 10)
+    current = list(history[-4:])
+
+    tokens = manager.compact(history, "s1")
+
+    memory = [message for message in history if is_memory_message(message)]
+    assert len(memory) == 1 and history[0] is memory[0]
+    assert tokens == manager.count_tokens(history)
+    assert manager.count_tokens(history[1:]) <= manager.token_budget
+    assert history[-4:] == current
+
+
+def test_tool_calls_and_results_are_dropped_together():
+    history = conversation(6)
+    stripped = [message for message in history[:12] if message["role"] != "tool" and message["content"]]
+    # Room for the last three turns and the older turns' text, not their tool exchanges
+    manager = HistoryManager(token_budget=1, keep_recent_turns=3)
+    manager.token_budget = manager.count_tokens(history[12:] + stripped)
+    manager.compact(history, "s1")
+
+    call_ids = {call["id"] for message in history for call in message.get("tool_calls") or []}
+    result_ids = {message["tool_call_id"] for message in history if message.get("role") == "tool"}
+    assert call_ids == result_ids == {"call_4", "call_5", "call_6"}
+    # Older turns lose their tool exchanges before any user message is dropped
+    assert [message["content"] for message in history if message["role"] == "user"] == \
+        [message["content"] for message in conversation(6) if message["role"] == "user"]
+
+
+def test_session_memory_keeps_facts_from_dropped_turns():
+    manager = HistoryManager(token_budget=300, keep_recent_turns=1)
+    history = conversation(5, filler="more words " * 10)
+    manager.compact(history, "s1")
+
+    memory = history[0]
+    assert is_memory_message(memory)
+    assert "email=jane@example.com" in memory["content"] and "#W001 (delivered)" in memory["content"]
+    assert not any("W001" in (message.get("content") or "") for message in history[1:])
+
+    # Compacting again replaces the memory message instead of stacking another one
+    history.extend(order_turn(6))
+    manager.compact(history, "s1")
+    assert sum(is_memory_message(message) for message in history) == 1
+    assert "#W006 (delivered)" in history[0]["content"]
+    assert manager.verified_email([], "s1") == "jane@example.com"
+
+    manager.clear_session("s1")
+    assert manager.verified_email([], "s1") is None
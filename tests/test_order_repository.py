@@ -0,0 +1,117 @@
+""" Lookup normalization, incremental updates and copy-on-write copies of the order repository """
+
+import logging
+
+import pytest
+
+from data_loader import load_orders
+from order_repository import LayeredMap, OrderRepository, normalize_email, normalize_order_number
+
+
+def make_order(email="Jane.Smith@Example.com", order_number="#W002", tracking="TRK987654321", **fields):
+    order = {"CustomerName": "Jane Smith", "Email": email, "OrderNumber": order_number,
+             "ProductsOrdered": ["SOBP001"], "Status": "in-transit", "TrackingNumber": tracking}
+    order.update(fields)
+    return order
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("w002", "#W002"), ("#w002", "#W002"), ("  W002 ", "#W002"), ("#W002", "#W002"), ("", ""), (None, ""),
+])
+def test_normalize_order_number(raw, expected):
+    assert normalize_order_number(raw) == expected
+
+
+@pytest.mark.parametrize("raw, expected", [
+    (" Jane.Smith@Example.COM ", "jane.smith@example.com"), ("", ""), (None, ""),
+])
+def test_normalize_email(raw, expected):
+    assert normalize_email(raw) == expected
+
+
+def test_lookups_ignore_case_whitespace_and_hash_prefix():
+    order = make_order()
+    repository = OrderRepository([order])
+    for email, order_number in [("jane.smith@example.com", "W002"), (" JANE.SMITH@EXAMPLE.COM", "#w002"),
+                                ("Jane.Smith@Example.com", " #W002 ")]:
+        assert repository.get(email, order_number) is order
+        assert (email, order_number) in repository
+    assert repository.get("jane.smith@example.com", "W003") is None
+    assert repository.find_by_email(" JANE.smith@example.com") == [order]
+    assert repository.find_by_tracking_number(" trk987654321 ") is order
+
+
+def test_update_moves_indexes():
+    repository = OrderRepository([make_order()])
+    updated = repository.update("jane.smith@example.com", "w002", TrackingNumber="TRK111", Status="delivered")
+    assert updated["Status"] == "delivered"
+    assert repository.find_by_tracking_number("TRK987654321") is None
+    assert repository.find_by_tracking_number("trk111") is updated
+    assert repository.update("jane.smith@example.com", "W999", Status="delivered") is None
+
+
+def test_remove_drops_every_index():
+    other = make_order(order_number="#W005", tracking=None)
+    repository = OrderRepository([make_order(), other])
+    assert repository.remove("JANE.SMITH@example.com", "w002")["OrderNumber"] == "#W002"
+    assert repository.find_by_email("jane.smith@example.com") == [other]
+    assert repository.find_by_tracking_number("TRK987654321") is None
+    assert repository.remove("jane.smith@example.com", "W002") is None
+    assert len(repository) == 1
+
+
+@pytest.mark.parametrize("missing", ["Email", "OrderNumber"])
+def test_records_without_a_key_are_skipped(missing, caplog):
+    incomplete = make_order(order_number="#W010", tracking="TRK010")
+    del incomplete[missing]
+    with caplog.at_level(logging.WARNING, logger="order_repository"):
+        repository = OrderRepository([make_order(), incomplete, make_order(order_number="#W011", tracking=None,
+                                                                           **{missing: ""})])
+    assert len(repository) == 1
+    assert repository.find_by_tracking_number("TRK010") is None
+    assert "Skipping order without an email or order number" in caplog.text
+
+
+def test_update_cannot_clear_the_key():
+    repository = OrderRepository([make_order()])
+    assert repository.update("jane.smith@example.com", "W002", Email="") is None
+    assert repository.get("jane.smith@example.com", "W002")["Email"] == "Jane.Smith@Example.com"
+
+
+def test_loader_skips_records_without_a_key(tmp_path):
+    path = tmp_path / "orders.jsonl"
+    path.write_text('{"CustomerName": "A", "Email": "a@example.com", "OrderNumber": "#W001"}\n'
+                    '{"CustomerName": "B", "OrderNumber": "#W002"}\n'
+                    '{"Email": "c@example.com", "OrderNumber": "#W003"}\n')
+    assert [order["OrderNumber"] for order in load_orders(str(path))] == ["#W001", "#W003"]
+
+
+def test_copies_are_independent():
+    repository = OrderRepository([make_order(order_number=f"#W{i:03d}", tracking=None) for i in range(10)])
+    clone = repository.copy()
+    clone.upsert(make_order(order_number="#W100"))
+    clone.remove("jane.smith@example.com", "W001")
+    assert len(repository) == 10 and len(clone) == 10
+    assert repository.get("jane.smith@example.com", "W100") is None
+    assert repository.get("jane.smith@example.com", "W001") is not None
+    assert len(repository.find_by_email("jane.smith@example.com")) == 10
+
+
+def test_layered_map_matches_a_dict():
+    import random
+
+    rng = random.Random(7)
+    layered, expected = LayeredMap({i: i for i in range(100)}), {i: i for i in range(100)}
+    for step in range(3000):
+        key = rng.randrange(150)
+        action = rng.random()
+        if action < 0.5:
+            layered[key] = expected[key] = step
+        elif action < 0.8:
+            assert layered.pop(key, None) == expected.pop(key, None)
+        else:
+            layered = layered.copy()
+        assert (key in layered) == (key in expected)
+        assert layered.get(key) == expected.get(key)
+    assert len(layered) == len(expected)
+    assert dict(layered.items()) == expected
@@ -0,0 +1,91 @@
+""" Ranking, typo tolerance and minimum relevance of the product search engine """
+
+import json
+import os
+
+import pytest
+
+from product_search import FUZZY_MIN_LENGTH, ProductSearchEngine, tokenize
+
+CATALOG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data",
+                            "ProductCatalog.json")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    with open(CATALOG_FILE) as f:
+        return ProductSearchEngine(json.load(f))
+
+
+def top(engine, query, top_k=3):
+    return [product["SKU"] for product, _ in engine.search(query, top_k)]
+
+
+@pytest.mark.parametrize("query, sku", [
+    ("SOBP001", "SOBP001"),
+    ("sobp001", "SOBP001"),
+    ("backpack", "SOBP001"),
+    ("The Blaze backpack?", "SOBP001"),
+    ("Backpak", "SOBP001"),
+    ("surfboard", "SOSV010"),
+    ("skis", "SOTN002"),
+    ("invisibility cloak", "SOSV007"),
+    ("Is the jetpack in stock?", "SOSB006"),
+    ("do you have red shoes available", "SOSV009"),
+    ("energy drink", "SOWB004"),
+    ("hiking adventure", "SOBP001"),
+])
+def test_best_match(engine, query, sku):
+    assert top(engine, query)[0] == sku
+
+
+@pytest.mark.parametrize("query", [
+    # Chat words that appear in descriptions ("exactly where you need", "rhubarb stock")
+    "where is my order", "here", "hello there", "what do you have in stock?", "I need something",
+    # Short typo-like words must not fuzz onto longer terms ("tent" -> "tenth")
+    "tent", "wetsuit", "zzyzx", "",
+])
+def test_no_match(engine, query):
+    assert top(engine, query) == []
+
+
+def test_fuzzy_expansion_needs_a_long_enough_token(engine):
+    assert engine.vocabulary.expand("tent") == []
+    assert len("backpak") >= FUZZY_MIN_LENGTH
+    assert engine.vocabulary.expand("backpak")[0][0] == "backpack"
+
+
+def test_results_must_match_half_the_query_terms(engine):
+    # "blaze" matches one of three terms, which is not enough
+    assert top(engine, "blaze spaceship teapot") == []
+    assert top(engine, "blaze backpack teapot") == ["SOBP001"]
+
+
+def test_min_score(engine):
+    scores = [score for _, score in engine.search("adventure", 10)]
+    assert scores and all(score >= engine.min_score for score in scores)
+    strict = engine.copy()
+    strict.min_score = max(scores) + 1
+    assert strict.search("adventure") == []
+
+
+def test_ranking_is_stable(engine):
+    results = engine.search("adventure", 10)
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+    assert results == engine.search("adventure", 10)
+
+
+def test_updates_are_searchable(engine):
+    updated = engine.copy()
+    updated.upsert({"ProductName": "Trailhead Tent", "SKU": "SOTT011", "Inventory": 3,
+                    "Description": "A two-person tent.", "Tags": ["Camping"]})
+    assert top(updated, "tent") == ["SOTT011"]
+    updated.remove("SOTT011")
+    assert top(updated, "tent") == []
+    # The original engine is untouched
+    assert top(engine, "tent") == []
+
+
+def test_tokenize_drops_stopwords_and_possessives():
+    assert tokenize("Where's Bhavish's backpack? Is it in stock?") == ["bhavish", "backpack"]
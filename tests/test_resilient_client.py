@@ -0,0 +1,133 @@
+""" Retry, deadline, hedging and circuit breaker behavior of resilient_client against the fault-injecting mock """
+
+import asyncio
+import time
+
+import pytest
+
+openai = pytest.importorskip("openai")
+
+from benchmarks.mock_openai_server import MockPolicy
+from resilient_client import AsyncResilientClient, CircuitBreaker, CircuitOpenError, ResilientClient
+
+BODY = {"model": "mock", "messages": [{"role": "user", "content": "hello"}]}
+
+
+def make_client(server, cls=ResilientClient, **kwargs):
+    client_class = openai.AsyncOpenAI if cls is AsyncResilientClient else openai.OpenAI
+    options = dict(deadline_seconds=5.0, timeout_seconds=5.0, connect_timeout_seconds=1.0, max_retries=3,
+                   backoff_base_seconds=0.01, backoff_max_seconds=0.05, seed=7)
+    options.update(kwargs)
+    return cls(lambda: client_class(api_key="test", base_url=server.base_url, max_retries=0), **options)
+
+
+def quiet_policy(**kwargs) -> MockPolicy:
+    return MockPolicy(latency_ms=0, jitter_ms=0, tool_mode="never", **kwargs)
+
+
+def test_retries_server_errors(mock_server):
+    server = mock_server(quiet_policy(faults=["error", "error"]))
+    client = make_client(server)
+    response = client.post("/chat/completions", body=BODY)
+    assert response.choices[0].message.content
+    assert client.retries == 2
+    assert server.stats()["request_count"] == 3
+
+
+def test_retries_dropped_connections(mock_server):
+    server = mock_server(quiet_policy(faults=["drop"]))
+    client = make_client(server)
+    client.post("/chat/completions", body=BODY)
+    assert client.retries == 1
+    assert server.stats()["faults"] == {"drop": 1}
+
+
+def test_backoff_stops_at_the_deadline(mock_server):
+    server = mock_server(quiet_policy(error_rate=1.0))
+    client = make_client(server, deadline_seconds=0.5, max_retries=1000, backoff_base_seconds=0.05,
+                         backoff_max_seconds=0.2)
+    started = time.monotonic()
+    with pytest.raises(openai.InternalServerError):
+        client.post("/chat/completions", body=BODY)
+    # Gives up as soon as the next backoff would cross the deadline
+    assert time.monotonic() - started < 0.5 + 0.25
+    assert 1 < client.attempts < 1000
+    assert client.errors == 1
+
+
+def test_no_retry_on_client_errors(mock_server):
+    server = mock_server(quiet_policy(faults=["bad_request"]))
+    breaker = CircuitBreaker(1, 60.0)
+    client = make_client(server, breaker=breaker)
+    with pytest.raises(openai.BadRequestError):
+        client.post("/chat/completions", body=BODY)
+    assert client.attempts == 1 and client.retries == 0
+    assert server.stats()["request_count"] == 1
+    # A rejected request says nothing about upstream health
+    assert breaker.state == "closed"
+
+
+def test_hedged_request_wins(mock_server):
+    server = mock_server(quiet_policy(faults=["slow"], slow_ms=2000))
+    client = make_client(server, hedge_after_seconds=0.05)
+    started = time.monotonic()
+    client.post("/chat/completions", body=BODY)
+    assert time.monotonic() - started < 1.0
+    assert client.hedges == 1 and client.hedge_wins == 1
+    client.close()
+
+
+def test_async_hedge_cancels_the_loser(mock_server):
+    server = mock_server(quiet_policy(faults=["slow"], slow_ms=2000))
+    client = make_client(server, AsyncResilientClient, hedge_after_seconds=0.05)
+
+    async def call():
+        started = time.monotonic()
+        await client.post("/chat/completions", body=BODY)
+        elapsed = time.monotonic() - started
+        others = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        # Let the cancellation of the slow copy run
+        await asyncio.sleep(0.05)
+        await client.close()
+        return elapsed, others
+
+    elapsed, others = asyncio.run(call())
+    assert elapsed < 1.0
+    assert client.hedges == 1 and client.hedge_wins == 1
+    assert len(others) == 1 and others[0].cancelled()
+
+
+def test_circuit_breaker_opens_half_opens_and_closes(mock_server):
+    server = mock_server(quiet_policy(faults=["error", "error"]))
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.2)
+    client = make_client(server, max_retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(openai.InternalServerError):
+            client.post("/chat/completions", body=BODY)
+    assert breaker.state == "open" and breaker.opens == 1
+
+    # Open: fails fast without reaching the server
+    with pytest.raises(CircuitOpenError):
+        client.post("/chat/completions", body=BODY)
+    assert server.stats()["request_count"] == 2
+    assert breaker.rejected == 1
+
+    time.sleep(0.25)
+    assert breaker.state == "half_open"
+    client.post("/chat/completions", body=BODY)
+    assert breaker.state == "closed"
+    assert server.stats()["request_count"] == 3
+
+
+def test_failed_probe_reopens_the_circuit(mock_server):
+    server = mock_server(quiet_policy(faults=["error", "error"]))
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.2)
+    client = make_client(server, max_retries=0, breaker=breaker)
+    with pytest.raises(openai.InternalServerError):
+        client.post("/chat/completions", body=BODY)
+    time.sleep(0.25)
+    with pytest.raises(openai.InternalServerError):
+        client.post("/chat/completions", body=BODY)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        client.post("/chat/completions", body=BODY)
@@ -0,0 +1,106 @@
+""" Outcome classification and the local reply policy of the response templates """
+
+import pytest
+
+from config import get_config
+from response_templates import TEMPLATE_BANK, ResponseRenderer, classify
+
+ORDER = {"success": True, "customer_name": "Jane", "order_number": "#W002", "status": "delivered"}
+PRODUCT = {"success": True, "product_name": "Jetpack", "sku": "SOSB006", "in_stock": True, "inventory": 40,
+           "exact_match": True, "other_matches": []}
+
+
+def product(**fields):
+    return dict(PRODUCT, **fields)
+
+
+@pytest.mark.parametrize("function_name, result, outcome", [
+    ("check_order_status", ORDER, "delivered"),
+    ("check_order_status", dict(ORDER, status="in-transit"), "in-transit"),
+    ("check_order_status", dict(ORDER, status="on a mule"), "processing"),
+    ("check_order_status", {"success": False}, "not_found"),
+    ("check_product_availability", PRODUCT, "in_stock"),
+    ("check_product_availability", product(inventory=3), "low_stock"),
+    ("check_product_availability", product(in_stock=False, inventory=0), "out_of_stock"),
+    ("check_product_availability", product(exact_match=False), "search_match"),
+    ("check_product_availability", {"success": False}, "not_found"),
+    ("generate_discount_code", {"success": True, "discount_code": "EARLY10-X", "reissued": True}, "reissued"),
+    ("generate_discount_code", {"success": False, "reason": "unverified"}, "unverified"),
+    ("generate_discount_code", {"success": False}, "outside_hours"),
+    ("check_order_status", {"error": "Tool timed out"}, None),
+    ("unknown_tool", {"success": True}, None),
+])
+def test_classify(function_name, result, outcome):
+    assert classify(function_name, result) == outcome
+
+
+@pytest.fixture
+def default_renderer():
+    config = get_config()
+    return ResponseRenderer("hybrid", config['LOCAL_RESPONSE_POLICY'], seed=7)
+
+
+def test_default_policy_renders_found_orders_and_exact_skus(default_renderer):
+    reply = default_renderer.render([("check_order_status", ORDER)], "jane@example.com W002")
+    assert "#W002" in reply and "Jane" in reply and "delivered" in reply
+    reply = default_renderer.render([("check_product_availability", PRODUCT)], "SOSB006")
+    assert "Jetpack" in reply and "40" in reply
+    assert default_renderer.stats() == {"rendered": 2, "deferred": 0}
+
+
+@pytest.mark.parametrize("results, user_message", [
+    # Free text around the lookup
+    ([("check_order_status", ORDER)], "W002 arrived broken, I want a refund"),
+    # Not found, search matches and batch results are the model's to phrase
+    ([("check_order_status", {"success": False})], "jane@example.com W009"),
+    ([("check_product_availability", {"success": False})], "SOXX999"),
+    ([("check_product_availability", product(exact_match=False))], "SOSB006"),
+    ([("check_product_availability_batch", {"success": True, "results": [product(exact_match=False)]})], "SOSB006"),
+    ([("check_order_status_batch", {"success": True, "results": [ORDER]})], "W002"),
+    ([("generate_discount_code", {"success": True, "discount_code": "EARLY10-X"})], "W002"),
+    # One deferred result sends the whole turn to the model
+    ([("check_order_status", ORDER), ("check_order_status", {"error": "Tool timed out"})], "W002 W003"),
+    ([], "W002"),
+])
+def test_default_policy_defers(default_renderer, results, user_message):
+    assert default_renderer.render(results, user_message) is None
+
+
+def test_batch_tools_render_when_listed():
+    renderer = ResponseRenderer("hybrid", {"check_product_availability_batch": ["in_stock", "out_of_stock"]}, seed=7)
+    reply = renderer.render([("check_product_availability_batch", {"success": True, "results": [
+        PRODUCT, product(product_name="Red Shoes", sku="SOSV009", in_stock=False, inventory=0)]})], "SOSB006 SOSV009")
+    assert "Jetpack" in reply and "Red Shoes" in reply
+    # The single-item tool is not covered by the batch tool's entry
+    assert renderer.render([("check_product_availability", PRODUCT)], "SOSB006") is None
+
+
+def test_llm_mode_never_renders():
+    renderer = ResponseRenderer("llm", get_config()['LOCAL_RESPONSE_POLICY'])
+    assert renderer.render([("check_order_status", ORDER)], "W002") is None
+    with pytest.raises(ValueError):
+        ResponseRenderer("templates")
+
+
+def test_templates_rotate():
+    renderer = ResponseRenderer("hybrid", {"check_order_status": ["delivered"]}, seed=1)
+    replies = [renderer.render([("check_order_status", ORDER)]) for _ in range(30)]
+    assert all(first != second for first, second in zip(replies, replies[1:]))
+    assert len(set(replies)) == len(TEMPLATE_BANK[("check_order_status", "delivered")])
+
+
+def test_order_items_and_alternatives():
+    renderer = ResponseRenderer("hybrid", {"check_order_status": ["delivered"],
+                                           "check_product_availability": ["out_of_stock"]}, seed=7)
+    reply = renderer.render([("check_order_status", dict(ORDER, products=[
+        {"product_name": "Jetpack", "in_stock": True}, {"product_name": "Red Shoes", "in_stock": False}]))])
+    assert "Jetpack (in stock), Red Shoes (out of stock)" in reply
+    reply = renderer.render([("check_product_availability", product(in_stock=False, inventory=0, other_matches=[
+        {"product_name": "Hoverboard", "sku": "SOHB011", "in_stock": True}]))])
+    assert "Hoverboard" in reply
+
+
+def test_every_policy_outcome_has_templates():
+    for tool, outcomes in get_config()['LOCAL_RESPONSE_POLICY'].items():
+        for outcome in outcomes:
+            assert TEMPLATE_BANK[(tool, outcome)]
@@ -0,0 +1,125 @@
+""" Semantic index retrieval and fingerprints: a saved index is reused only for the catalog it was built from """
+
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import semantic_search
+from semantic_search import SemanticIndex, catalog_fingerprint, create_semantic_index
+
+CATALOG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data",
+                            "ProductCatalog.json")
+
+
+@pytest.fixture
+def catalog():
+    with open(CATALOG_FILE) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def config(tmp_path):
+    return {"SEMANTIC_INDEX_FILE": str(tmp_path / "semantic-index.npz"), "SEMANTIC_SEARCH_DIMENSIONS": 256,
+            "SEMANTIC_SEARCH_MIN_SCORE": 0.1, "PRODUCT_CATALOG_FILE": CATALOG_FILE}
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """ Count full index builds """
+    counter = []
+    build = SemanticIndex.build.__func__
+
+    def counting_build(cls, *args, **kwargs):
+        counter.append(1)
+        return build(cls, *args, **kwargs)
+
+    monkeypatch.setattr(SemanticIndex, "build", classmethod(counting_build))
+    return counter
+
+
+def test_fingerprint_ignores_order_but_not_content(catalog):
+    fingerprint = catalog_fingerprint(catalog)
+    assert fingerprint.startswith(f"{len(catalog)}:")
+    assert catalog_fingerprint(reversed(catalog)) == fingerprint
+    # Inventory is not searchable text
+    assert catalog_fingerprint([dict(catalog[0], Inventory=0)] + catalog[1:]) == fingerprint
+    assert catalog_fingerprint([dict(catalog[0], Description="New")] + catalog[1:]) != fingerprint
+    assert catalog_fingerprint(catalog[1:]) != fingerprint
+
+
+def test_saved_index_is_reused_for_the_same_catalog(catalog, config, builds):
+    first = create_semantic_index(config, iter(catalog))
+    assert len(builds) == 1 and os.path.exists(config["SEMANTIC_INDEX_FILE"])
+    second = create_semantic_index(config, iter(catalog))
+    assert len(builds) == 1
+    assert second.catalog == first.catalog == catalog_fingerprint(catalog)
+    assert second.search("surfboard") == first.search("surfboard")
+
+
+def test_changed_catalog_or_dimensions_rebuild(catalog, config, builds):
+    create_semantic_index(config, catalog)
+    create_semantic_index(config, catalog[:-1])
+    assert len(builds) == 2
+    config["SEMANTIC_SEARCH_DIMENSIONS"] = 512
+    assert create_semantic_index(config, catalog[:-1]).dimensions == 512
+    assert len(builds) == 3
+
+
+def test_unreadable_index_is_rebuilt(catalog, config, builds):
+    with open(config["SEMANTIC_INDEX_FILE"], "wb") as f:
+        f.write(b"not an index")
+    assert len(create_semantic_index(config, catalog)) == len(catalog)
+    assert len(builds) == 1
+
+
+def test_empty_catalog_builds_nothing(config, builds):
+    assert create_semantic_index(config, iter([])) is None
+    assert not builds and not os.path.exists(config["SEMANTIC_INDEX_FILE"])
+
+
+def test_prebuilt_index_is_reused_at_startup(catalog, config, builds, monkeypatch):
+    import config as config_module
+
+    monkeypatch.setattr(config_module, "get_config", lambda: config)
+    semantic_search.main()
+    saved = SemanticIndex.load(config["SEMANTIC_INDEX_FILE"])
+    assert saved.catalog == catalog_fingerprint(catalog) and len(saved) == len(catalog)
+    create_semantic_index(config, catalog)
+    assert len(builds) == 1
+
+
+@pytest.mark.parametrize("query, sku", [
+    ("surfing", "SOSV010"),
+    ("backpacks", "SOBP001"),
+    ("cloaking", "SOSV007"),
+    ("hairbrushes", "SOBT003"),
+])
+def test_word_variants_match_on_trigrams(catalog, query, sku):
+    index = SemanticIndex.build(catalog)
+
+    assert index.search(query)[0][0] == sku
+
+
+@pytest.mark.parametrize("query", ["zzyzx", "tent", "where is my order", "hello there", "kayak", "wetsut"])
+def test_unrelated_queries_stay_below_the_min_score(catalog, query):
+    assert SemanticIndex.build(catalog).search(query) == []
+
+
+def test_min_score_filters_matches(catalog):
+    scores = [score for _, score in SemanticIndex.build(catalog, min_score=0.0).search("surfing")]
+
+    assert SemanticIndex.build(catalog, min_score=scores[0] + 0.01).search("surfing") == []
+
+
+def test_removed_and_upserted_products(catalog):
+    index = SemanticIndex.build(catalog)
+    index.remove("SOSV010")
+
+    assert "SOSV010" not in [sku for sku, _ in index.search("surfing")]
+
+    index.upsert(next(product for product in catalog if product["SKU"] == "SOSV010"))
+
+    assert index.search("surfing")[0][0] == "SOSV010"
@@ -0,0 +1,72 @@
+""" The router validates every session id source before hashing it or forwarding it to a worker """
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from server import HTTPError, Router, session_id_from_path, valid_session_id
+
+BAD_IDS = ["a\r\nX-Evil: 1", "a\nb", "tab\there", "del\x7f", "中"]
+
+
+@pytest.mark.parametrize("session_id", BAD_IDS)
+def test_invalid_ids_are_rejected_from_every_source(session_id):
+    sources = [
+        lambda: Router.session_id_for("/v1/chat", {}, json.dumps({"message": "hi", "session_id": session_id}).encode()),
+        lambda: session_id_from_path("/v1/sessions/" + "".join(f"%{byte:02X}" for byte in session_id.encode())),
+    ]
+    if "\n" not in session_id:
+        # A header value is one line; the router decodes headers as Latin-1
+        sources.append(lambda: Router.session_id_for("/v1/chat", {"x-session-id": session_id}, b""))
+    for source in sources:
+        with pytest.raises(HTTPError) as error:
+            source()
+        assert error.value.status == 400
+
+
+def test_valid_ids_pass_through():
+    assert valid_session_id("abc-123_é") == "abc-123_é"
+    assert Router.session_id_for("/v1/chat", {"x-session-id": "s1"}, b"") == "s1"
+    assert Router.session_id_for("/v1/chat", {}, b'{"message": "hi", "session_id": "s2"}') == "s2"
+    assert Router.session_id_for("/v1/chat", {}, b'{"message": "hi"}') is None
+    assert session_id_from_path("/v1/sessions/a%20b?x=1") == "a b"
+    with pytest.raises(HTTPError):
+        Router.session_id_for("/v1/chat", {}, b'{"message": "hi", "session_id": 7}')
+    with pytest.raises(HTTPError):
+        session_id_from_path("/v1/sessions/?x=1")
+
+
+def test_router_answers_400_and_forwards_nothing(tmp_path):
+    received = []
+
+    async def worker(reader, writer):
+        received.append(await reader.read(65536))
+        writer.close()
+
+    async def send(port, body):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        data = json.dumps(body).encode()
+        writer.write(f"POST /v1/chat HTTP/1.1\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode()
+                     + data)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response
+
+    async def main():
+        router = Router(1, "test", str(tmp_path))
+        worker_server = await asyncio.start_unix_server(worker, path=router.socket_path(0))
+        server = await asyncio.start_server(router.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        responses = [await send(port, {"message": "hi", "session_id": session_id})
+                     for session_id in ("a\r\nX-Evil: 1", "中")]
+        server.close()
+        worker_server.close()
+        return responses
+
+    for response in asyncio.run(main()):
+        assert response.startswith(b"HTTP/1.1 400 ")
+    assert received == []
@@ -0,0 +1,91 @@
+""" Binary session encoding round-trips and the session stores built on it """
+
+import pytest
+
+from session_store import (FLAG_COMPRESSED, InMemorySessionStore, Session, SQLiteSessionStore, decode_session,
+                           encode_session)
+
+
+def conversation(turns=1):
+    history = [{"role": "system", "content": "You are the Sierra Outfitters assistant."}]
+    for i in range(turns):
+        history += [
+            {"role": "user", "content": f"Where is order W{i:03d}? 🏔️"},
+            {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{i}", "type": "function",
+                "function": {"name": "check_order_status",
+                             "arguments": f'{{"email": "jane@example.com", "order_number": "W{i:03d}"}}'},
+            }]},
+            {"role": "tool", "tool_call_id": f"call_{i}", "name": "check_order_status",
+             "content": '{"success": true, "status": "delivered"}'},
+            {"role": "assistant", "content": "It was delivered!"},
+        ]
+    return history
+
+
+@pytest.mark.parametrize("session", [
+    Session(),
+    Session([{"role": "user", "content": ""}]),
+    Session(conversation(), {"email": "jane@example.com", "pending_orders": ["#W001"]},
+            {"email": "jane@example.com", "orders": {"#W001": "delivered"}, "products": {}}),
+    Session(conversation(20), {"email": None}, {}),
+], ids=["empty", "empty-content", "tool-exchange", "compressed"])
+def test_round_trip(session):
+    decoded = decode_session(encode_session(session))
+    assert decoded.history == session.history
+    assert decoded.slots == session.slots
+    assert decoded.memory == session.memory
+
+
+def test_large_sessions_are_compressed():
+    data = encode_session(Session(conversation(20)))
+    assert data[1] & FLAG_COMPRESSED
+    assert len(data) < len(encode_session(Session(conversation(1)))) * 20
+
+
+def test_api_noise_is_dropped():
+    message = {"role": "assistant", "content": "Hi!", "refusal": None, "audio": None, "function_call": None}
+    assert decode_session(encode_session(Session([message]))).history == [{"role": "assistant", "content": "Hi!"}]
+
+
+def test_unknown_version_is_rejected():
+    data = bytearray(encode_session(Session()))
+    data[0] += 1
+    with pytest.raises(ValueError):
+        decode_session(bytes(data))
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = InMemorySessionStore(max_session_bytes=2048) if request.param == "memory" \
+        else SQLiteSessionStore(str(tmp_path / "sessions.db"), max_session_bytes=2048)
+    yield store
+    store.close()
+
+
+def test_store_round_trip(store):
+    session = Session(conversation(), {"email": "jane@example.com"}, {"orders": {}, "products": {}})
+    store.save("s1", session)
+    loaded = store.load("s1")
+    assert loaded.history == session.history and loaded.slots == session.slots
+    assert store.load("other").history == []
+    store.delete("s1")
+    assert store.load("s1").history == []
+
+
+def test_store_trims_oldest_turns(store):
+    store.max_session_bytes = 512
+    session = Session(conversation(40))
+    assert store.save("s1", session) <= 512
+    loaded = store.load("s1").history
+    assert loaded[0]["role"] == "system"
+    assert loaded[-1] == conversation(40)[-1]
+    # Tool exchanges stay paired with their calls
+    assert loaded[1]["role"] == "user"
+    assert store.stats()["trimmed_turns"] > 0
+
+
+def test_unreadable_sessions_are_discarded(store):
+    store._put("s1", b"\x00\x00garbage")
+    assert store.load("s1").history == []
+    assert store.stored_bytes("s1") == 0
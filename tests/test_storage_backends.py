@@ -0,0 +1,89 @@
+""" Order lookups and product search return the same results on every storage backend """
+
+import os
+
+import pytest
+
+from data_loader import load_orders, load_products
+from storage_backends import InMemoryBackend, SnapshotBackend, SQLiteBackend
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+ORDERS_FILE = os.path.join(DATA_DIR, "CustomerOrders.json")
+PRODUCTS_FILE = os.path.join(DATA_DIR, "ProductCatalog.json")
+
+QUERIES = ["backpack", "blaze backpack", "Backpak", "wetsuit", "surfboard", "hiking adventure", "SOBP001",
+           "water bottle", "tent for camping", "zzyzx"]
+
+
+@pytest.fixture(scope="module")
+def backends(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("stores")
+    memory = InMemoryBackend.from_files(ORDERS_FILE, PRODUCTS_FILE)
+    sqlite_path = str(directory / "store.db")
+    SQLiteBackend.build(sqlite_path, load_orders(ORDERS_FILE), load_products(PRODUCTS_FILE)).close()
+    sqlite = SQLiteBackend(sqlite_path, read_only=True)
+    snapshot_path = str(directory / "store.snapshot")
+    SnapshotBackend.write(snapshot_path, load_orders(ORDERS_FILE), load_products(PRODUCTS_FILE))
+    snapshot = SnapshotBackend(snapshot_path)
+    yield {"memory": memory, "sqlite": sqlite, "snapshot": snapshot}
+    sqlite.close()
+    snapshot.close()
+
+
+def plain(record):
+    """ Records compare equal across backends once sequences are lists """
+    return {key: list(value) if isinstance(value, (list, tuple)) else value for key, value in dict(record).items()}
+
+
+def ranked(backend, query):
+    return [(product["SKU"], round(score, 6)) for product, score in backend.search_products(query, top_k=5)]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_search_parity(backends, query):
+    expected = ranked(backends["memory"], query)
+    assert ranked(backends["sqlite"], query) == expected
+    assert ranked(backends["snapshot"], query) == expected
+
+
+def test_search_finds_products(backends):
+    for backend in backends.values():
+        assert ranked(backend, "blaze backpack")[0][0] == "SOBP001"
+        assert ranked(backend, "zzyzx") == []
+
+
+def test_order_lookup_parity(backends):
+    for order in load_orders(ORDERS_FILE):
+        email, number = order["Email"], order["OrderNumber"]
+        for backend in backends.values():
+            assert plain(backend.get_order(email.upper(), number.lstrip("#").lower())) == plain(order)
+            assert order["OrderNumber"] in [found["OrderNumber"] for found in backend.find_orders_by_email(email)]
+    for backend in backends.values():
+        assert backend.get_order("nobody@example.com", "W001") is None
+        assert backend.find_orders_by_email("nobody@example.com") == []
+
+
+def test_product_lookup_parity(backends):
+    for product in load_products(PRODUCTS_FILE):
+        for backend in backends.values():
+            assert plain(backend.get_product_by_sku(product["SKU"].lower())) == plain(product)
+
+
+def test_single_product_writes_swap_in_a_copy():
+    memory = InMemoryBackend.from_files(ORDERS_FILE, PRODUCTS_FILE)
+    live = memory.product_search
+    before = ranked(memory, "backpack")
+    product_count = len(live.products)
+
+    memory.upsert_product({"SKU": "SOBP999", "ProductName": "Summit Backpack", "Description": "A backpack",
+                           "Tags": ["backpack"], "Inventory": 3})
+    # A reader still holding the old index sees it unchanged
+    assert memory.product_search is not live
+    assert len(live.products) == product_count and live.get_by_sku("SOBP999") is None
+    assert [(product["SKU"], round(score, 6)) for product, score in live.search("backpack")] == before
+    assert "SOBP999" in [sku for sku, _ in ranked(memory, "backpack")]
+
+    live = memory.product_search
+    assert memory.remove_product("SOBP999")["SKU"] == "SOBP999"
+    assert live.get_by_sku("SOBP999") is not None and memory.get_product_by_sku("SOBP999") is None
+    assert memory.remove_product("SOBP999") is None
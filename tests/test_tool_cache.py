@@ -0,0 +1,88 @@
+""" Tool result cache: normalized keys, per-tool TTLs, LRU eviction and invalidation """
+
+import pytest
+
+import tool_cache
+from tool_cache import ToolResultCache
+
+ORDER = {"email": "Jane@Example.com ", "order_number": "w001"}
+
+
+def product_result(sku, *others):
+    return {"success": True, "sku": sku, "other_matches": [{"sku": other} for other in others]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tool_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(clock):
+    return ToolResultCache(max_entries=3, ttls={"check_order_status": 30, "check_product_availability": 60})
+
+
+def test_equivalent_arguments_share_an_entry(cache):
+    cache.put("check_order_status", ORDER, {"status": "delivered"})
+    assert cache.get("check_order_status", {"email": "jane@example.com", "order_number": "#W001"}) == \
+        {"status": "delivered"}
+    cache.put("check_product_availability", {"product_query": "Blaze  Backpack"}, product_result("SOBP001"))
+    assert cache.get("check_product_availability", {"product_query": "blaze backpack"})["sku"] == "SOBP001"
+    assert cache.stats()["hits"] == 2
+
+
+def test_entries_expire_after_their_tool_ttl(cache, clock):
+    cache.put("check_order_status", ORDER, {"status": "delivered"})
+    cache.put("check_product_availability", {"product_query": "backpack"}, product_result("SOBP001"))
+    clock[0] += 30
+    assert cache.get("check_order_status", ORDER) is not None
+    clock[0] += 0.001
+    assert cache.get("check_order_status", ORDER) is None
+    assert cache.get("check_product_availability", {"product_query": "backpack"}) is not None
+    clock[0] += 30
+    assert cache.get("check_product_availability", {"product_query": "backpack"}) is None
+    assert len(cache) == 0 and cache.stats()["misses"] == 2
+
+
+def test_tools_without_a_ttl_are_not_cached(cache):
+    assert not cache.is_cacheable("generate_discount_code")
+    cache.put("generate_discount_code", {}, {"discount_code": "EARLY10-X"})
+    assert cache.get("generate_discount_code", {}) is None and len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    for query in ("a", "b", "c"):
+        cache.put("check_product_availability", {"product_query": query}, product_result(query.upper()))
+    cache.get("check_product_availability", {"product_query": "a"})
+    cache.put("check_product_availability", {"product_query": "d"}, product_result("D"))
+    assert cache.get("check_product_availability", {"product_query": "b"}) is None
+    assert cache.get("check_product_availability", {"product_query": "a"}) is not None
+    assert cache.stats()["evictions"] == 1
+    # The evicted entry's SKU link is gone with it
+    assert "B" not in cache._sku_dependents
+
+
+def test_invalidate_order(cache):
+    cache.put("check_order_status", ORDER, {"status": "processing"})
+    cache.invalidate_order("jane@example.com", "#W001")
+    assert cache.get("check_order_status", ORDER) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_invalidate_product_drops_every_result_referencing_the_sku(cache):
+    cache.put("check_product_availability", {"product_query": "backpack"}, product_result("SOBP001", "SOBP002"))
+    cache.put("check_product_availability", {"product_query": "bottle"}, product_result("SOWB004"))
+    cache.invalidate_product("sobp002")
+    assert cache.get("check_product_availability", {"product_query": "backpack"}) is None
+    assert cache.get("check_product_availability", {"product_query": "bottle"}) is not None
+    assert cache._sku_dependents.keys() == {"SOWB004"}
+
+
+def test_invalidate_tool(cache):
+    cache.put("check_order_status", ORDER, {"status": "processing"})
+    cache.put("check_product_availability", {"product_query": "backpack"}, product_result("SOBP001"))
+    cache.invalidate_tool("check_product_availability")
+    assert cache.get("check_product_availability", {"product_query": "backpack"}) is None
+    assert cache.get("check_order_status", ORDER) is not None
@@ -0,0 +1,82 @@
+""" Tool calls run concurrently, come back in call order and time out per tool """
+
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+from tool_executor import ToolExecutor
+
+turn = contextvars.ContextVar("turn", default=None)
+
+
+def fake_tool(name, args):
+    if args.get("release") is not None:
+        args["release"].wait(5)
+    elif args.get("sleep"):
+        time.sleep(args["sleep"])
+    return {"success": True, "name": name, "turn": turn.get()}
+
+
+@pytest.fixture
+def executor():
+    executor = ToolExecutor(max_workers=4, default_timeout=1.0, tool_timeouts={"slow_tool": 0.1})
+    yield executor
+    executor.shutdown()
+
+
+def test_results_come_back_in_call_order(executor):
+    turn.set("turn-1")
+    calls = [("a", {"sleep": 0.05}), ("b", {}), ("c", {"sleep": 0.02})]
+    results = executor.run(fake_tool, calls)
+    assert [result["name"] for result in results] == ["a", "b", "c"]
+    # Each call runs in a copy of the caller's context
+    assert {result["turn"] for result in results} == {"turn-1"}
+    assert executor.run(fake_tool, []) == []
+
+
+def test_calls_run_concurrently(executor):
+    started = time.monotonic()
+    executor.run(fake_tool, [("a", {"sleep": 0.2}) for _ in range(4)])
+    assert time.monotonic() - started < 0.6
+
+
+def test_slow_tool_times_out_without_holding_up_the_others(executor):
+    release = threading.Event()
+    started = time.monotonic()
+    results = executor.run(fake_tool, [("slow_tool", {"release": release}), ("fast_tool", {})])
+    elapsed = time.monotonic() - started
+    release.set()
+
+    assert results[0]["success"] is False and "slow_tool timed out after 0.1s" in results[0]["error"]
+    assert results[0]["formatted_response"]
+    assert results[1]["success"] and results[1]["name"] == "fast_tool"
+    assert elapsed < 0.5 and executor.timeouts == 1
+
+
+def test_timeouts_overlap_instead_of_adding_up(executor):
+    release = threading.Event()
+    started = time.monotonic()
+    results = executor.run(fake_tool, [("slow_tool", {"release": release}) for _ in range(3)])
+    elapsed = time.monotonic() - started
+    release.set()
+    assert [result["success"] for result in results] == [False, False, False]
+    assert elapsed < 0.25 and executor.timeouts == 3
+
+
+def test_async_run_times_out_per_tool(executor):
+    release = threading.Event()
+
+    async def main():
+        turn.set("turn-2")
+        return await executor.run_async(fake_tool, [("slow_tool", {"release": release}), ("fast_tool", {})])
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        release.set()
+    assert results[0]["success"] is False and "timed out" in results[0]["error"]
+    assert results[1] == {"success": True, "name": "fast_tool", "turn": "turn-2"}
+    assert executor.timeouts == 1
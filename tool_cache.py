@@ -0,0 +1,149 @@
+"""
+Sierra Outfitters Tool Result Cache
+
+Bounded LRU cache with per-tool TTLs for tool function results. Keys are
+built from normalized arguments, and entries can be invalidated explicitly
+when an order or a product's inventory changes.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Set
+
+from order_repository import normalize_email, normalize_order_number
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, Tuple]
+
+
+def normalize_arguments(function_name: str, function_args: Dict[str, Any]) -> Tuple:
+    """ Normalize tool arguments so equivalent requests share a cache key """
+    if function_name == "check_order_status":
+        return (normalize_email(function_args.get("email", "")),
+                normalize_order_number(function_args.get("order_number", "")))
+    if function_name == "check_product_availability":
+        return (" ".join((function_args.get("product_query") or "").lower().split()),)
+    return (json.dumps(function_args, sort_keys=True),)
+
+
+class ToolResultCache:
+    """ Thread-safe LRU + TTL cache for tool results with invalidation hooks """
+
+    def __init__(self, max_entries: int = 10000, ttls: Dict[str, float] = None):
+        """ Initialize the cache
+
+        Args:
+            max_entries: Max cached results before least-recently-used eviction
+            ttls: Seconds each tool's results stay fresh; tools not listed are never cached
+        """
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or {})
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._sku_dependents: Dict[str, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def is_cacheable(self, function_name: str) -> bool:
+        return self.ttls.get(function_name, 0) > 0
+
+    def stats(self) -> Dict[str, Any]:
+        """ Hit/miss counters and current size """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+        }
+
+    # ======== Lookups ========
+
+    def get(self, function_name: str, function_args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """ Return a fresh cached result, or None on a miss """
+        key = (function_name, normalize_arguments(function_name, function_args))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, function_name: str, function_args: Dict[str, Any], result: Dict[str, Any]):
+        """ Store a tool result under its normalized arguments """
+        if not self.is_cacheable(function_name):
+            return
+        key = (function_name, normalize_arguments(function_name, function_args))
+        expires_at = time.monotonic() + self.ttls[function_name]
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires_at, result)
+            for sku in self._referenced_skus(result):
+                self._sku_dependents.setdefault(sku, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    @staticmethod
+    def _referenced_skus(result: Dict[str, Any]) -> Set[str]:
+        """ SKUs whose inventory a cached product result depends on """
+        skus = {match["sku"].upper() for match in result.get("other_matches") or []}
+        if result.get("sku"):
+            skus.add(result["sku"].upper())
+        return skus
+
+    def _drop(self, key: CacheKey):
+        """ Remove an entry and its dependency links (caller holds the lock) """
+        _, result = self._entries.pop(key)
+        for sku in self._referenced_skus(result):
+            dependents = self._sku_dependents.get(sku)
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._sku_dependents[sku]
+
+    # ======== Invalidation Hooks ========
+
+    def invalidate_order(self, email: str, order_number: str):
+        """ Drop the cached status of an order after it changes """
+        key = ("check_order_status", (normalize_email(email), normalize_order_number(order_number)))
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+                self.invalidations += 1
+
+    def invalidate_product(self, sku: str):
+        """ Drop every cached product result that references a SKU """
+        with self._lock:
+            for key in list(self._sku_dependents.get(sku.upper(), ())):
+                self._drop(key)
+                self.invalidations += 1
+        logger.debug("Invalidated cached results for SKU %s", sku)
+
+    def invalidate_tool(self, function_name: str):
+        """ Drop every cached result of one tool (e.g. when search ranking may change) """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == function_name]:
+                self._drop(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sku_dependents.clear()
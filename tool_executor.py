@@ -0,0 +1,93 @@
+"""
+Sierra Outfitters Tool Executor
+
+Runs the independent tool calls of one model turn concurrently on a shared
+thread pool, with per-tool timeouts. Results always come back in the same
+order as the calls, so tool_call_id pairing is preserved. Each call runs in a
+copy of the caller's context, so tracing spans nest under the calling turn.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+ToolCall = Tuple[str, Dict[str, Any]]
+
+
+def timeout_response(function_name: str, timeout: float) -> Dict[str, Any]:
+    """ Tool result returned when a call exceeds its timeout """
+    return {
+        "success": False,
+        "error": f"{function_name} timed out after {timeout}s",
+        "formatted_response": "That lookup is taking longer than a steep switchback climb. Can you try again in a moment? 🏔️"
+    }
+
+
+class ToolExecutor:
+    """ Concurrent executor for tool calls with per-tool timeouts """
+
+    def __init__(self, max_workers: int = 8, default_timeout: float = 5.0,
+                 tool_timeouts: Dict[str, float] = None):
+        """ Initialize the executor
+
+        Args:
+            max_workers: Thread pool size shared by every turn
+            default_timeout: Seconds a tool call may run before it is reported as timed out
+            tool_timeouts: Per-tool overrides of the default timeout
+        """
+        self.default_timeout = default_timeout
+        self.tool_timeouts = dict(tool_timeouts or {})
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sierra-tool")
+        self.timeouts = 0
+
+    def timeout_for(self, function_name: str) -> float:
+        return self.tool_timeouts.get(function_name, self.default_timeout)
+
+    def shutdown(self):
+        """ Stop the worker threads """
+        self._pool.shutdown(wait=False)
+
+    def run(self, fn: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+            calls: List[ToolCall]) -> List[Dict[str, Any]]:
+        """ Run fn(name, args) for every call concurrently and return results in call order """
+        if not calls:
+            return []
+        started = time.monotonic()
+        futures = [self._pool.submit(contextvars.copy_context().run, fn, name, args) for name, args in calls]
+
+        results = []
+        for (name, _), future in zip(calls, futures):
+            # Deadlines are measured from submission, so waits overlap instead of adding up
+            timeout = self.timeout_for(name)
+            remaining = max(0.0, started + timeout - time.monotonic())
+            try:
+                results.append(future.result(timeout=remaining))
+            except FutureTimeoutError:
+                logger.error("Tool call timed out: %s (>%ss)", name, timeout)
+                self.timeouts += 1
+                future.cancel()
+                results.append(timeout_response(name, timeout))
+        return results
+
+    async def run_async(self, fn: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+                        calls: List[ToolCall]) -> List[Dict[str, Any]]:
+        """ Async variant of run() that never blocks the event loop """
+        loop = asyncio.get_running_loop()
+
+        async def run_one(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+            timeout = self.timeout_for(name)
+            try:
+                call = functools.partial(contextvars.copy_context().run, fn, name, args)
+                return await asyncio.wait_for(loop.run_in_executor(self._pool, call), timeout)
+            except asyncio.TimeoutError:
+                logger.error("Tool call timed out: %s (>%ss)", name, timeout)
+                self.timeouts += 1
+                return timeout_response(name, timeout)
+
+        return list(await asyncio.gather(*(run_one(name, args) for name, args in calls)))